@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Almacenamiento SQLite para el Inventario
+Autor: Leslye Valencia
+
+Descripción:
+- Guarda los productos en una base SQLite (módulo estándar sqlite3) en modo WAL.
+- Cada cambio toca solo su fila (INSERT ... ON CONFLICT / DELETE) en lugar de
+  reescribir el archivo completo; una transacción del Inventario es una transacción SQL.
+- Índices: id (clave primaria), nombre en minúsculas y categoría. Si SQLite trae FTS5
+  con el tokenizador trigram, la búsqueda por nombre usa además un índice de texto
+  completo (también sirve para subcadenas).
+- Consultas directas sobre la base (sin cargar el inventario): obtener, buscar_nombre,
+  productos_por_categoria.
+- Comando de migración desde inventario.csv (Semana 11), inventario.txt (Semana 10) o .bin.
+
+Uso:
+    inventario = Inventario("inventario.db")          # se elige por la extensión
+    python almacenamiento_sqlite.py inventario.csv inventario.db
+    python almacenamiento_sqlite.py ../"Semana 10"/inventario.txt inventario.db --categoria General
+"""
+
+import argparse
+import itertools
+import sqlite3
+import sys
+
+from inventario_avanzado import Almacenamiento
+
+# Nivel de durabilidad del Inventario -> PRAGMA synchronous (en modo WAL)
+SINCRONIZACION = {"ninguna": "OFF", "archivo": "NORMAL", "completa": "FULL"}
+
+# Sentencias fijas: sqlite3 guarda cada una ya preparada en su caché y la reutiliza
+SQL_GUARDAR = ("INSERT INTO productos (id, nombre, nombre_min, cantidad, precio, categoria) "
+               "VALUES (?, ?, ?, ?, ?, ?) "
+               "ON CONFLICT(id) DO UPDATE SET nombre = excluded.nombre, nombre_min = excluded.nombre_min, "
+               "cantidad = excluded.cantidad, precio = excluded.precio, categoria = excluded.categoria")
+SQL_BORRAR = "DELETE FROM productos WHERE id = ?"
+SQL_COLUMNAS = "SELECT id, nombre, cantidad, precio, categoria FROM productos"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS productos (
+    id         TEXT PRIMARY KEY,
+    nombre     TEXT NOT NULL,
+    nombre_min TEXT NOT NULL,
+    cantidad   INTEGER NOT NULL,
+    precio     REAL NOT NULL,
+    categoria  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS productos_nombre ON productos (nombre_min);
+CREATE INDEX IF NOT EXISTS productos_categoria ON productos (categoria);
+"""
+
+# Índice de texto completo sincronizado con la tabla mediante triggers
+ESQUEMA_FTS = """
+CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5(
+    nombre_min, content='productos', content_rowid='rowid', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS productos_fts_alta AFTER INSERT ON productos BEGIN
+    INSERT INTO productos_fts (rowid, nombre_min) VALUES (new.rowid, new.nombre_min);
+END;
+CREATE TRIGGER IF NOT EXISTS productos_fts_baja AFTER DELETE ON productos BEGIN
+    INSERT INTO productos_fts (productos_fts, rowid, nombre_min) VALUES ('delete', old.rowid, old.nombre_min);
+END;
+CREATE TRIGGER IF NOT EXISTS productos_fts_cambio AFTER UPDATE OF nombre_min ON productos
+WHEN old.nombre_min <> new.nombre_min BEGIN
+    INSERT INTO productos_fts (productos_fts, rowid, nombre_min) VALUES ('delete', old.rowid, old.nombre_min);
+    INSERT INTO productos_fts (rowid, nombre_min) VALUES (new.rowid, new.nombre_min);
+END;
+"""
+
+
+def _fila(p):
+    return p.get_id(), p.get_nombre(), p.get_nombre().lower(), p.get_cantidad(), p.get_precio(), p.get_categoria()
+
+
+class AlmacenamientoSQLite(Almacenamiento):
+    def __init__(self, ruta, durabilidad="archivo", usar_fts=True):
+        super().__init__()
+        self.ruta = ruta
+        try:
+            # isolation_level=None: las transacciones se abren y cierran a mano (BEGIN/COMMIT).
+            # check_same_thread=False: el servidor guarda sus lotes desde un hilo aparte
+            # (de a uno, sin que nadie más use la conexión mientras tanto)
+            self.conexion = sqlite3.connect(ruta, isolation_level=None, check_same_thread=False)
+            self.conexion.execute("PRAGMA journal_mode = WAL")
+            self.conexion.execute(f"PRAGMA synchronous = {SINCRONIZACION[durabilidad]}")
+            self.conexion.executescript(ESQUEMA)
+            self.usar_fts = usar_fts and self._crear_fts()
+        except sqlite3.Error as e:
+            raise OSError(f"No se pudo abrir la base '{ruta}': {e}") from e
+
+    def _crear_fts(self):
+        try:
+            self.conexion.executescript(ESQUEMA_FTS)
+        except sqlite3.OperationalError:
+            return False  # SQLite sin FTS5 o sin tokenizador trigram: se usa LIKE
+        return True
+
+    # Interfaz de Almacenamiento ---
+    def cargar(self):
+        # rowid conserva el orden de inserción (un producto modificado no cambia de lugar)
+        try:
+            yield from self.conexion.execute(SQL_COLUMNAS + " ORDER BY rowid")
+        except sqlite3.Error as e:
+            raise OSError(f"Error leyendo la base '{self.ruta}': {e}") from e
+
+    def guardar_todo(self, productos):
+        self._en_transaccion(lambda: (self.conexion.execute("DELETE FROM productos"),
+                                      self.conexion.executemany(SQL_GUARDAR, map(_fila, productos))))
+        if self.usar_fts:
+            self._en_transaccion(lambda: self.conexion.execute(
+                "INSERT INTO productos_fts (productos_fts) VALUES ('optimize')"))
+
+    def aplicar(self, cambios, productos):
+        def escribir():
+            # Cambios seguidos del mismo tipo van juntos en un executemany, sin alterar el orden
+            for tipo, grupo in itertools.groupby(cambios, key=lambda cambio: cambio[0]):
+                if tipo == "guardar":
+                    self.conexion.executemany(
+                        SQL_GUARDAR, ((i, n, n.lower(), c, p, cat) for _, (i, n, c, p, cat) in grupo))
+                else:
+                    self.conexion.executemany(SQL_BORRAR, ((id_unico,) for _, id_unico in grupo))
+        self._en_transaccion(escribir)
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def _en_transaccion(self, escribir):
+        # Todo o nada: si algo falla, ROLLBACK y la base queda como estaba
+        try:
+            self.conexion.execute("BEGIN IMMEDIATE")
+            try:
+                escribir()
+            except BaseException:
+                self.conexion.execute("ROLLBACK")
+                raise
+            self.conexion.execute("COMMIT")
+        except sqlite3.Error as e:
+            raise OSError(f"Error escribiendo en la base '{self.ruta}': {e}") from e
+
+    # Consultas directas (sin cargar el inventario) ---
+    def obtener(self, id_unico):
+        return self.conexion.execute(SQL_COLUMNAS + " WHERE id = ?", (id_unico,)).fetchone()
+
+    def buscar_nombre(self, texto):
+        """
+        Filas cuyo nombre contiene `texto` (sin distinguir mayúsculas), en orden de inserción.
+        Con FTS5 (y 3 o más letras) se usa el índice de trigramas; si no, LIKE recorre la tabla.
+        """
+        consulta = texto.lower()
+        if self.usar_fts and len(consulta) >= 3:
+            frase = '"' + consulta.replace('"', '""') + '"'
+            return self.conexion.execute(
+                SQL_COLUMNAS + " WHERE rowid IN (SELECT rowid FROM productos_fts WHERE productos_fts MATCH ?)"
+                " ORDER BY rowid", (frase,)).fetchall()
+        patron = "%" + consulta.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return self.conexion.execute(SQL_COLUMNAS + " WHERE nombre_min LIKE ? ESCAPE '\\' ORDER BY rowid",
+                                     (patron,)).fetchall()
+
+    def productos_por_categoria(self, categoria):
+        return self.conexion.execute(SQL_COLUMNAS + " WHERE categoria = ? ORDER BY rowid", (categoria,)).fetchall()
+
+    def contar(self):
+        return self.conexion.execute("SELECT COUNT(*) FROM productos").fetchone()[0]
+
+
+# ---------------------------
+# Migración desde CSV/TXT/BIN
+# ---------------------------
+def migrar(origen, destino, categoria_por_defecto="Sin categoría"):
+    """
+    Copia los productos de inventario.csv, inventario.txt (Semana 10) o .bin a una base SQLite.
+    Reemplaza lo que hubiera en la base. Retorna la cantidad de productos migrados.
+    """
+    from formato_binario import SnapshotBinario, _Fila, leer_csv
+    if origen.endswith(".bin"):
+        with SnapshotBinario(origen, fabrica=_Fila) as snapshot:
+            productos = list(snapshot)
+    else:
+        productos = list(leer_csv(origen, categoria_por_defecto))
+    # Si el archivo repite un ID gana la última línea, igual que al cargarlo en el Inventario
+    unicos = {}
+    for p in productos:
+        unicos.pop(p.get_id(), None)
+        unicos[p.get_id()] = p
+    productos = list(unicos.values())
+    almacenamiento = AlmacenamientoSQLite(destino)
+    try:
+        almacenamiento.guardar_todo(productos)
+    finally:
+        almacenamiento.cerrar()
+    return len(productos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migra un inventario CSV/TXT/BIN a SQLite.")
+    parser.add_argument("origen")
+    parser.add_argument("destino", help="base SQLite (.db)")
+    parser.add_argument("--categoria", default="Sin categoría",
+                        help="categoría para los productos de un .txt (Semana 10 no guarda categoría)")
+    args = parser.parse_args()
+    try:
+        n = migrar(args.origen, args.destino, args.categoria)
+    except (OSError, ValueError) as e:
+        print(f"Error al migrar: {e}")
+        sys.exit(1)
+    print(f"{n} producto(s) migrados: {args.origen} -> {args.destino}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+Analítica del Inventario (reportes por columnas, con caché)
+Autor: Leslye Valencia
+
+Descripción:
+- Copia el inventario a columnas (cantidad, precio, categoría) y calcula sobre ellas:
+  valor total del stock, valor por categoría, clasificación ABC y bajo stock.
+- Con NumPy (si está instalado) los cálculos son vectorizados: bincount, argsort, cumsum.
+  Sin NumPy se usan las mismas columnas con funciones internas de Python (sum, map, sorted).
+- Los resultados quedan en caché y se invalidan solos: cada cambio en memoria del
+  Inventario aumenta `inventario.version`.
+- Las columnas se actualizan en el lugar con los eventos de cambio del Inventario
+  (eventos_inventario.py): un cambio de cantidad o precio toca una sola posición.
+  Altas, bajas, transacciones sin confirmar o revertidas (cambios sin su evento)
+  hacen que la próxima consulta vuelva a armar las columnas completas.
+- Con el Inventario por columnas (columnar=True) las cantidades y precios se copian
+  directamente de sus arrays, sin pasar por los objetos Producto.
+
+Clasificación ABC (por valor de stock = cantidad * precio, de mayor a menor):
+    A: los productos que suman el primer 80 % del valor
+    B: los que siguen hasta el 95 %
+    C: el resto
+
+Ejemplo:
+    analitica = AnaliticaInventario(inventario)
+    print(analitica.valor_total())
+    for clase, (ids, valor) in analitica.clasificacion_abc().items():
+        print(clase, len(ids), valor)
+"""
+
+import math
+import operator
+
+try:
+    import numpy as np
+except ImportError:  # sin NumPy: mismas cuentas con las columnas como listas
+    np = None
+
+CLASES_ABC = ("A", "B", "C")
+EVENTOS_EN_EL_LUGAR = frozenset(("cantidad", "precio", "nombre"))
+
+
+# ---------------------------
+# Columnas del inventario
+# ---------------------------
+class _Columnas:
+    """
+    Foto del inventario por columnas, en orden de inserción.
+    cantidades/precios/valores/codigos son arrays de NumPy o listas de Python.
+    """
+    def __init__(self, productos, usar_numpy):
+        if hasattr(productos, "cantidades"):
+            # AlmacenColumnar: se toman las filas vivas (las bajas dejan huecos en los arrays)
+            filas = list(productos.filas.values())
+            self.ids = [productos.ids[f] for f in filas]
+            categorias = [productos.categorias[f] for f in filas]
+            if usar_numpy:
+                filas_np = np.array(filas, dtype=np.intp)
+                # .take() copia: el array de Python no queda atado a NumPy y puede seguir creciendo
+                self.cantidades = np.frombuffer(productos.cantidades, dtype=np.int64).take(filas_np)
+                self.precios = np.frombuffer(productos.precios, dtype=np.float64).take(filas_np)
+            else:
+                self.cantidades = [productos.cantidades[f] for f in filas]
+                self.precios = [productos.precios[f] for f in filas]
+        else:
+            valores = list(productos.values())
+            self.ids = list(productos)
+            categorias = list(map(operator.attrgetter("categoria"), valores))
+            cantidades = map(operator.attrgetter("cantidad"), valores)
+            precios = map(operator.attrgetter("precio"), valores)
+            if usar_numpy:
+                self.cantidades = np.fromiter(cantidades, dtype=np.int64, count=len(valores))
+                self.precios = np.fromiter(precios, dtype=np.float64, count=len(valores))
+            else:
+                self.cantidades = list(cantidades)
+                self.precios = list(precios)
+
+        # Categorías como códigos 0..k-1 (en orden de aparición)
+        codigos = {}
+        self.codigos = [codigos.setdefault(c, len(codigos)) for c in categorias]
+        self.categorias = list(codigos)
+        if usar_numpy:
+            self.codigos = np.array(self.codigos, dtype=np.intp)
+            self.valores = self.cantidades * self.precios
+        else:
+            self.valores = list(map(operator.mul, self.cantidades, self.precios))
+        self.posiciones = None  # ID -> posición en las columnas (se arma al primer cambio)
+
+    def aplicar(self, eventos):
+        # Solo eventos "cantidad", "precio" o "nombre": no cambian qué productos hay
+        if self.posiciones is None:
+            self.posiciones = {id_unico: n for n, id_unico in enumerate(self.ids)}
+        for evento in eventos:
+            if evento.tipo == "nombre":
+                continue
+            n = self.posiciones[evento.id_producto]
+            _, _, cantidad, precio, _ = evento.despues
+            self.cantidades[n] = cantidad
+            self.precios[n] = precio
+            self.valores[n] = cantidad * precio
+
+
+# ---------------------------
+# Motor de análisis
+# ---------------------------
+class AnaliticaInventario:
+    def __init__(self, inventario, usar_numpy=None, max_eventos=10_000):
+        if usar_numpy and np is None:
+            raise ValueError("NumPy no está instalado.")
+        self.inventario = inventario
+        self.usar_numpy = np is not None if usar_numpy is None else usar_numpy
+        self._version = None   # inventario.version de las columnas y resultados en caché
+        self._columnas = None
+        self._cache = {}
+        self.reconstrucciones = 0  # veces que se armaron las columnas completas
+        # Si se juntan más de max_eventos cambios entre consultas, se descartan y se rearma todo
+        self._suscripcion = inventario.eventos.suscribir(capacidad=max_eventos, politica="descartar")
+
+    def cerrar(self):
+        self._suscripcion.cerrar()
+
+    def _datos(self):
+        # Columnas al día con el inventario
+        version = self.inventario.version
+        if self._version == version:
+            return self._columnas
+        eventos = self._suscripcion.obtener_lote(self._suscripcion.capacidad)
+        # Cada cambio confirmado aumenta la versión en 1 y publica 1 evento: si no coinciden
+        # hubo cambios sin evento (transacción abierta o revertida, recarga)
+        en_el_lugar = (self._version is not None and not self._suscripcion.perdidos
+                       and self._version + len(eventos) == version
+                       and all(e.tipo in EVENTOS_EN_EL_LUGAR for e in eventos))
+        if en_el_lugar:
+            self._columnas.aplicar(eventos)
+        else:
+            self._suscripcion.perdidos = 0
+            self._columnas = _Columnas(self.inventario.productos, self.usar_numpy)
+            self.reconstrucciones += 1
+        self._cache = {}
+        self._version = version
+        return self._columnas
+
+    def _cacheado(self, clave, calcular):
+        columnas = self._datos()
+        if clave not in self._cache:
+            self._cache[clave] = calcular(columnas)
+        return self._cache[clave]
+
+    # Reportes ----------------
+    def valor_total(self):
+        """
+        (productos, unidades, valor_stock) de todo el inventario.
+        """
+        return self._cacheado("valor_total", self._valor_total)
+
+    def valor_por_categoria(self):
+        """
+        {categoría: (productos, unidades, valor_stock)}, como Inventario.valor_por_categoria().
+        """
+        return self._cacheado("valor_por_categoria", self._valor_por_categoria)
+
+    def clasificacion_abc(self, limite_a=0.80, limite_b=0.95):
+        """
+        {"A"|"B"|"C": (ids de mayor a menor valor, valor_stock de la clase)}.
+        """
+        if not 0 < limite_a <= limite_b <= 1:
+            raise ValueError("Se necesita 0 < limite_a <= limite_b <= 1.")
+        return self._cacheado(("abc", limite_a, limite_b), lambda c: self._abc(c, limite_a, limite_b))
+
+    def bajo_stock(self, umbral):
+        """
+        Productos con menos de `umbral` unidades, de menor a mayor cantidad
+        (a igual cantidad, en orden de inserción).
+        """
+        ids = self._cacheado(("bajo_stock", umbral), lambda c: self._bajo_stock(c, umbral))
+        productos = self.inventario.productos
+        return [productos[i] for i in ids]
+
+    # Cálculos ----------------
+    def _valor_total(self, c):
+        if self.usar_numpy:
+            return len(c.ids), int(c.cantidades.sum()), round(float(c.valores.sum()), 2)
+        return len(c.ids), sum(c.cantidades), round(math.fsum(c.valores), 2)
+
+    def _valor_por_categoria(self, c):
+        k = len(c.categorias)
+        if self.usar_numpy:
+            productos = np.bincount(c.codigos, minlength=k)
+            unidades = np.bincount(c.codigos, weights=c.cantidades, minlength=k)
+            valores = np.bincount(c.codigos, weights=c.valores, minlength=k)
+            return {cat: (int(productos[n]), int(unidades[n]), round(float(valores[n]), 2))
+                    for n, cat in enumerate(c.categorias)}
+        productos, unidades, valores = [0] * k, [0] * k, [0.0] * k
+        for codigo, cantidad, valor in zip(c.codigos, c.cantidades, c.valores):
+            productos[codigo] += 1
+            unidades[codigo] += cantidad
+            valores[codigo] += valor
+        return {cat: (productos[n], unidades[n], round(valores[n], 2)) for n, cat in enumerate(c.categorias)}
+
+    def _abc(self, c, limite_a, limite_b):
+        # Un producto es A si el valor acumulado ANTES de él no llegó al límite
+        # (así el que cruza el 80 % también es A).
+        if self.usar_numpy:
+            orden = np.argsort(-c.valores, kind="stable")
+            valores = c.valores[orden]
+            acumulado = np.cumsum(valores)
+            total = acumulado[-1] if len(acumulado) else 0.0
+            previo = acumulado - valores
+            clase = np.where(previo < limite_a * total, 0, np.where(previo < limite_b * total, 1, 2))
+            resultado = {}
+            for n, nombre in enumerate(CLASES_ABC):
+                seleccion = clase == n
+                resultado[nombre] = ([c.ids[i] for i in orden[seleccion].tolist()],
+                                     round(float(valores[seleccion].sum()), 2))
+            return resultado
+        orden = sorted(range(len(c.ids)), key=c.valores.__getitem__, reverse=True)
+        total = math.fsum(c.valores)
+        resultado = {nombre: ([], 0.0) for nombre in CLASES_ABC}
+        sumas = dict.fromkeys(CLASES_ABC, 0.0)
+        previo = 0.0
+        for i in orden:
+            nombre = "A" if previo < limite_a * total else "B" if previo < limite_b * total else "C"
+            resultado[nombre][0].append(c.ids[i])
+            sumas[nombre] += c.valores[i]
+            previo += c.valores[i]
+        return {nombre: (ids, round(sumas[nombre], 2)) for nombre, (ids, _) in resultado.items()}
+
+    def _bajo_stock(self, c, umbral):
+        if self.usar_numpy:
+            filas = np.flatnonzero(c.cantidades < umbral)
+            filas = filas[np.argsort(c.cantidades[filas], kind="stable")]
+            return [c.ids[i] for i in filas.tolist()]
+        filas = [i for i, cantidad in enumerate(c.cantidades) if cantidad < umbral]
+        filas.sort(key=c.cantidades.__getitem__)
+        return [c.ids[i] for i in filas]
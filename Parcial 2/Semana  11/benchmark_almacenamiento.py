@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de almacenamientos: CSV (inventario.csv) vs. SQLite (inventario.db).
+
+Para N productos mide:
+- "carga":       crear el Inventario (leer todo y armar los índices en memoria)
+- "cambio":      actualizar_cantidad de un producto, guardado al instante (ms por cambio):
+                 el CSV reescribe el archivo completo, SQLite solo la fila
+- "lote 1000":   1000 cambios en una transacción (una sola escritura)
+- "consulta":    buscar por nombre y por categoría directo en la base, sin cargar el
+                 inventario (solo SQLite; el CSV necesita la carga completa)
+
+Uso:
+    python benchmark_almacenamiento.py [--n 1000000] [--cambios 5] [--directorio /tmp]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from almacenamiento_sqlite import AlmacenamientoSQLite
+from inventario_avanzado import AlmacenamientoCSV, Inventario, Producto
+
+CATEGORIAS = ["Lácteos", "Panadería", "Bebidas", "Limpieza", "Snacks", "Frutas", "Carnes", "Congelados"]
+
+
+def productos_de_prueba(n):
+    for i in range(n):
+        yield Producto(f"P{i:07d}", f"Producto {i}", i % 100, 1.0 + (i % 50) / 4, CATEGORIAS[i % len(CATEGORIAS)])
+
+
+def cronometrar(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return time.perf_counter() - inicio, resultado
+
+
+def medir(nombre, almacenamiento, n, cambios):
+    almacenamiento.guardar_todo(productos_de_prueba(n))
+    almacenamiento.cerrar()
+    ruta = almacenamiento.ruta
+    t_carga, inventario = cronometrar(lambda: Inventario(ruta, durabilidad="ninguna", generaciones=0))
+
+    ids = [f"P{random.randrange(n):07d}" for _ in range(cambios)]
+    t_cambio, _ = cronometrar(lambda: [inventario.actualizar_cantidad(i, 7) for i in ids])
+
+    lote = [f"P{random.randrange(n):07d}" for _ in range(1000)]
+
+    def aplicar_lote():
+        with inventario.transaccion():
+            for i in lote:
+                inventario.actualizar_cantidad(i, 8)
+    t_lote, _ = cronometrar(aplicar_lote)
+    inventario.cerrar()
+    print(f"{nombre:<8} | {t_carga:>9.2f} | {t_cambio / cambios * 1000:>12.2f} | {t_lote * 1000:>13.1f} | "
+          f"{os.path.getsize(ruta) / 1e6:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV vs. SQLite como almacenamiento del inventario.")
+    parser.add_argument("--n", type=int, default=1_000_000)
+    parser.add_argument("--cambios", type=int, default=5, help="cambios sueltos a medir (el CSV es lento)")
+    parser.add_argument("--directorio", default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    ruta_csv = os.path.join(args.directorio, "bench_almacenamiento.csv")
+    ruta_db = os.path.join(args.directorio, "bench_almacenamiento.db")
+    for ruta in (ruta_db, ruta_db + "-wal", ruta_db + "-shm"):
+        if os.path.exists(ruta):
+            os.remove(ruta)
+
+    print(f"Productos: {args.n}")
+    print(f"{'almacén':<8} | {'carga (s)':>9} | {'cambio (ms)':>12} | {'lote 1000 (ms)':>13} | {'MB':>8}")
+    print("-" * 62)
+    medir("csv", AlmacenamientoCSV(ruta_csv, durabilidad="ninguna", generaciones=0), args.n, args.cambios)
+    medir("sqlite", AlmacenamientoSQLite(ruta_db, durabilidad="ninguna"), args.n, args.cambios)
+
+    base = AlmacenamientoSQLite(ruta_db)
+    consulta = f"producto {random.randrange(args.n)}"
+    t_nombre, filas = cronometrar(lambda: base.buscar_nombre(consulta))
+    t_categoria, filas_cat = cronometrar(lambda: base.productos_por_categoria("Bebidas"))
+    t_id, _ = cronometrar(lambda: base.obtener(f"P{random.randrange(args.n):07d}"))
+    print(f"\nConsultas directas en SQLite (sin cargar el inventario):")
+    print(f"  buscar_nombre('{consulta}'): {t_nombre * 1000:.2f} ms ({len(filas)} fila(s))")
+    print(f"  productos_por_categoria('Bebidas'): {t_categoria * 1000:.2f} ms ({len(filas_cat)} fila(s))")
+    print(f"  obtener por ID: {t_id * 1000:.3f} ms")
+    base.cerrar()
+
+    for ruta in (ruta_csv, ruta_db, ruta_db + "-wal", ruta_db + "-shm"):
+        if os.path.exists(ruta):
+            os.remove(ruta)
+
+
+if __name__ == "__main__":
+    main()
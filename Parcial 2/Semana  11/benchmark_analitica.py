@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de reportes: bucles directos sobre Producto.datos vs. AnaliticaInventario.
+
+Para N productos mide cada reporte (valor total, valor por categoría, ABC, bajo stock):
+- "bucle":     recorrido en Python de inventario.productos.values() y sus tuplas datos
+- "columnas":  AnaliticaInventario, primera consulta (incluye armar las columnas)
+- "caché":     la misma consulta otra vez, sin cambios en el inventario
+Además, cuánto cuesta poner las columnas al día después de un cambio de cantidad
+(en el lugar, con los eventos) y después de un alta (se rearman completas).
+Se mide con NumPy (si está instalado) y sin él.
+
+Uso:
+    python benchmark_analitica.py [--n 1000000] [--columnar]
+"""
+
+import argparse
+import math
+import time
+
+from analitica_inventario import AnaliticaInventario, np
+from inventario_avanzado import Almacenamiento, Inventario, Producto
+
+CATEGORIAS = ["Lácteos", "Panadería", "Bebidas", "Limpieza", "Snacks", "Frutas", "Carnes", "Congelados"]
+UMBRAL = 5
+
+
+class _AlmacenamientoEnMemoria(Almacenamiento):
+    # Genera los productos de prueba sin archivo; guardar no hace nada
+    def __init__(self, n):
+        super().__init__()
+        self.n = n
+
+    def cargar(self):
+        for i in range(self.n):
+            yield (f"P{i:07d}", f"Producto {i}", (i * 7919) % 500, 1.0 + (i * 31) % 997 / 10,
+                   CATEGORIAS[i % len(CATEGORIAS)])
+
+    def guardar_todo(self, productos):
+        pass
+
+
+# Reportes con bucles directos (como se hacían antes)
+def bucle_valor_total(inventario):
+    n, unidades, valores = 0, 0, []
+    for _, _, cantidad, precio, _ in (p.datos for p in inventario.productos.values()):
+        n += 1
+        unidades += cantidad
+        valores.append(cantidad * precio)
+    return n, unidades, round(math.fsum(valores), 2)
+
+
+def bucle_valor_por_categoria(inventario):
+    totales = {}
+    for _, _, cantidad, precio, categoria in (p.datos for p in inventario.productos.values()):
+        t = totales.setdefault(categoria, [0, 0, 0.0])
+        t[0] += 1
+        t[1] += cantidad
+        t[2] += cantidad * precio
+    return {cat: (n, unidades, round(valor, 2)) for cat, (n, unidades, valor) in totales.items()}
+
+
+def bucle_abc(inventario):
+    filas = sorted((p.datos for p in inventario.productos.values()), key=lambda d: d[2] * d[3], reverse=True)
+    total = math.fsum(d[2] * d[3] for d in filas)
+    clases = {"A": [], "B": [], "C": []}
+    previo = 0.0
+    for d in filas:
+        clase = "A" if previo < 0.80 * total else "B" if previo < 0.95 * total else "C"
+        clases[clase].append(d[0])
+        previo += d[2] * d[3]
+    return clases
+
+
+def bucle_bajo_stock(inventario):
+    filas = [p.datos for p in inventario.productos.values() if p.datos[2] < UMBRAL]
+    filas.sort(key=lambda d: d[2])
+    return [d[0] for d in filas]
+
+
+def cronometrar(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return time.perf_counter() - inicio, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reportes con bucles vs. AnaliticaInventario.")
+    parser.add_argument("--n", type=int, default=1_000_000)
+    parser.add_argument("--columnar", action="store_true", help="inventario por columnas (arrays)")
+    args = parser.parse_args()
+
+    t_carga, inventario = cronometrar(lambda: Inventario("bench_analitica.csv", columnar=args.columnar,
+                                                         almacenamiento=_AlmacenamientoEnMemoria(args.n)))
+    print(f"Productos: {args.n} ({'columnar' if args.columnar else 'dict'}), carga {t_carga:.1f} s, "
+          f"NumPy: {'sí' if np is not None else 'no instalado'}")
+
+    reportes = [
+        ("valor total", bucle_valor_total, lambda a: a.valor_total()),
+        ("por categoría", bucle_valor_por_categoria, lambda a: a.valor_por_categoria()),
+        ("ABC", bucle_abc, lambda a: {k: ids for k, (ids, _) in a.clasificacion_abc().items()}),
+        ("bajo stock", bucle_bajo_stock, lambda a: [p.get_id() for p in a.bajo_stock(UMBRAL)]),
+    ]
+    modos = [False] + ([True] if np is not None else [])
+    print(f"{'reporte':<14} | {'bucle (ms)':>10} | " +
+          " | ".join(f"{'numpy' if m else 'python'}: {'columnas':>8} {'caché':>7}" for m in modos))
+    print("-" * (30 + 27 * len(modos)))
+    motores = {m: AnaliticaInventario(inventario, usar_numpy=m) for m in modos}
+    for nombre, bucle, consulta in reportes:
+        t_bucle, esperado = cronometrar(lambda: bucle(inventario))
+        celdas = []
+        for m, analitica in motores.items():
+            analitica._version = None  # cada reporte medido con las columnas recién armadas
+            t_primera, resultado = cronometrar(lambda: consulta(analitica))
+            t_cache, _ = cronometrar(lambda: consulta(analitica))
+            assert resultado == esperado, f"{nombre}: resultados distintos"
+            celdas.append(f"{'':>8}{t_primera * 1000:>8.1f} {t_cache * 1000:>7.3f}")
+        print(f"{nombre:<14} | {t_bucle * 1000:>10.1f} | " + " | ".join(celdas))
+
+    for m, analitica in motores.items():
+        analitica._datos()
+    # El primer cambio arma el índice ID -> posición; se mide el segundo
+    t_cambio = {}
+    for cantidad in (3, 4):
+        inventario.actualizar_cantidad("P0000000", cantidad)
+        for m, analitica in motores.items():
+            t_cambio[m], _ = cronometrar(analitica.valor_total)
+    for m in motores:
+        print(f"valor total tras un cambio de cantidad ({'numpy' if m else 'python'}): {t_cambio[m] * 1000:.2f} ms")
+    inventario.agregar(Producto("NUEVO", "Nuevo", 1, 1.0, CATEGORIAS[0]))
+    for m, analitica in motores.items():
+        t_alta, _ = cronometrar(analitica.valor_total)
+        print(f"valor total tras un alta ({'numpy' if m else 'python'}): {t_alta * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
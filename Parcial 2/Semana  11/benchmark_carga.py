@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark del tiempo de carga: inventario.csv vs. formato binario (.bin).
+
+Mide para N productos:
+- "csv leer":     solo parsear el CSV a filas (parsear_snapshot, sin índices)
+- "bin leer":     solo recorrer el .bin armando cada Producto (sin índices)
+- "csv":          Inventario("...csv") completo (parseo de texto + índices)
+- "bin":          Inventario("...bin") completo (registros binarios + índices)
+- "bin abrir":    SnapshotBinario, solo abrir con mmap (sin materializar productos)
+- "bin buscar":   SnapshotBinario, abrir + 1000 búsquedas por ID (carga perezosa)
+
+Uso:
+    python benchmark_carga.py [--n 1000000] [--directorio /tmp]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from formato_binario import SnapshotBinario
+from inventario_avanzado import Inventario, Producto, parsear_snapshot
+
+CATEGORIAS = ["Lácteos", "Panadería", "Bebidas", "Limpieza", "Snacks", "Frutas", "Carnes", "Congelados"]
+
+
+def preparar(directorio, n):
+    productos = [Producto(f"P{i:07d}", f"Producto {i}", i % 100, 1.0 + (i % 50) / 4, CATEGORIAS[i % len(CATEGORIAS)])
+                 for i in range(n)]
+    ruta_csv = os.path.join(directorio, "bench_carga.csv")
+    ruta_bin = os.path.join(directorio, "bench_carga.bin")
+    for ruta in (ruta_csv, ruta_bin):
+        inventario = Inventario(ruta, durabilidad="ninguna", generaciones=0)
+        for p in productos:
+            inventario._indexar(p)
+        inventario.guardar()
+    return ruta_csv, ruta_bin
+
+
+def cronometrar(funcion):
+    inicio = time.perf_counter()
+    funcion()
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de carga CSV vs. binario con mmap.")
+    parser.add_argument("--n", type=int, default=1_000_000)
+    parser.add_argument("--directorio", default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    ruta_csv, ruta_bin = preparar(args.directorio, args.n)
+    ids = [f"P{random.randrange(args.n):07d}" for _ in range(1000)]
+
+    def leer_bin():
+        with SnapshotBinario(ruta_bin, fabrica=Producto) as snapshot:
+            for _ in snapshot:
+                pass
+
+    def abrir():
+        SnapshotBinario(ruta_bin).cerrar()
+
+    def buscar():
+        with SnapshotBinario(ruta_bin, fabrica=Producto) as snapshot:
+            for id_unico in ids:
+                snapshot.buscar_id(id_unico)
+
+    print(f"Productos: {args.n}  (csv {os.path.getsize(ruta_csv) / 1e6:.1f} MB, "
+          f"bin {os.path.getsize(ruta_bin) / 1e6:.1f} MB)")
+    print(f"{'carga':<12} | {'segundos':>10}")
+    print("-" * 25)
+    for nombre, funcion in (("csv leer", lambda: parsear_snapshot(ruta_csv, procesos=1)),
+                            ("bin leer", leer_bin),
+                            ("csv", lambda: Inventario(ruta_csv, procesos=1)),
+                            ("bin", lambda: Inventario(ruta_bin)),
+                            ("bin abrir", abrir),
+                            ("bin buscar", buscar)):
+        print(f"{nombre:<12} | {cronometrar(funcion):>10.4f}")
+
+    for ruta in (ruta_csv, ruta_bin):
+        os.remove(ruta)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de memoria por producto (tracemalloc).
+
+Compara cómo guarda el inventario N productos:
+- "dict":      Producto con __dict__ (como en la versión original de Semana 09/10)
+- "tupla":     Producto que envuelve una tupla en self.datos (versión original de Semana 11)
+- "slots":     Producto actual con __slots__ (incluye nombre_min, el nombre en
+               minúsculas que se guarda para la búsqueda)
+- "columnar":  AlmacenColumnar (arrays de cantidad/precio + strings internados)
+
+Solo se mide el almacenamiento ID -> producto (sin índices de búsqueda).
+
+Uso:
+    python benchmark_memoria.py [--n 1000000]
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from inventario_avanzado import AlmacenColumnar, Producto
+
+
+# ---------------------------
+# Versiones anteriores (referencia)
+# ---------------------------
+class ProductoConDict:
+    def __init__(self, id_unico, nombre, cantidad, precio, categoria):
+        self.id = id_unico
+        self.nombre = nombre
+        self.cantidad = cantidad
+        self.precio = precio
+        self.categoria = categoria
+
+
+class ProductoTupla:
+    def __init__(self, id_unico, nombre, cantidad, precio, categoria):
+        self.datos = (id_unico, nombre, cantidad, precio, categoria)
+
+
+# ---------------------------
+# Medición
+# ---------------------------
+CATEGORIAS = ["Lácteos", "Panadería", "Bebidas", "Limpieza", "Snacks", "Frutas", "Carnes", "Congelados"]
+
+
+def datos_de_prueba(n):
+    # Las categorías se arman como strings nuevos (como al leer un CSV), no como literales compartidos
+    for i in range(n):
+        categoria = CATEGORIAS[i % len(CATEGORIAS)]
+        yield (f"P{i:07d}", f"Producto {i}", i % 100, 1.0 + (i % 50) / 4,
+               categoria[:1] + categoria[1:])
+
+
+def medir(nombre, n):
+    gc.collect()
+    tracemalloc.start()
+    if nombre == "columnar":
+        almacen = AlmacenColumnar()
+    else:
+        almacen = {}
+    clase = {"dict": ProductoConDict, "tupla": ProductoTupla, "slots": Producto, "columnar": Producto}[nombre]
+    for id_unico, nom, cantidad, precio, categoria in datos_de_prueba(n):
+        almacen[id_unico] = clase(id_unico, nom, cantidad, precio, categoria)
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del almacen
+    return actual / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes por producto según la representación.")
+    parser.add_argument("--n", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"Productos: {args.n}")
+    print(f"{'representación':<15} | {'bytes/producto':>15}")
+    print("-" * 34)
+    for nombre in ("dict", "tupla", "slots", "columnar"):
+        print(f"{nombre:<15} | {medir(nombre, args.n):>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Prueba de carga del servidor de inventario.
+
+Lanza `--clientes` tareas concurrentes que comparten un ClienteInventario (pool de
+conexiones con pipelining) y hacen una mezcla de consultas y cambios durante
+`--segundos`. Informa peticiones por segundo y latencias p50/p99, y cuántos lotes
+usó el servidor para guardar los cambios.
+
+Sin --puerto se levanta un servidor propio (en este mismo proceso) sobre un
+inventario temporal de --productos productos.
+
+Uso:
+    python carga_servidor.py [--clientes 64] [--conexiones 4] [--segundos 5] [--escrituras 0.3]
+    python carga_servidor.py --host 127.0.0.1 --puerto 8765
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from cliente_inventario import ClienteInventario
+from inventario_avanzado import Inventario, Producto
+from servidor_inventario import ServicioInventario, ServidorInventario
+
+
+def preparar_inventario(ruta, n):
+    inventario = Inventario(ruta, durabilidad="ninguna", generaciones=0)
+    with inventario.transaccion():
+        for i in range(n):
+            inventario.agregar(Producto(f"P{i:06d}", f"Producto {i}", 100, 1.0 + i % 50, f"Cat{i % 8}"))
+    return inventario
+
+
+async def trabajador(cliente, n_productos, escrituras, hasta, latencias, errores):
+    while time.perf_counter() < hasta:
+        id_producto = f"P{random.randrange(n_productos):06d}"
+        inicio = time.perf_counter()
+        if random.random() < escrituras:
+            ok, _, _ = await cliente.actualizar_cantidad(id_producto, random.randint(0, 200))
+        elif random.random() < 0.5:
+            ok, _, _ = await cliente.obtener(id_producto)
+        else:
+            ok, _, _ = await cliente.buscar(f"producto {random.randrange(n_productos)}")
+        latencias.append(time.perf_counter() - inicio)
+        if not ok:
+            errores.append(id_producto)
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+async def main_async(args):
+    servidor = None
+    if args.puerto is None:
+        ruta = os.path.join(tempfile.mkdtemp(), "inventario_carga.csv")
+        inventario = preparar_inventario(ruta, args.productos)
+        servicio = ServicioInventario(inventario, args.ventana_ms / 1000, args.max_lote)
+        servidor = await ServidorInventario(servicio, "127.0.0.1", 0).iniciar()
+        args.host, args.puerto = servidor.host, servidor.puerto
+
+    latencias, errores = [], []
+    async with ClienteInventario(args.host, args.puerto, args.conexiones) as cliente:
+        await cliente.ping()
+        hasta = time.perf_counter() + args.segundos
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabajador(cliente, args.productos, args.escrituras, hasta, latencias, errores)
+                               for _ in range(args.clientes)))
+        duracion = time.perf_counter() - inicio
+
+    print(f"Clientes: {args.clientes}  Conexiones: {args.conexiones}  Escrituras: {args.escrituras:.0%}")
+    print(f"Peticiones: {len(latencias)} en {duracion:.2f} s -> {len(latencias) / duracion:,.0f} req/s")
+    print(f"Latencia p50: {percentil(latencias, 0.50) * 1000:.2f} ms   p99: {percentil(latencias, 0.99) * 1000:.2f} ms")
+    print(f"Respuestas con error: {len(errores)}")
+    if servidor is not None:
+        await servidor.cerrar()
+        s = servidor.servicio
+        if s.lotes_guardados:
+            print(f"Lotes guardados: {s.lotes_guardados} ({s.cambios_guardados / s.lotes_guardados:.1f} cambios por escritura)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del servidor de inventario.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=None, help="servidor ya en marcha (si no, se levanta uno)")
+    parser.add_argument("--productos", type=int, default=10_000)
+    parser.add_argument("--clientes", type=int, default=64, help="tareas concurrentes")
+    parser.add_argument("--conexiones", type=int, default=4, help="tamaño del pool de conexiones")
+    parser.add_argument("--segundos", type=float, default=5.0)
+    parser.add_argument("--escrituras", type=float, default=0.3, help="fracción de peticiones que modifican")
+    parser.add_argument("--ventana-ms", type=float, default=5.0)
+    parser.add_argument("--max-lote", type=int, default=256)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
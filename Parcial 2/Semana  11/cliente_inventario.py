@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Cliente del servidor de inventario (asyncio)
+Autor: Leslye Valencia
+
+Descripción:
+- Mantiene un pool de conexiones abiertas al servidor y las reutiliza (no se abre
+  un socket por petición).
+- Cada conexión admite pipelining: varias peticiones en vuelo a la vez; las respuestas
+  llegan en orden y se emparejan por su "id".
+- Las peticiones se reparten entre las conexiones del pool por turnos.
+
+Ejemplo:
+    async def main():
+        async with ClienteInventario("127.0.0.1", 8765, conexiones=4) as cliente:
+            ok, msg, _ = await cliente.actualizar_cantidad("P001", 7)
+            ok, msg, productos = await cliente.buscar("leche")
+    asyncio.run(main())
+"""
+
+import asyncio
+import itertools
+import json
+
+LIMITE_LINEA = 1024 * 1024
+
+
+class ErrorConexion(Exception):
+    """
+    La conexión con el servidor se cerró o no se pudo abrir.
+    """
+
+
+# ---------------------------
+# Una conexión (con pipelining)
+# ---------------------------
+class _Conexion:
+    def __init__(self, host, puerto):
+        self.host = host
+        self.puerto = puerto
+        self._reader = None
+        self._writer = None
+        self._lector = None
+        self._en_vuelo = {}   # id de petición -> futuro de su respuesta
+        self._ids = itertools.count(1)
+        self._abriendo = None
+
+    @property
+    def abierta(self):
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def _abrir(self):
+        try:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.puerto, limit=LIMITE_LINEA)
+        except OSError as e:
+            raise ErrorConexion(f"No se pudo conectar a {self.host}:{self.puerto}: {e}") from e
+        self._lector = asyncio.create_task(self._leer_respuestas())
+
+    async def asegurar_abierta(self):
+        # Varias corrutinas pueden pedir la misma conexión a la vez: se abre una sola vez
+        if self.abierta:
+            return
+        if self._abriendo is None:
+            self._abriendo = asyncio.ensure_future(self._abrir())
+        try:
+            await asyncio.shield(self._abriendo)
+        finally:
+            if self._abriendo is not None and self._abriendo.done():
+                self._abriendo = None
+
+    async def llamar(self, peticion):
+        await self.asegurar_abierta()
+        writer = self._writer
+        if writer is None:
+            raise ErrorConexion("El servidor cerró la conexión.")
+        id_peticion = next(self._ids)
+        futuro = asyncio.get_running_loop().create_future()
+        self._en_vuelo[id_peticion] = futuro
+        datos = dict(peticion, id=id_peticion)
+        writer.write(json.dumps(datos, ensure_ascii=False).encode("utf-8") + b"\n")
+        try:
+            await writer.drain()
+        except ConnectionError as e:
+            self._en_vuelo.pop(id_peticion, None)
+            raise ErrorConexion(f"Se perdió la conexión: {e}") from e
+        return await futuro
+
+    async def _leer_respuestas(self):
+        error = ErrorConexion("El servidor cerró la conexión.")
+        try:
+            while True:
+                linea = await self._reader.readline()
+                if not linea:
+                    break
+                respuesta = json.loads(linea)
+                futuro = self._en_vuelo.pop(respuesta.get("id"), None)
+                if futuro is not None and not futuro.done():
+                    futuro.set_result(respuesta)
+        except (ConnectionError, ValueError) as e:
+            error = ErrorConexion(f"Se perdió la conexión: {e}")
+        finally:
+            # Las peticiones que quedaron sin respuesta fallan; la próxima llamada reconecta
+            for futuro in self._en_vuelo.values():
+                if not futuro.done():
+                    futuro.set_exception(error)
+            self._en_vuelo.clear()
+            if self._writer is not None:
+                self._writer.close()
+            self._writer = None
+
+    async def cerrar(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+        if self._lector is not None:
+            await asyncio.gather(self._lector, return_exceptions=True)
+
+
+# ---------------------------
+# Cliente con pool de conexiones
+# ---------------------------
+class ClienteInventario:
+    def __init__(self, host="127.0.0.1", puerto=8765, conexiones=4):
+        self._pool = [_Conexion(host, puerto) for _ in range(max(1, conexiones))]
+        self._turno = itertools.cycle(self._pool)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, tipo, valor, traza):
+        await self.cerrar()
+        return False
+
+    async def cerrar(self):
+        await asyncio.gather(*(c.cerrar() for c in self._pool))
+
+    async def llamar(self, op, **argumentos):
+        """
+        Envía una petición y espera su respuesta. Retorna (ok, msg, datos).
+        Lanza ErrorConexion si no hay conexión con el servidor.
+        """
+        respuesta = await next(self._turno).llamar(dict(argumentos, op=op))
+        return respuesta["ok"], respuesta["msg"], respuesta.get("datos")
+
+    # Atajos ------------------
+    async def ping(self):
+        return await self.llamar("ping")
+
+    async def obtener(self, id_producto):
+        return await self.llamar("obtener", id_producto=id_producto)
+
+    async def listar(self, desde=0, limite=100):
+        return await self.llamar("listar", desde=desde, limite=limite)
+
+    async def buscar(self, nombre):
+        return await self.llamar("buscar", nombre=nombre)
+
+    async def agregar(self, id_producto, nombre, cantidad, precio, categoria=""):
+        return await self.llamar("agregar", producto={"id": id_producto, "nombre": nombre, "cantidad": cantidad,
+                                                      "precio": precio, "categoria": categoria})
+
+    async def eliminar(self, id_producto):
+        return await self.llamar("eliminar", id_producto=id_producto)
+
+    async def actualizar_nombre(self, id_producto, nombre):
+        return await self.llamar("actualizar_nombre", id_producto=id_producto, nombre=nombre)
+
+    async def actualizar_cantidad(self, id_producto, cantidad):
+        return await self.llamar("actualizar_cantidad", id_producto=id_producto, cantidad=cantidad)
+
+    async def actualizar_precio(self, id_producto, precio):
+        return await self.llamar("actualizar_precio", id_producto=id_producto, precio=precio)
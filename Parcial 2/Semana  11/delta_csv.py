@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+Exportación incremental (deltas) del Inventario
+Autor: Leslye Valencia
+
+Descripción:
+- En lugar de enviar inventario.csv completo en cada sincronización, se exportan solo
+  los productos agregados, modificados o eliminados desde el último punto de control.
+- RegistroDelta escucha los eventos de cambio del Inventario (eventos_inventario.py) y
+  junta los IDs modificados; exportar() escribe el delta y deja un punto de control nuevo.
+  Varios cambios al mismo producto quedan en una sola fila, y un producto que volvió a
+  su valor del punto de control no se exporta.
+- Sin el proceso del Inventario, el delta también se arma desde el archivo de eventos
+  (FeedEventos) a partir de una secuencia.
+- Con `punto_control`, la última secuencia exportada se guarda en un archivo y la sesión
+  siguiente retoma desde ahí (con el feed, para que la secuencia no vuelva a 0).
+- Un delta nunca se sobrescribe: si el archivo ya existe, la exportación falla.
+- fusionar() aplica una cadena de deltas, en orden, a un snapshot base y escribe el
+  inventario resultante: mismo contenido y orden que el inventario.csv original (salvo
+  un producto restaurado por una transacción revertida, que el Inventario pasa al final).
+
+Formato del delta (CSV con la misma línea de control #fin y CRC32 que inventario.csv):
+    op,id,nombre,cantidad,precio,categoria
+    #rango,120,250                  secuencias de eventos que cubre (después de 120 hasta 250)
+    U,P001,Leche,10,1.5,Lácteos     modificado: se reemplaza en su lugar
+    D,P002                          eliminado
+    I,P900,Yerba,5,3.2,Almacén      alta: va al final (si ya estaba, se mueve al final)
+    #fin,4,<crc32>
+
+Uso:
+    registro = RegistroDelta(inventario, punto_control="inventario.punto_control.csv")
+    ...
+    registro.exportar("inventario.delta-250.csv")
+    python delta_csv.py exportar --feed inventario.eventos --desde 120 -o inventario.delta-250.csv
+    python delta_csv.py fusionar base.csv delta-250.csv delta-400.csv -o inventario.csv
+"""
+
+import argparse
+import csv
+import math
+import os
+import sys
+
+from inventario_avanzado import MARCA_FIN, escribir_snapshot_atomico, parsear_snapshot, verificar_snapshot
+
+ENCABEZADO_DELTA = ["op", "id", "nombre", "cantidad", "precio", "categoria"]
+ENCABEZADO_INVENTARIO = ["id", "nombre", "cantidad", "precio", "categoria"]
+ENCABEZADO_PUNTO_CONTROL = ["secuencia"]
+MARCA_RANGO = "#rango"
+
+
+# ---------------------------
+# Cambios acumulados por producto
+# ---------------------------
+def acumular(sucios, eventos):
+    """
+    Junta eventos en `sucios`: ID -> [fila en el punto de control, fila actual, secuencia del último alta].
+    Las filas son None si el producto no existía (antes) o ya no existe (ahora).
+    """
+    for evento in eventos:
+        estado = sucios.get(evento.id_producto)
+        if estado is None:
+            sucios[evento.id_producto] = estado = [evento.antes, evento.despues, None]
+        else:
+            estado[1] = evento.despues
+        if evento.tipo == "agregado":
+            estado[2] = evento.secuencia
+
+
+def filas_delta(sucios):
+    """
+    Filas del delta: primero modificaciones y bajas, después las altas en el orden en
+    que se agregaron (así al fusionar quedan al final, como en el Inventario).
+    """
+    cambios, altas = [], []
+    for id_unico, (antes, despues, alta) in sucios.items():
+        if despues is None:
+            if antes is not None:
+                cambios.append(["D", id_unico])
+        elif alta is not None:
+            # Nuevo, o eliminado y vuelto a agregar (en el Inventario pasó al final)
+            altas.append((alta, ["I", *despues]))
+        elif antes != despues:
+            cambios.append(["U", *despues])
+    altas.sort(key=lambda alta: alta[0])
+    return cambios + [fila for _, fila in altas]
+
+
+# ---------------------------
+# Archivos delta
+# ---------------------------
+def escribir_delta(ruta, filas, desde, hasta, durabilidad="archivo"):
+    # Escritura atómica, igual que el snapshot; un delta no guarda generaciones.
+    # Uno que ya existe no se pisa: se perdería un tramo de la cadena.
+    if os.path.exists(ruta):
+        raise FileExistsError(f"El delta '{ruta}' ya existe; no se sobrescribe.")
+    escribir_snapshot_atomico(ruta, ENCABEZADO_DELTA, [[MARCA_RANGO, desde, hasta], *filas],
+                              durabilidad, generaciones=0)
+
+
+def leer_delta(ruta):
+    """
+    Retorna (desde, hasta, cambios) con cambios = [(op, datos), ...]:
+    datos es el ID para "D" y la fila (id, nombre, cantidad, precio, categoria) para "I"/"U".
+    Lanza ValueError si el delta está dañado, incompleto o mal formado.
+    """
+    if verificar_snapshot(ruta) != "ok":
+        raise ValueError(f"El delta '{ruta}' está dañado o incompleto (CRC o línea de control).")
+    with open(ruta, newline="", encoding="utf-8") as f:
+        lector = csv.reader(f)
+        if next(lector, None) != ENCABEZADO_DELTA:
+            raise ValueError(f"'{ruta}' no es un archivo delta.")
+        rango = next(lector, None)
+        if not rango or rango[0] != MARCA_RANGO or len(rango) != 3:
+            raise ValueError(f"'{ruta}' no tiene la línea {MARCA_RANGO}.")
+        desde, hasta = int(rango[1]), int(rango[2])
+        cambios = []
+        for n, fila in enumerate(lector, start=3):
+            if fila and fila[0] == MARCA_FIN:
+                break
+            try:
+                if fila[0] == "D" and len(fila) == 2:
+                    cambios.append(("D", fila[1]))
+                elif fila[0] in ("I", "U") and len(fila) == 6:
+                    _, id_unico, nombre, cantidad, precio, categoria = fila
+                    precio = float(precio)
+                    if not math.isfinite(precio):
+                        raise ValueError(f"precio no finito: {fila[4]!r}")
+                    cambios.append((fila[0], (id_unico, nombre, int(cantidad), precio, categoria)))
+                else:
+                    raise ValueError("operación o cantidad de campos inválida")
+            except (IndexError, ValueError) as e:
+                raise ValueError(f"'{ruta}', línea {n}: {e}") from e
+    return desde, hasta, cambios
+
+
+def leer_punto_control(ruta):
+    """
+    Última secuencia exportada guardada en `ruta` (0 si el archivo todavía no existe).
+    Lanza ValueError si está dañado.
+    """
+    if not os.path.exists(ruta):
+        return 0
+    if verificar_snapshot(ruta) != "ok":
+        raise ValueError(f"El punto de control '{ruta}' está dañado o incompleto.")
+    with open(ruta, newline="", encoding="utf-8") as f:
+        filas = list(csv.reader(f))
+    try:
+        if filas[0] != ENCABEZADO_PUNTO_CONTROL:
+            raise ValueError("encabezado inválido")
+        return int(filas[1][0])
+    except (IndexError, ValueError) as e:
+        raise ValueError(f"'{ruta}' no es un punto de control: {e}") from e
+
+
+def escribir_punto_control(ruta, secuencia, durabilidad="archivo"):
+    escribir_snapshot_atomico(ruta, ENCABEZADO_PUNTO_CONTROL, [[secuencia]], durabilidad, generaciones=0)
+
+
+# ---------------------------
+# Registro de cambios en vivo
+# ---------------------------
+class RegistroDelta:
+    """
+    Lleva los IDs modificados del Inventario desde el último punto de control.
+    Solo ve cambios confirmados (una transacción abierta o revertida no cuenta).
+    Sin archivo de eventos, cubre los cambios de este proceso; con feed_desde se
+    recuperan también los anteriores (p. ej. tras reiniciar) desde inventario.eventos.feed.
+    Con punto_control (ruta), feed_desde sale de ese archivo y exportar() lo actualiza.
+    Necesita el feed: sin él la secuencia vuelve a 0 en cada proceso y dos sesiones
+    exportarían el mismo rango.
+    """
+    def __init__(self, inventario, feed_desde=None, punto_control=None):
+        self.inventario = inventario
+        self.sucios = {}
+        self.punto_control = punto_control
+        bus = inventario.eventos
+        self.desde = self.hasta = bus.secuencia  # rango de secuencias del delta en curso
+        if punto_control is not None:
+            if bus.feed is None:
+                raise ValueError("El punto de control necesita el archivo de eventos (feed) del inventario.")
+            if feed_desde is None:
+                feed_desde = leer_punto_control(punto_control)
+        if feed_desde is not None:
+            if bus.feed is None:
+                raise ValueError("El inventario no tiene archivo de eventos (feed).")
+            if feed_desde > bus.secuencia:
+                raise ValueError(f"La secuencia {feed_desde} es posterior al último evento del feed "
+                                 f"({bus.secuencia}).")
+            acumular(self.sucios, bus.feed.leer(desde=feed_desde))
+            self.desde = feed_desde
+        bus.escuchar(self._registrar)
+
+    def _registrar(self, eventos):
+        acumular(self.sucios, eventos)
+        self.hasta = eventos[-1].secuencia
+
+    @property
+    def pendientes(self):
+        # Productos tocados desde el punto de control
+        return len(self.sucios)
+
+    def exportar(self, ruta, durabilidad="archivo"):
+        """
+        Escribe el delta y fija un punto de control nuevo. Retorna las filas escritas.
+        Si la escritura falla (OSError, también FileExistsError si `ruta` ya existe)
+        los cambios siguen pendientes.
+        """
+        filas = filas_delta(self.sucios)
+        escribir_delta(ruta, filas, self.desde, self.hasta, durabilidad)
+        if self.punto_control is not None:
+            escribir_punto_control(self.punto_control, self.hasta, durabilidad)
+        self.sucios = {}
+        self.desde = self.hasta
+        return len(filas)
+
+    def cerrar(self):
+        self.inventario.eventos.dejar_de_escuchar(self._registrar)
+
+
+def exportar_desde_feed(feed, desde, ruta, durabilidad="archivo"):
+    """
+    Delta de los eventos del feed posteriores a `desde`. Retorna (filas, hasta);
+    `hasta` es el `desde` de la próxima exportación.
+    """
+    sucios = {}
+    hasta = desde
+    for evento in feed.leer(desde=desde):
+        acumular(sucios, (evento,))
+        hasta = evento.secuencia
+    filas = filas_delta(sucios)
+    escribir_delta(ruta, filas, desde, hasta, durabilidad)
+    return len(filas), hasta
+
+
+# ---------------------------
+# Fusión: base + deltas
+# ---------------------------
+def fusionar(base, deltas, destino, verificar_cadena=True, durabilidad="archivo", generaciones=2):
+    """
+    Aplica los deltas, en orden, al snapshot `base` y escribe el resultado en `destino`.
+    Con verificar_cadena, cada delta debe empezar donde terminó el anterior (si falta
+    uno, se detiene antes de escribir nada). Retorna la cantidad de productos resultante.
+    """
+    if verificar_snapshot(base) == "dañado":
+        raise ValueError(f"El snapshot base '{base}' está dañado.")
+    productos = {}
+    for _, _, filas, _ in parsear_snapshot(base):
+        for fila in filas:
+            # ID repetido: gana la última línea, como al cargar el Inventario
+            productos.pop(fila[0], None)
+            productos[fila[0]] = fila
+
+    anterior = None
+    for ruta in deltas:
+        desde, hasta, cambios = leer_delta(ruta)
+        if verificar_cadena and anterior is not None and desde != anterior:
+            raise ValueError(f"Cadena de deltas incompleta: '{ruta}' empieza en {desde} "
+                             f"y el anterior termina en {anterior}.")
+        for op, datos in cambios:
+            if op == "D":
+                productos.pop(datos, None)
+            elif op == "U":
+                productos[datos[0]] = datos
+            else:
+                productos.pop(datos[0], None)
+                productos[datos[0]] = datos
+        anterior = hasta
+
+    escribir_snapshot_atomico(destino, ENCABEZADO_INVENTARIO, productos.values(), durabilidad, generaciones)
+    return len(productos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deltas del inventario: exportar y fusionar.")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    exportar = comandos.add_parser("exportar", help="delta desde el archivo de eventos")
+    exportar.add_argument("--feed", required=True, help="archivo de eventos (FeedEventos)")
+    exportar.add_argument("--desde", type=int, required=True, help="última secuencia ya exportada")
+    exportar.add_argument("-o", "--salida", required=True)
+    fusion = comandos.add_parser("fusionar", help="aplicar deltas a un snapshot base")
+    fusion.add_argument("base")
+    fusion.add_argument("deltas", nargs="+")
+    fusion.add_argument("-o", "--salida", required=True)
+    fusion.add_argument("--sin-verificar-cadena", action="store_true")
+    args = parser.parse_args()
+
+    try:
+        if args.comando == "exportar":
+            from eventos_inventario import FeedEventos
+            feed = FeedEventos(args.feed)
+            try:
+                filas, hasta = exportar_desde_feed(feed, args.desde, args.salida)
+            finally:
+                feed.cerrar()
+            print(f"{filas} fila(s) en '{args.salida}'. Próxima exportación: --desde {hasta}")
+        else:
+            total = fusionar(args.base, args.deltas, args.salida, not args.sin_verificar_cadena)
+            print(f"{len(args.deltas)} delta(s) aplicados: {total} producto(s) en '{args.salida}'.")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
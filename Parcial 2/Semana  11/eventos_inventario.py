@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+"""
+Eventos de cambio del Inventario (change data capture)
+Autor: Leslye Valencia
+
+Descripción:
+- Cada cambio confirmado del Inventario (agregar, eliminar, actualizar_*) genera un
+  EventoCambio con número de secuencia, el producto antes y después del cambio.
+  Los cambios de una transacción se publican juntos al confirmarla; si se revierte,
+  no se publica nada.
+- BusEventos: pub/sub dentro del proceso. Cada suscriptor tiene una cola con capacidad
+  limitada; si se llena, según su política:
+    "bloquear":  el Inventario espera hasta `espera` segundos a que el suscriptor lea;
+                 si no lo hace, la suscripción se cierra (desbordada) para no frenar
+                 el inventario para siempre.
+    "descartar": se pierde el evento más antiguo de esa cola (se cuentan en `perdidos`).
+  En ambos casos el suscriptor puede recuperar lo que le falta desde el feed.
+  Para quien necesita todos los eventos sin cola (p. ej. el registro de deltas de
+  delta_csv.py) hay oyentes: funciones que se llaman en el mismo hilo al publicar.
+- FeedEventos: archivo de eventos en disco (una línea JSON por evento, solo se agrega
+  al final). Un consumidor guarda la última secuencia que procesó y retoma con
+  leer(desde=secuencia); la posición se encuentra con búsqueda binaria en el archivo.
+
+Ejemplo:
+    bus = BusEventos(FeedEventos("inventario.eventos"))
+    inventario = Inventario("inventario.csv", eventos=bus)
+    suscripcion = bus.suscribir(capacidad=1000, tipos={"cantidad"})
+    for evento in suscripcion:          # en otro hilo
+        print(evento.secuencia, evento.id_producto, evento.despues)
+    for evento in bus.feed.leer(desde=1500):
+        ...
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+TIPOS_EVENTO = ("agregado", "eliminado", "nombre", "cantidad", "precio")
+POLITICAS = ("bloquear", "descartar")
+
+
+# ---------------------------
+# Evento
+# ---------------------------
+class EventoCambio:
+    """
+    Un cambio confirmado. `antes` y `despues` son filas (id, nombre, cantidad, precio, categoria);
+    `antes` es None en un alta y `despues` es None en una baja.
+    """
+    __slots__ = ("secuencia", "tipo", "id_producto", "antes", "despues", "momento")
+
+    def __init__(self, secuencia, tipo, id_producto, antes, despues, momento):
+        self.secuencia = secuencia
+        self.tipo = tipo
+        self.id_producto = id_producto
+        self.antes = antes
+        self.despues = despues
+        self.momento = momento
+
+    def a_dict(self):
+        return {"seq": self.secuencia, "tipo": self.tipo, "id": self.id_producto,
+                "antes": self.antes, "despues": self.despues, "t": self.momento}
+
+    @classmethod
+    def desde_dict(cls, d):
+        antes = tuple(d["antes"]) if d["antes"] is not None else None
+        despues = tuple(d["despues"]) if d["despues"] is not None else None
+        return cls(d["seq"], d["tipo"], d["id"], antes, despues, d["t"])
+
+    def __repr__(self):
+        return f"EventoCambio({self.secuencia}, {self.tipo!r}, {self.id_producto!r}, {self.antes}, {self.despues})"
+
+
+# ---------------------------
+# Suscripción (cola limitada)
+# ---------------------------
+class Suscripcion:
+    def __init__(self, bus, capacidad, politica, espera, tipos):
+        if capacidad < 1:
+            raise ValueError("capacidad debe ser al menos 1")
+        if politica not in POLITICAS:
+            raise ValueError(f"politica debe ser una de {POLITICAS}")
+        self.bus = bus
+        self.capacidad = capacidad
+        self.politica = politica
+        self.espera = espera                            # segundos máximos de bloqueo (política "bloquear")
+        self.tipos = frozenset(tipos) if tipos else None  # None = todos los tipos
+        self.perdidos = 0                # eventos descartados por cola llena
+        self.desbordada = False          # se cerró porque no leía a tiempo
+        self.ultima_secuencia = 0        # última secuencia entregada con obtener()
+        self.cerrada = False
+        self._cola = deque()
+        self._condicion = threading.Condition()
+
+    def __len__(self):
+        return len(self._cola)
+
+    def _entregar(self, eventos):
+        # Lo llama el bus (hilo del Inventario)
+        with self._condicion:
+            for evento in eventos:
+                if self.cerrada:
+                    return
+                if self.tipos is not None and evento.tipo not in self.tipos:
+                    continue
+                if len(self._cola) >= self.capacidad:
+                    if self.politica == "descartar":
+                        self._cola.popleft()
+                        self.perdidos += 1
+                    elif not self._condicion.wait_for(lambda: len(self._cola) < self.capacidad or self.cerrada,
+                                                      self.espera):
+                        # El consumidor no avanza: se lo desconecta y retoma desde el feed
+                        self.desbordada = True
+                        self.cerrada = True
+                        self._condicion.notify_all()
+                        return
+                    if self.cerrada:
+                        return
+                self._cola.append(evento)
+            self._condicion.notify_all()
+
+    def obtener(self, timeout=None):
+        """
+        Siguiente evento; espera hasta `timeout` segundos (None = sin límite).
+        Retorna None si se cumple el tiempo o si la suscripción está cerrada y sin eventos.
+        """
+        with self._condicion:
+            if not self._condicion.wait_for(lambda: self._cola or self.cerrada, timeout) or not self._cola:
+                return None
+            evento = self._cola.popleft()
+            self.ultima_secuencia = evento.secuencia
+            # Hay lugar en la cola: puede seguir un publicador bloqueado
+            self._condicion.notify_all()
+            return evento
+
+    def obtener_lote(self, maximo=1000):
+        """
+        Todos los eventos pendientes (hasta `maximo`) sin esperar.
+        """
+        with self._condicion:
+            lote = [self._cola.popleft() for _ in range(min(maximo, len(self._cola)))]
+            if lote:
+                self.ultima_secuencia = lote[-1].secuencia
+                self._condicion.notify_all()
+            return lote
+
+    def __iter__(self):
+        while True:
+            evento = self.obtener()
+            if evento is None:
+                return
+            yield evento
+
+    def cerrar(self):
+        with self._condicion:
+            self.cerrada = True
+            self._condicion.notify_all()
+        self.bus._quitar(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.cerrar()
+        return False
+
+
+# ---------------------------
+# Bus de eventos (pub/sub en el proceso)
+# ---------------------------
+class BusEventos:
+    def __init__(self, feed=None):
+        self.feed = feed                      # FeedEventos opcional (eventos durables)
+        self.secuencia = feed.ultima_secuencia if feed is not None else 0
+        self._suscripciones = []
+        self._oyentes = []                    # funciones oyente(eventos), sin cola
+        self._candado = threading.Lock()      # protege la lista de suscripciones
+        self._publicando = threading.Lock()   # un lote a la vez: todos reciben en orden de secuencia
+
+    @property
+    def activo(self):
+        # Sin suscriptores ni feed no hace falta armar los eventos
+        return self.feed is not None or bool(self._suscripciones) or bool(self._oyentes)
+
+    def suscribir(self, capacidad=1000, politica="bloquear", espera=5.0, tipos=None):
+        """
+        Nueva suscripción que recibe los eventos publicados desde ahora.
+        tipos: conjunto de TIPOS_EVENTO que interesan (None = todos).
+        """
+        if tipos is not None and not set(tipos) <= set(TIPOS_EVENTO):
+            raise ValueError(f"tipos debe ser un subconjunto de {TIPOS_EVENTO}")
+        suscripcion = Suscripcion(self, capacidad, politica, espera, tipos)
+        with self._candado:
+            self._suscripciones.append(suscripcion)
+        return suscripcion
+
+    def escuchar(self, oyente):
+        """
+        Registra oyente(eventos): se llama al publicar cada lote, en el hilo del Inventario
+        y antes de entregar a las colas. Debe ser rápido y no lanzar excepciones.
+        """
+        with self._candado:
+            self._oyentes.append(oyente)
+
+    def dejar_de_escuchar(self, oyente):
+        with self._candado:
+            if oyente in self._oyentes:
+                self._oyentes.remove(oyente)
+
+    def _quitar(self, suscripcion):
+        with self._candado:
+            if suscripcion in self._suscripciones:
+                self._suscripciones.remove(suscripcion)
+
+    def publicar(self, cambios):
+        """
+        Numera y publica una lista de cambios ya confirmados: (tipo, id, antes, despues).
+        Primero se agregan al feed (una sola escritura) y luego se entregan a cada suscriptor.
+        Retorna la lista de EventoCambio.
+        """
+        if not cambios:
+            return []
+        with self._publicando:
+            momento = time.time()
+            eventos = [EventoCambio(self.secuencia + n, tipo, id_producto, antes, despues, momento)
+                       for n, (tipo, id_producto, antes, despues) in enumerate(cambios, start=1)]
+            if self.feed is not None:
+                self.feed.agregar(eventos)
+            self.secuencia += len(eventos)
+            with self._candado:
+                suscripciones = list(self._suscripciones)
+                oyentes = list(self._oyentes)
+            for oyente in oyentes:
+                oyente(eventos)
+            for suscripcion in suscripciones:
+                suscripcion._entregar(eventos)
+                if suscripcion.desbordada:
+                    self._quitar(suscripcion)
+        return eventos
+
+    def cerrar(self):
+        for suscripcion in list(self._suscripciones):
+            suscripcion.cerrar()
+        if self.feed is not None:
+            self.feed.cerrar()
+
+
+# ---------------------------
+# Feed durable en disco
+# ---------------------------
+class FeedEventos:
+    """
+    Archivo de eventos: una línea JSON por evento, en orden de secuencia, solo se agrega al final.
+    Durabilidad como en el Inventario: "ninguna" (buffer del proceso), "archivo" (flush al
+    sistema operativo en cada lote) o "completa" (fsync en cada lote).
+    """
+    def __init__(self, ruta, durabilidad="archivo"):
+        self.ruta = ruta
+        self.durabilidad = durabilidad
+        self.ultima_secuencia = self._reparar()
+        self._archivo = open(ruta, "ab")
+
+    def _reparar(self):
+        # Una línea incompleta al final (corte durante la escritura) se descarta.
+        # Retorna la secuencia del último evento completo.
+        if not os.path.exists(self.ruta):
+            return 0
+        with open(self.ruta, "r+b") as f:
+            tamano = f.seek(0, os.SEEK_END)
+            fin = self._inicio_linea(f, tamano)  # justo después del último salto de línea
+            if fin != tamano:
+                f.truncate(fin)
+            if fin == 0:
+                return 0
+            f.seek(self._inicio_linea(f, fin - 1))
+            return json.loads(f.readline())["seq"]
+
+    @staticmethod
+    def _inicio_linea(f, posicion):
+        # Byte donde empieza la línea que contiene `posicion`
+        while posicion > 0:
+            desde = max(0, posicion - 4096)
+            f.seek(desde)
+            bloque = f.read(posicion - desde)
+            salto = bloque.rfind(b"\n")
+            if salto != -1:
+                return desde + salto + 1
+            posicion = desde
+        return 0
+
+    def agregar(self, eventos):
+        datos = b"".join(json.dumps(e.a_dict(), ensure_ascii=False).encode("utf-8") + b"\n" for e in eventos)
+        posicion = self._archivo.tell()
+        try:
+            self._archivo.write(datos)
+            if self.durabilidad != "ninguna":
+                self._archivo.flush()
+                if self.durabilidad == "completa":
+                    os.fsync(self._archivo.fileno())
+        except OSError:
+            self._recortar(posicion)
+            raise
+        self.ultima_secuencia = eventos[-1].secuencia
+
+    def _recortar(self, posicion):
+        # Si la escritura falla, el archivo se recorta a su tamaño anterior: una línea a
+        # medias en el medio del feed rompería la búsqueda binaria de _posicion.
+        # Se cierra primero para soltar lo que haya quedado en el buffer.
+        try:
+            self._archivo.close()
+        except OSError:
+            pass
+        try:
+            os.truncate(self.ruta, posicion)
+        except OSError:
+            pass  # si tampoco se puede recortar, _reparar descarta la línea incompleta al abrir
+        self._archivo = open(self.ruta, "ab")
+
+    def _posicion(self, f, desde):
+        """
+        Byte de la primera línea con secuencia > desde (búsqueda binaria sobre el archivo:
+        las secuencias crecen de a una, así no se recorre lo que ya se consumió).
+        """
+        bajo, alto = 0, f.seek(0, os.SEEK_END)
+        while bajo < alto:
+            medio = self._inicio_linea(f, (bajo + alto) // 2)
+            f.seek(medio)
+            linea = f.readline()
+            if json.loads(linea)["seq"] <= desde:
+                bajo = medio + len(linea)
+            else:
+                alto = medio
+        return bajo
+
+    def leer(self, desde=0, maximo=None):
+        """
+        Eventos con secuencia mayor que `desde`, en orden. Se puede leer mientras se escribe.
+        """
+        self._archivo.flush()
+        with open(self.ruta, "rb") as f:
+            f.seek(self._posicion(f, desde))
+            leidos = 0
+            for linea in f:
+                if not linea.endswith(b"\n") or (maximo is not None and leidos >= maximo):
+                    return
+                yield EventoCambio.desde_dict(json.loads(linea))
+                leidos += 1
+
+    def cerrar(self):
+        if not self._archivo.closed:
+            self._archivo.flush()
+            self._archivo.close()
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+"""
+Formato binario para el inventario (alternativa al CSV)
+Autor: Leslye Valencia
+
+Descripción:
+- Cada producto es un registro de tamaño fijo con los campos numéricos en binario.
+- Los textos (ID, nombre, categoría) van en una tabla de cadenas sin repetir:
+  una categoría usada por miles de productos se guarda una sola vez.
+- El archivo se abre con mmap: abrirlo es casi instantáneo y cada producto se
+  arma recién cuando se pide (por posición o por ID).
+- Incluye conversores entre inventario.csv (Semana 11), inventario.txt (Semana 10) y .bin.
+
+Estructura del archivo (enteros little-endian):
+    cabecera  : magia, versión, crc32, n_registros, n_cadenas, off_orden, off_offsets, off_textos
+    registros : n_registros x (id_idx u32, nombre_idx u32, categoria_idx u32, cantidad i64, precio f64)
+    orden     : n_registros x u32 -> posiciones de los registros ordenadas por ID (búsqueda binaria)
+    offsets   : (n_cadenas + 1) x u64 -> inicio de cada cadena dentro de textos
+    textos    : cadenas UTF-8 una tras otra
+
+Uso como programa (conversión según la extensión de los archivos):
+    python formato_binario.py inventario.csv inventario.bin
+    python formato_binario.py inventario.bin inventario.txt
+    python formato_binario.py ../"Semana 10"/inventario.txt inventario.bin --categoria General
+"""
+
+import argparse
+import csv
+import math
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+MAGIA = b"INVBIN01"
+VERSION = 1
+CABECERA = struct.Struct("<8sIIIIQQQ")
+REGISTRO = struct.Struct("<IIIqd")
+_U32 = struct.Struct("<I")
+_RANGO = struct.Struct("<QQ")
+
+
+def _little_endian(arreglo):
+    # array usa el orden de bytes de la máquina; el archivo siempre es little-endian
+    if sys.byteorder == "big":
+        arreglo.byteswap()
+    return arreglo.tobytes()
+
+
+# ---------------------------
+# Escritura
+# ---------------------------
+def escribir_binario(ruta, productos, durabilidad="archivo"):
+    """
+    Escribe los productos (objetos con get_id/get_nombre/get_cantidad/get_precio/get_categoria)
+    en formato binario, de forma atómica (temporal + fsync + rename).
+    durabilidad: "ninguna", "archivo" o "completa" (igual que en el CSV).
+    """
+    indices = {}   # texto -> posición en la tabla de cadenas
+    cadenas = []
+
+    def indice(texto):
+        i = indices.get(texto)
+        if i is None:
+            i = indices[texto] = len(cadenas)
+            cadenas.append(texto)
+        return i
+
+    registros = bytearray()
+    ids = []
+    for p in productos:
+        registros += REGISTRO.pack(indice(p.get_id()), indice(p.get_nombre()), indice(p.get_categoria()),
+                                   p.get_cantidad(), p.get_precio())
+        ids.append(p.get_id())
+
+    orden = _little_endian(array("I", sorted(range(len(ids)), key=ids.__getitem__)))
+    codificadas = [c.encode("utf-8") for c in cadenas]
+    offsets = array("Q", [0])
+    for c in codificadas:
+        offsets.append(offsets[-1] + len(c))
+    textos = b"".join(codificadas)
+    offsets = _little_endian(offsets)
+
+    off_orden = CABECERA.size + len(registros)
+    off_offsets = off_orden + len(orden)
+    off_textos = off_offsets + len(offsets)
+    crc = 0
+    for parte in (registros, orden, offsets, textos):
+        crc = zlib.crc32(parte, crc)
+    cabecera = CABECERA.pack(MAGIA, VERSION, crc, len(ids), len(cadenas), off_orden, off_offsets, off_textos)
+
+    temporal = ruta + ".tmp"
+    with open(temporal, mode="wb") as f:
+        for parte in (cabecera, registros, orden, offsets, textos):
+            f.write(parte)
+        f.flush()
+        if durabilidad != "ninguna":
+            os.fsync(f.fileno())
+    os.replace(temporal, ruta)
+    if durabilidad == "completa":
+        from inventario_avanzado import _fsync_directorio
+        _fsync_directorio(ruta)
+
+
+# ---------------------------
+# Lectura con mmap
+# ---------------------------
+class SnapshotBinario:
+    """
+    Acceso de solo lectura a un archivo .bin mediante mmap.
+    Nada se lee por adelantado: cada producto se construye al pedirlo.
+    fabrica(id, nombre, cantidad, precio, categoria) crea cada producto
+    (por defecto devuelve una tupla; el Inventario pasa su clase Producto).
+    """
+    def __init__(self, ruta, fabrica=None):
+        self.ruta = ruta
+        self.fabrica = fabrica or (lambda *campos: campos)
+        self._archivo = open(ruta, mode="rb")
+        try:
+            if os.fstat(self._archivo.fileno()).st_size < CABECERA.size:
+                raise ValueError(f"'{ruta}' es demasiado pequeño para ser un inventario binario.")
+            self._mm = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._archivo.close()
+            raise
+        (magia, version, self.crc, self.n_registros, self.n_cadenas,
+         self._off_orden, self._off_offsets, self._off_textos) = CABECERA.unpack_from(self._mm, 0)
+        if magia != MAGIA or version != VERSION:
+            self.cerrar()
+            raise ValueError(f"'{ruta}' no es un inventario binario válido (versión {VERSION}).")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.cerrar()
+        return False
+
+    def cerrar(self):
+        self._mm.close()
+        self._archivo.close()
+
+    def __len__(self):
+        return self.n_registros
+
+    def _cadena(self, i):
+        inicio, fin = _RANGO.unpack_from(self._mm, self._off_offsets + 8 * i)
+        return self._mm[self._off_textos + inicio:self._off_textos + fin].decode("utf-8")
+
+    def _armar(self, id_i, nombre_i, categoria_i, cantidad, precio):
+        return self.fabrica(self._cadena(id_i), self._cadena(nombre_i), cantidad, precio, self._cadena(categoria_i))
+
+    def __getitem__(self, posicion):
+        if not 0 <= posicion < self.n_registros:
+            raise IndexError(posicion)
+        return self._armar(*REGISTRO.unpack_from(self._mm, CABECERA.size + posicion * REGISTRO.size))
+
+    def cadenas(self):
+        """
+        Decodifica la tabla de cadenas completa en una lista (para recorrer todo el archivo).
+        """
+        offsets = array("Q")
+        offsets.frombytes(self._mm[self._off_offsets:self._off_textos])
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        textos = self._mm[self._off_textos:]
+        return [textos[inicio:fin].decode("utf-8") for inicio, fin in zip(offsets, offsets[1:])]
+
+    def __iter__(self):
+        # Productos en el orden en que se guardaron (orden de inserción del inventario).
+        # Al recorrer todo conviene decodificar la tabla de cadenas una sola vez.
+        cadenas = self.cadenas()
+        fabrica = self.fabrica
+        registros = self._mm[CABECERA.size:self._off_orden]
+        for id_i, nombre_i, categoria_i, cantidad, precio in REGISTRO.iter_unpack(registros):
+            yield fabrica(cadenas[id_i], cadenas[nombre_i], cantidad, precio, cadenas[categoria_i])
+
+    def _id_en(self, k):
+        posicion = _U32.unpack_from(self._mm, self._off_orden + 4 * k)[0]
+        id_i = _U32.unpack_from(self._mm, CABECERA.size + posicion * REGISTRO.size)[0]
+        return self._cadena(id_i), posicion
+
+    def buscar_id(self, id_unico):
+        """
+        Búsqueda binaria por ID sobre la tabla de orden: O(log n), sin cargar el archivo.
+        Retorna el producto o None.
+        """
+        bajo, alto = 0, self.n_registros
+        while bajo < alto:
+            medio = (bajo + alto) // 2
+            id_medio, posicion = self._id_en(medio)
+            if id_medio == id_unico:
+                return self[posicion]
+            if id_medio < id_unico:
+                bajo = medio + 1
+            else:
+                alto = medio
+        return None
+
+    def verificar(self):
+        """
+        Comprueba el CRC32 de todo el contenido (recorre el archivo completo).
+        """
+        crc = 0
+        tamano = len(self._mm)
+        for inicio in range(CABECERA.size, tamano, 1024 * 1024):
+            crc = zlib.crc32(self._mm[inicio:min(inicio + 1024 * 1024, tamano)], crc)
+        return crc == self.crc
+
+
+# ---------------------------
+# Conversores
+# ---------------------------
+class _Fila:
+    """
+    Producto mínimo para escribir filas leídas de un CSV (interfaz get_*).
+    """
+    __slots__ = ("campos",)
+
+    def __init__(self, id_unico, nombre, cantidad, precio, categoria):
+        self.campos = (id_unico, nombre, cantidad, precio, categoria)
+
+    def get_id(self):
+        return self.campos[0]
+
+    def get_nombre(self):
+        return self.campos[1]
+
+    def get_cantidad(self):
+        return self.campos[2]
+
+    def get_precio(self):
+        return self.campos[3]
+
+    def get_categoria(self):
+        return self.campos[4]
+
+
+def leer_csv(ruta, categoria_por_defecto="Sin categoría"):
+    """
+    Lee inventario.csv (id,nombre,cantidad,precio,categoria) o inventario.txt
+    (id,nombre,cantidad,precio) fila por fila. Se salta el encabezado, la línea
+    de control #fin y las filas corruptas, igual que los programas originales.
+    """
+    with open(ruta, mode="r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader, None)  # saltar encabezado
+        for fila in reader:
+            if len(fila) not in (4, 5) or fila[0] == "#fin":
+                continue
+            try:
+                cantidad = int(fila[2])
+                precio = float(fila[3])
+            except ValueError:
+                continue
+            if not math.isfinite(precio):
+                continue
+            categoria = fila[4] if len(fila) == 5 else categoria_por_defecto
+            yield _Fila(fila[0], fila[1], cantidad, precio, categoria)
+
+
+def convertir(origen, destino, categoria_por_defecto="Sin categoría"):
+    """
+    Convierte entre .csv (Semana 11), .txt (Semana 10) y .bin según las extensiones.
+    Retorna la cantidad de productos convertidos.
+    """
+    if origen.endswith(".bin"):
+        with SnapshotBinario(origen, fabrica=_Fila) as snapshot:
+            productos = list(snapshot)
+    else:
+        productos = list(leer_csv(origen, categoria_por_defecto))
+
+    if destino.endswith(".bin"):
+        escribir_binario(destino, productos)
+    else:
+        # Import aquí para que este módulo no dependa del inventario al usarse desde él
+        from inventario_avanzado import escribir_snapshot_atomico
+        if destino.endswith(".txt"):
+            encabezado = ["id", "nombre", "cantidad", "precio"]
+            filas = ([p.get_id(), p.get_nombre(), p.get_cantidad(), f"{p.get_precio():.2f}"] for p in productos)
+        else:
+            encabezado = ["id", "nombre", "cantidad", "precio", "categoria"]
+            filas = ([p.get_id(), p.get_nombre(), p.get_cantidad(), p.get_precio(), p.get_categoria()]
+                     for p in productos)
+        escribir_snapshot_atomico(destino, encabezado, filas, generaciones=0)
+    return len(productos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convierte el inventario entre CSV (.csv/.txt) y binario (.bin).")
+    parser.add_argument("origen")
+    parser.add_argument("destino")
+    parser.add_argument("--categoria", default="Sin categoría",
+                        help="categoría para los productos de un .txt (Semana 10 no guarda categoría)")
+    args = parser.parse_args()
+    try:
+        n = convertir(args.origen, args.destino, args.categoria)
+    except (OSError, ValueError) as e:
+        print(f"Error al convertir: {e}")
+        sys.exit(1)
+    print(f"{n} producto(s) convertidos: {args.origen} -> {args.destino}")
+
+
+if __name__ == "__main__":
+    main()
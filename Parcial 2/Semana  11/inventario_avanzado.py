@@ -6,129 +6,1156 @@ Autor: Leslye Valencia
 Características:
 - Usa POO (clases Producto e Inventario).
 - Maneja colecciones: diccionario, lista, conjunto, tupla.
-- Persiste los datos en archivo CSV (inventario.csv).
+- Persiste los datos en archivo CSV (inventario.csv); el almacenamiento es intercambiable:
+  CSV, binario (.bin) o SQLite (.db, ver almacenamiento_sqlite.py), que guarda solo las
+  filas que cambian en lugar de reescribir el archivo completo.
+- Producto con __slots__ y, opcionalmente, almacenamiento por columnas (arrays) para
+  catálogos de millones de productos.
+- Guardado atómico (temporal + fsync + rename) con generaciones anteriores y CRC32
+  para detectar un archivo dañado y volver a la última versión buena.
+- Índice por categoría con totales (productos, unidades, valor) siempre al día.
+- Índices ordenados por cantidad y precio: rangos, top-k y reporte de bajo stock.
+- Reportes de análisis (valor total, por categoría, clasificación ABC, bajo stock)
+  calculados por columnas, con NumPy si está instalado (ver analitica_inventario.py).
+- Carga por bloques de bytes en paralelo (pool de procesos) para archivos grandes.
+- Transacciones y lotes (bulk_update): muchos cambios, una sola escritura del archivo.
+- Eventos de cambio (eventos_inventario.py): cada cambio confirmado se publica a los
+  suscriptores y, opcionalmente, a un archivo de eventos numerados desde el que otros
+  programas retoman sin comparar snapshots completos.
+- Exportación incremental (delta_csv.py): solo las filas agregadas, modificadas o
+  eliminadas desde el último punto de control, y fusión de deltas sobre un snapshot base.
 - Incluye un menú de consola para interactuar.
 """
 
 import csv
+import io
+import math
 import os
+import shutil
+import sys
+import zlib
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left, insort
+from collections.abc import MutableMapping
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from eventos_inventario import BusEventos, FeedEventos
+
 
 # ---------------------------
 # Clase Producto
 # ---------------------------
-class Producto:
+class _ProductoBase:
+    # Lo común a Producto y ProductoColumnar, escrito solo con los getters.
+    # __slots__ vacío: las subclases no heredan campos que no usan.
+    __slots__ = ()
+
+    @property
+    def datos(self):
+        return (self.get_id(), self.get_nombre(), self.get_cantidad(), self.get_precio(), self.get_categoria())
+
+    def __str__(self):
+        return f"ID: {self.get_id()} | Nombre: {self.get_nombre()} | Cantidad: {self.get_cantidad()} | Precio: {self.get_precio():.2f} | Categoría: {self.get_categoria()}"
+
+
+class Producto(_ProductoBase):
+    # __slots__: sin __dict__ por instancia; cada campo es un atributo propio,
+    # así set_cantidad/set_precio ya no crean una tupla nueva en cada cambio.
+    __slots__ = ("id", "nombre", "nombre_min", "cantidad", "precio", "categoria")
+
     def __init__(self, id_unico, nombre, cantidad, precio, categoria):
-        # tupla para guardar datos básicos
-        self.datos = (id_unico, nombre, cantidad, precio, categoria)
+        self.id = id_unico
+        self.nombre = nombre
+        # nombre en minúsculas guardado una vez, para no recalcularlo en cada búsqueda
+        self.nombre_min = nombre.lower()
+        self.cantidad = cantidad
+        self.precio = precio
+        self.categoria = categoria
+
+    @property
+    def datos(self):
+        # tupla con los datos básicos (como en la versión anterior de la clase)
+        return (self.id, self.nombre, self.cantidad, self.precio, self.categoria)
 
     def get_id(self):
-        return self.datos[0]
+        return self.id
 
     def get_nombre(self):
-        return self.datos[1]
+        return self.nombre
+
+    def get_nombre_min(self):
+        return self.nombre_min
 
     def get_cantidad(self):
-        return self.datos[2]
+        return self.cantidad
 
     def get_precio(self):
-        return self.datos[3]
+        return self.precio
 
     def get_categoria(self):
-        return self.datos[4]
+        return self.categoria
+
+    def set_nombre(self, nuevo_nombre):
+        self.nombre = nuevo_nombre
+        self.nombre_min = nuevo_nombre.lower()
 
     def set_cantidad(self, nueva_cantidad):
-        self.datos = (self.get_id(), self.get_nombre(), nueva_cantidad, self.get_precio(), self.get_categoria())
+        self.cantidad = nueva_cantidad
 
     def set_precio(self, nuevo_precio):
-        self.datos = (self.get_id(), self.get_nombre(), self.get_cantidad(), nuevo_precio, self.get_categoria())
+        self.precio = nuevo_precio
 
-    def __str__(self):
-        return f"ID: {self.get_id()} | Nombre: {self.get_nombre()} | Cantidad: {self.get_cantidad()} | Precio: {self.get_precio():.2f} | Categoría: {self.get_categoria()}"
+
+# ---------------------------
+# Almacenamiento por columnas (opcional)
+# ---------------------------
+class ProductoColumnar(_ProductoBase):
+    """
+    Vista de una fila de AlmacenColumnar con la misma interfaz que Producto.
+    No guarda datos propios: lee y escribe directamente en las columnas.
+    Solo tiene los dos slots de la vista (no hereda los seis de Producto).
+    """
+    __slots__ = ("_almacen", "_fila")
+
+    def __init__(self, almacen, fila):
+        self._almacen = almacen
+        self._fila = fila
+
+    def get_id(self):
+        return self._almacen.ids[self._fila]
+
+    def get_nombre(self):
+        return self._almacen.nombres[self._fila]
+
+    def get_nombre_min(self):
+        # No se guarda una columna extra: se calcula al pedirlo (se prioriza la memoria)
+        return self._almacen.nombres[self._fila].lower()
+
+    def get_cantidad(self):
+        return self._almacen.cantidades[self._fila]
+
+    def get_precio(self):
+        return self._almacen.precios[self._fila]
+
+    def get_categoria(self):
+        return self._almacen.categorias[self._fila]
+
+    def set_nombre(self, nuevo_nombre):
+        self._almacen.nombres[self._fila] = sys.intern(nuevo_nombre)
+
+    def set_cantidad(self, nueva_cantidad):
+        self._almacen.cantidades[self._fila] = nueva_cantidad
+
+    def set_precio(self, nuevo_precio):
+        self._almacen.precios[self._fila] = nuevo_precio
+
+
+class AlmacenColumnar(MutableMapping):
+    """
+    Reemplazo del diccionario ID -> Producto que guarda los datos por columnas:
+    cantidades en array('q'), precios en array('d'), nombres y categorías internados
+    (las categorías repetidas comparten un solo string).
+    Se comporta como un diccionario (in, [], pop, values(), orden de inserción)
+    y entrega los productos como vistas ProductoColumnar.
+    """
+    def __init__(self):
+        self.filas = {}  # ID -> número de fila (el orden de este dict es el de inserción)
+        self.ids = []
+        self.nombres = []
+        self.categorias = []
+        self.cantidades = array("q")
+        self.precios = array("d")
+        self.libres = []  # filas liberadas por bajas, se reutilizan en las altas
+
+    def __len__(self):
+        return len(self.filas)
+
+    def __iter__(self):
+        return iter(self.filas)
+
+    def __contains__(self, id_unico):
+        return id_unico in self.filas
+
+    def __getitem__(self, id_unico):
+        return ProductoColumnar(self, self.filas[id_unico])
+
+    def __setitem__(self, id_unico, producto):
+        valores = (id_unico, sys.intern(producto.get_nombre()), sys.intern(producto.get_categoria()),
+                   producto.get_cantidad(), producto.get_precio())
+        if id_unico in self.filas:
+            del self[id_unico]
+        if self.libres:
+            fila = self.libres.pop()
+            (self.ids[fila], self.nombres[fila], self.categorias[fila],
+             self.cantidades[fila], self.precios[fila]) = valores
+        else:
+            fila = len(self.ids)
+            self.ids.append(valores[0])
+            self.nombres.append(valores[1])
+            self.categorias.append(valores[2])
+            self.cantidades.append(valores[3])
+            self.precios.append(valores[4])
+        self.filas[id_unico] = fila
+
+    def __delitem__(self, id_unico):
+        fila = self.filas.pop(id_unico)
+        # Se sueltan las referencias a los strings; la fila queda libre para reutilizarse
+        self.ids[fila] = self.nombres[fila] = self.categorias[fila] = None
+        self.libres.append(fila)
+
+    def pop(self, id_unico, *defecto):
+        """
+        Quita el producto y lo devuelve como Producto independiente
+        (una vista apuntaría a una fila que puede reutilizarse).
+        """
+        if id_unico not in self.filas:
+            if defecto:
+                return defecto[0]
+            raise KeyError(id_unico)
+        vista = self[id_unico]
+        producto = Producto(vista.get_id(), vista.get_nombre(), vista.get_cantidad(),
+                            vista.get_precio(), vista.get_categoria())
+        del self[id_unico]
+        return producto
+
+
+# ---------------------------
+# Índice de trigramas para búsqueda por nombre
+# ---------------------------
+class IndiceTrigramas:
+    """
+    Índice invertido: trigrama (3 letras seguidas del nombre en minúsculas) -> IDs que lo contienen.
+    Una búsqueda solo revisa los productos que tienen todos los trigramas de la consulta.
+    """
+    def __init__(self):
+        self.trigramas = {}
+        self.orden = {}  # ID -> número de inserción, para devolver los resultados en orden
+        self._siguiente = 0
+
+    @staticmethod
+    def _trigramas(texto):
+        return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+    def agregar(self, id_unico, nombre_min):
+        self.orden[id_unico] = self._siguiente
+        self._siguiente += 1
+        for t in self._trigramas(nombre_min):
+            self.trigramas.setdefault(t, set()).add(id_unico)
+
+    def quitar(self, id_unico, nombre_min):
+        self.orden.pop(id_unico, None)
+        for t in self._trigramas(nombre_min):
+            ids = self.trigramas.get(t)
+            if ids is not None:
+                ids.discard(id_unico)
+                if not ids:
+                    del self.trigramas[t]
+
+    def renombrar(self, id_unico, anterior_min, nuevo_min):
+        # Solo se tocan los trigramas que cambian; el orden de inserción se conserva
+        anteriores = self._trigramas(anterior_min)
+        nuevos = self._trigramas(nuevo_min)
+        for t in anteriores - nuevos:
+            ids = self.trigramas.get(t)
+            if ids is not None:
+                ids.discard(id_unico)
+                if not ids:
+                    del self.trigramas[t]
+        for t in nuevos - anteriores:
+            self.trigramas.setdefault(t, set()).add(id_unico)
+
+    def candidatos(self, consulta_min):
+        """
+        Devuelve los IDs que contienen todos los trigramas de la consulta, en orden de inserción.
+        Retorna None si la consulta tiene menos de 3 letras (el índice no sirve).
+        """
+        trigramas = self._trigramas(consulta_min)
+        if not trigramas:
+            return None
+        # Se empieza por el conjunto más pequeño para que la intersección sea barata
+        conjuntos = sorted((self.trigramas.get(t, set()) for t in trigramas), key=len)
+        resultado = set(conjuntos[0])
+        for ids in conjuntos[1:]:
+            if not resultado:
+                break
+            resultado &= ids
+        return sorted(resultado, key=self.orden.__getitem__)
+
+
+# ---------------------------
+# Índice ordenado para consultas por rango (cantidad o precio)
+# ---------------------------
+class IndiceOrdenado:
+    """
+    Índice secundario: pares (valor, ID) siempre ordenados por valor.
+    Se guardan en varias listas ordenadas cortas (hasta 2 * CARGA pares cada una)
+    en lugar de una sola lista: insertar o quitar con bisect solo mueve los
+    elementos de una lista corta aunque haya millones de productos.
+    Rangos y top-k cuestan O(log n + k).
+    Los valores tienen que poder ordenarse: NaN se rechaza (no se podría volver a encontrar).
+    Se recuerda el valor con que se indexó cada ID, así quitar() y cambiar() encuentran el
+    par aunque el producto se haya modificado por fuera del Inventario (p.set_cantidad()).
+    """
+    CARGA = 512
+
+    def __init__(self):
+        self._listas = []   # listas ordenadas de (valor, ID), una a continuación de la otra
+        self._maximos = []  # último par de cada lista, para elegir la lista con bisect
+        self._valores = {}  # ID -> valor con el que está indexado
+
+    def __len__(self):
+        return len(self._valores)
+
+    def agregar(self, valor, id_unico):
+        if valor != valor:
+            raise ValueError(f"valor NaN para el ID {id_unico!r}: no se puede ordenar")
+        par = (valor, id_unico)
+        self._valores[id_unico] = valor
+        if not self._listas:
+            self._listas.append([par])
+            self._maximos.append(par)
+            return
+        i = bisect_left(self._maximos, par)
+        if i == len(self._listas):
+            # Mayor que todo lo anterior: va al final de la última lista
+            i -= 1
+            self._listas[i].append(par)
+            self._maximos[i] = par
+        else:
+            insort(self._listas[i], par)
+        lista = self._listas[i]
+        if len(lista) > 2 * self.CARGA:
+            # Lista demasiado larga: se parte en dos mitades
+            self._listas[i:i + 1] = [lista[:self.CARGA], lista[self.CARGA:]]
+            self._maximos[i:i + 1] = [lista[self.CARGA - 1], lista[-1]]
+
+    def quitar(self, id_unico):
+        """
+        Quita el ID con el valor con que se indexó. Lanza KeyError si el ID no está.
+        """
+        par = (self._valores.pop(id_unico), id_unico)
+        i = bisect_left(self._maximos, par)
+        lista = self._listas[i]
+        j = bisect_left(lista, par)
+        del lista[j]
+        if not lista:
+            del self._listas[i]
+            del self._maximos[i]
+        elif j == len(lista):
+            self._maximos[i] = lista[-1]
+
+    def cambiar(self, id_unico, nuevo):
+        if self._valores[id_unico] != nuevo:
+            self.quitar(id_unico)
+            self.agregar(nuevo, id_unico)
+
+    def rango(self, minimo=None, maximo=None, incluir_maximo=True):
+        """
+        Genera (valor, ID) con minimo <= valor <= maximo (o < maximo), de menor a mayor.
+        None = sin límite por ese lado.
+        """
+        i = j = 0
+        if minimo is not None:
+            # (minimo,) queda antes que cualquier (minimo, ID)
+            i = bisect_left(self._maximos, (minimo,))
+            if i < len(self._listas):
+                j = bisect_left(self._listas[i], (minimo,))
+        for lista in self._listas[i:]:
+            for k in range(j, len(lista)):
+                valor, id_unico = lista[k]
+                if maximo is not None and (valor > maximo or (valor == maximo and not incluir_maximo)):
+                    return
+                yield valor, id_unico
+            j = 0
+
+    def menores(self, k):
+        """
+        Los k pares de menor valor, de menor a mayor.
+        """
+        resultado = []
+        if k <= 0:
+            return resultado
+        for lista in self._listas:
+            resultado.extend(lista[:k - len(resultado)])
+            if len(resultado) >= k:
+                break
+        return resultado
+
+    def mayores(self, k):
+        """
+        Los k pares de mayor valor, de mayor a menor.
+        """
+        resultado = []
+        for lista in reversed(self._listas):
+            for par in reversed(lista):
+                if len(resultado) >= k:
+                    return resultado
+                resultado.append(par)
+        return resultado
+
+
+# ---------------------------
+# Snapshots atómicos (archivo temporal + fsync + rename)
+# ---------------------------
+# Niveles de durabilidad: cuánto se espera al disco en cada escritura.
+# - "ninguna":  sin fsync (lo más rápido; un corte de luz puede perder lo último escrito)
+# - "archivo":  fsync del archivo antes de renombrarlo
+# - "completa": fsync del archivo y también del directorio (el rename queda en disco)
+DURABILIDADES = ("ninguna", "archivo", "completa")
+MARCA_FIN = "#fin"  # línea de control al final del snapshot: #fin,<filas>,<crc32>
+
+
+class _EscritorCRC:
+    """
+    Envoltorio de un archivo binario que va calculando el CRC32 de lo escrito.
+    csv.writer solo necesita un método write().
+    """
+    def __init__(self, f):
+        self.f = f
+        self.crc = 0
+
+    def write(self, texto):
+        datos = texto.encode("utf-8")
+        self.crc = zlib.crc32(datos, self.crc)
+        self.f.write(datos)
+
+
+def _fsync_directorio(ruta):
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(ruta)), os.O_RDONLY)
+    except OSError:
+        return  # p. ej. Windows no permite abrir directorios
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def escribir_snapshot_atomico(ruta, encabezado, filas, durabilidad="archivo", generaciones=2):
+    """
+    Escribe un snapshot CSV sin riesgo de dejarlo a medias:
+    1) Se escribe todo en ruta.tmp, terminando con la línea de control #fin,<filas>,<crc32>.
+    2) fsync del temporal (según la durabilidad).
+    3) Se conservan las generaciones anteriores: ruta.1 es la versión previa, ruta.2 la anterior, etc.
+    4) os.replace(ruta.tmp, ruta): el cambio es atómico, se ve el archivo viejo o el nuevo completo.
+    Lanza OSError si algo falla; en ese caso el snapshot anterior queda intacto.
+    """
+    temporal = ruta + ".tmp"
+    with open(temporal, mode="wb") as f:
+        escritor = _EscritorCRC(f)
+        writer = csv.writer(escritor)
+        writer.writerow(encabezado)
+        total = 0
+        for fila in filas:
+            writer.writerow(fila)
+            total += 1
+        f.write(f"{MARCA_FIN},{total},{escritor.crc:08x}\r\n".encode("ascii"))
+        f.flush()
+        if durabilidad != "ninguna":
+            os.fsync(f.fileno())
+
+    if generaciones > 0 and os.path.exists(ruta):
+        for n in range(generaciones - 1, 0, -1):
+            if os.path.exists(f"{ruta}.{n}"):
+                os.replace(f"{ruta}.{n}", f"{ruta}.{n + 1}")
+        # Enlace duro: ruta.1 apunta al contenido actual sin copiarlo
+        if os.path.exists(ruta + ".1"):
+            os.remove(ruta + ".1")
+        try:
+            os.link(ruta, ruta + ".1")
+        except OSError:
+            shutil.copy2(ruta, ruta + ".1")
+
+    os.replace(temporal, ruta)
+    if durabilidad == "completa":
+        _fsync_directorio(ruta)
+
+
+def verificar_snapshot(ruta):
+    """
+    Revisa la línea de control del final del archivo.
+    Retorna "ok", "sin_control" (archivo antiguo o editado a mano: no se puede verificar)
+    o "dañado" (el CRC no coincide, p. ej. el archivo quedó truncado).
+    """
+    tamano = os.path.getsize(ruta)
+    with open(ruta, mode="rb") as f:
+        f.seek(max(0, tamano - 256))
+        cola = f.read()
+        contenido = cola.rstrip(b"\r\n")
+        corte = contenido.rfind(b"\n")
+        ultima = contenido[corte + 1:].strip()
+        if not ultima.startswith(MARCA_FIN.encode("ascii") + b","):
+            return "sin_control"
+        try:
+            _, _, crc_txt = ultima.decode("ascii").split(",")
+            crc_esperado = int(crc_txt, 16)
+        except ValueError:
+            return "dañado"
+
+        # CRC de todo lo anterior a la línea de control, leído por bloques
+        restante = tamano - len(cola) + corte + 1
+        f.seek(0)
+        crc = 0
+        while restante > 0:
+            bloque = f.read(min(1024 * 1024, restante))
+            if not bloque:
+                break
+            crc = zlib.crc32(bloque, crc)
+            restante -= len(bloque)
+    return "ok" if crc == crc_esperado else "dañado"
+
+
+def elegir_snapshot(ruta, generaciones):
+    """
+    Devuelve (ruta_a_cargar, aviso). Si el snapshot actual está dañado, busca la
+    generación más reciente que sí esté bien; aviso es None si no hubo problema.
+    Un archivo sin línea de control se acepta tal cual (versión anterior del programa
+    o creado a mano), salvo que la generación previa sí la tenga: entonces quedó truncado.
+    """
+    estado = verificar_snapshot(ruta)
+    if estado == "ok":
+        return ruta, None
+    previa = ruta + ".1"
+    if estado == "sin_control" and not (os.path.exists(previa) and verificar_snapshot(previa) == "ok"):
+        return ruta, None
+    for n in range(1, generaciones + 1):
+        anterior = f"{ruta}.{n}"
+        if os.path.exists(anterior) and verificar_snapshot(anterior) == "ok":
+            return anterior, f"'{ruta}' está dañado; se cargó la generación anterior '{anterior}'."
+    return ruta, f"'{ruta}' está dañado y no hay generaciones válidas; se cargan las filas legibles."
+
+
+# ---------------------------
+# Carga por bloques (en paralelo para archivos grandes)
+# ---------------------------
+UMBRAL_CARGA_PARALELA = 8 * 1024 * 1024  # bytes; por debajo no compensa lanzar procesos
+
+
+def _dividir_en_bloques(ruta, inicio, fin, n_bloques):
+    """
+    Divide el rango [inicio, fin) del archivo en n_bloques rangos de bytes
+    que empiezan siempre al comienzo de una línea.
+    NOTA: supone que ningún nombre contiene saltos de línea.
+    """
+    limites = [inicio]
+    with open(ruta, mode="rb") as f:
+        for i in range(1, n_bloques):
+            pos = inicio + (fin - inicio) * i // n_bloques
+            if pos <= limites[-1]:
+                continue
+            f.seek(pos - 1)
+            f.readline()  # avanza hasta el inicio de la línea siguiente
+            pos = f.tell()
+            if limites[-1] < pos < fin:
+                limites.append(pos)
+    limites.append(fin)
+    return list(zip(limites, limites[1:]))
+
+
+def _parsear_bloque(ruta, inicio, fin):
+    """
+    Parsea las filas de un rango de bytes del archivo (puede correr en otro proceso).
+    Se omiten la línea de control y las filas que no tienen 5 campos o traen
+    cantidad/precio no numéricos o no finitos (se cuentan como corruptas).
+    Retorna (filas, errores) con filas = [(id, nombre, cantidad, precio, categoria), ...]
+    """
+    with open(ruta, mode="rb") as f:
+        f.seek(inicio)
+        texto = f.read(fin - inicio).decode("utf-8", errors="replace")
+    filas = []
+    errores = 0
+    for fila in csv.reader(io.StringIO(texto, newline="")):
+        if fila and fila[0] == MARCA_FIN:
+            continue
+        if len(fila) != 5:
+            errores += 1
+            continue
+        id_unico, nombre, cant, precio, categoria = fila
+        try:
+            cant, precio = int(cant), float(precio)
+        except ValueError:
+            errores += 1
+            continue
+        if not math.isfinite(precio):
+            errores += 1
+            continue
+        filas.append((id_unico, nombre, cant, precio, categoria))
+    return filas, errores
+
+
+def parsear_snapshot(ruta, procesos=None, progreso=None):
+    """
+    Lee el archivo completo. Si supera UMBRAL_CARGA_PARALELA, lo divide
+    en bloques de bytes que se parsean en un pool de procesos; si no (o si no se
+    pueden crear procesos), lo parsea en este mismo proceso.
+    progreso: función opcional progreso(bloques_listos, total_bloques).
+    Retorna una lista, en orden de archivo, de (inicio, fin, filas, errores) por bloque.
+    """
+    with open(ruta, mode="rb") as f:
+        inicio = len(f.readline())  # saltar encabezado
+    fin = os.path.getsize(ruta)
+
+    procesos = procesos or os.cpu_count() or 1
+    if procesos > 1 and fin - inicio >= UMBRAL_CARGA_PARALELA:
+        bloques = _dividir_en_bloques(ruta, inicio, fin, procesos * 4)
+        try:
+            resultados = [None] * len(bloques)
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                futuros = {pool.submit(_parsear_bloque, ruta, a, b): i for i, (a, b) in enumerate(bloques)}
+                for listos, futuro in enumerate(as_completed(futuros), start=1):
+                    resultados[futuros[futuro]] = futuro.result()
+                    if progreso:
+                        progreso(listos, len(bloques))
+            return [(a, b, filas, errores) for (a, b), (filas, errores) in zip(bloques, resultados)]
+        except (OSError, BrokenProcessPool):
+            pass  # sin procesos disponibles: se sigue en secuencial
+
+    filas, errores = _parsear_bloque(ruta, inicio, fin)
+    if progreso:
+        progreso(1, 1)
+    return [(inicio, fin, filas, errores)]
+
+
+# ---------------------------
+# Almacenamiento (dónde se guardan los productos)
+# ---------------------------
+class Almacenamiento(ABC):
+    """
+    Base de los almacenamientos. El Inventario trabaja siempre en memoria (con sus
+    índices) y le pide al almacenamiento:
+    - cargar(): filas (id, nombre, cantidad, precio, categoria) en orden de inserción
+    - guardar_todo(productos): reemplazar todo lo guardado por estos productos
+    - aplicar(cambios, productos): guardar una lista de cambios, todos o ninguno.
+      Cada cambio es ("guardar", fila) o ("borrar", id). Por defecto se reescribe
+      todo; un almacenamiento por filas (SQLite) escribe solo esas filas.
+    Los errores de escritura se informan con OSError.
+    """
+    def __init__(self):
+        self.aviso_carga = None    # mensaje si hubo que usar una copia anterior
+        self.reporte_carga = []    # (inicio, fin, filas, errores) por bloque de la última carga
+        self.lineas_corruptas = 0  # filas omitidas en la última carga
+
+    @abstractmethod
+    def cargar(self):
+        ...
+
+    @abstractmethod
+    def guardar_todo(self, productos):
+        ...
+
+    def aplicar(self, cambios, productos):
+        self.guardar_todo(productos)
+
+    def cerrar(self):
+        pass
+
+
+class AlmacenamientoCSV(Almacenamiento):
+    """
+    inventario.csv: escritura atómica con generaciones y CRC, carga por bloques en paralelo.
+    """
+    def __init__(self, ruta, durabilidad="archivo", generaciones=2, procesos=None, progreso=None):
+        super().__init__()
+        self.ruta = ruta
+        self.durabilidad = durabilidad
+        self.generaciones = generaciones
+        self.procesos = procesos
+        self.progreso = progreso
+
+    def cargar(self):
+        if not os.path.exists(self.ruta):
+            return
+        ruta, self.aviso_carga = elegir_snapshot(self.ruta, self.generaciones)
+        bloques = parsear_snapshot(ruta, self.procesos, self.progreso)
+        self.reporte_carga = [(inicio, fin, len(filas), errores) for inicio, fin, filas, errores in bloques]
+        self.lineas_corruptas = sum(errores for _, _, _, errores in bloques)
+        # Se unen los bloques en el orden del archivo
+        for _, _, filas, _ in bloques:
+            yield from filas
+
+    def guardar_todo(self, productos):
+        # Escritura atómica: si se corta a la mitad, el archivo anterior queda intacto
+        filas = ([p.get_id(), p.get_nombre(), p.get_cantidad(), p.get_precio(), p.get_categoria()]
+                 for p in productos)
+        escribir_snapshot_atomico(self.ruta, ["id", "nombre", "cantidad", "precio", "categoria"], filas,
+                                  self.durabilidad, self.generaciones)
+
+
+class AlmacenamientoBinario(Almacenamiento):
+    """
+    Formato binario con mmap (ver formato_binario.py); también se escribe de forma atómica.
+    """
+    def __init__(self, ruta, durabilidad="archivo"):
+        super().__init__()
+        self.ruta = ruta
+        self.durabilidad = durabilidad
+
+    def cargar(self):
+        if not os.path.exists(self.ruta):
+            return
+        # Sin parseo de texto: los registros se leen directo del archivo mapeado en memoria
+        from formato_binario import SnapshotBinario
+        with SnapshotBinario(self.ruta) as snapshot:
+            # Se recorre todo igual: verificar el CRC antes evita cargar un archivo dañado
+            if not snapshot.verificar():
+                raise ValueError(f"'{self.ruta}' está dañado (el CRC32 no coincide con la cabecera).")
+            yield from snapshot
+
+    def guardar_todo(self, productos):
+        from formato_binario import escribir_binario
+        escribir_binario(self.ruta, productos, self.durabilidad)
+
+
+EXTENSIONES_SQLITE = (".db", ".sqlite", ".sqlite3")
+
+
+def almacenamiento_para(archivo, durabilidad="archivo", generaciones=2, procesos=None, progreso=None):
+    """
+    Elige el almacenamiento según la extensión: .bin, .db/.sqlite/.sqlite3 o CSV (el resto).
+    """
+    if archivo.endswith(".bin"):
+        return AlmacenamientoBinario(archivo, durabilidad)
+    if archivo.endswith(EXTENSIONES_SQLITE):
+        # Import aquí: almacenamiento_sqlite usa las clases de este módulo
+        from almacenamiento_sqlite import AlmacenamientoSQLite
+        return AlmacenamientoSQLite(archivo, durabilidad)
+    return AlmacenamientoCSV(archivo, durabilidad, generaciones, procesos, progreso)
+
+
+# ---------------------------
+# Validación de valores
+# ---------------------------
+def _numeros_finitos(*valores):
+    # NaN o infinito romperían los índices ordenados (NaN no se puede ordenar) y los totales
+    try:
+        return all(math.isfinite(v) for v in valores)
+    except (TypeError, OverflowError):
+        return False
 
 
 # ---------------------------
 # Clase Inventario
 # ---------------------------
 class Inventario:
-    def __init__(self, archivo="inventario.csv"):
+    def __init__(self, archivo="inventario.csv", durabilidad="archivo", generaciones=2,
+                 procesos=None, progreso=None, columnar=False, almacenamiento=None, eventos=None):
+        if durabilidad not in DURABILIDADES:
+            raise ValueError(f"durabilidad debe ser una de {DURABILIDADES}")
         # Diccionario: clave = ID, valor = Producto
-        self.productos = {}
-        # Conjunto de categorías
+        # (o su equivalente por columnas, que usa mucha menos memoria por producto)
+        self.productos = AlmacenColumnar() if columnar else {}
+        # Conjunto de categorías (solo las que tienen al menos un producto)
         self.categorias = set()
-        self.archivo = archivo
+        # Índice por categoría: categoría -> {ID: None} (dict para conservar el orden de inserción)
+        self.por_categoria = {}
+        # Totales por categoría, al día en cada cambio: categoría -> [productos, unidades, valor]
+        self.totales_categoria = {}
+        # Índice de trigramas para buscar_nombre
+        self.indice_nombres = IndiceTrigramas()
+        # Índices ordenados (valor, ID) para rangos, top-k y reporte de bajo stock
+        self.indice_cantidad = IndiceOrdenado()
+        self.indice_precio = IndiceOrdenado()
+        self.archivo = archivo            # .csv, .bin (formato_binario.py) o .db (almacenamiento_sqlite.py)
+        self.durabilidad = durabilidad    # ver DURABILIDADES
+        self.generaciones = generaciones  # copias anteriores: inventario.csv.1, .2, ... (solo CSV)
+        self.aviso_carga = None           # mensaje si hubo que usar una generación anterior
+        self.procesos = procesos          # procesos para la carga en paralelo (None = núcleos disponibles)
+        self.progreso = progreso          # función opcional progreso(bloques_listos, total_bloques)
+        self.reporte_carga = []           # (inicio, fin, filas, errores) por bloque de la última carga
+        self.lineas_corruptas = 0         # filas omitidas en la última carga
+        self._transaccion = None  # Transaccion en curso (o None)
+        self.version = 0          # aumenta con cada cambio en memoria (invalida cachés, ver analitica_inventario.py)
+        # Dónde se guardan los productos (por defecto, según la extensión de `archivo`)
+        self.almacenamiento = almacenamiento or almacenamiento_para(archivo, durabilidad, generaciones,
+                                                                   procesos, progreso)
+        # Eventos de cambio: suscribirse con inventario.eventos.suscribir() (la carga no publica nada)
+        self.eventos = eventos if eventos is not None else BusEventos()
         self.cargar()
 
     # CRUD --------------------
     def agregar(self, producto):
         if producto.get_id() in self.productos:
             return False, "Error: ID duplicado."
-        self.productos[producto.get_id()] = producto
-        self.categorias.add(producto.get_categoria())
-        self.guardar()
-        return True, "Producto agregado."
+        if not _numeros_finitos(producto.get_cantidad(), producto.get_precio()):
+            return False, "Error: cantidad y precio tienen que ser números finitos."
+        self._indexar(producto)
+        fila = producto.datos
+        ok, detalle = self._persistir(lambda: self._desindexar(producto.get_id()), ("guardar", fila),
+                                      ("agregado", fila[0], None, fila))
+        if not ok:
+            return False, detalle
+        return True, "Producto agregado." + detalle
 
     def eliminar(self, id_unico):
         if id_unico in self.productos:
-            eliminado = self.productos.pop(id_unico)
-            self.guardar()
-            return True, f"Producto {eliminado.get_nombre()} eliminado."
+            eliminado = self._desindexar(id_unico)
+            ok, detalle = self._persistir(lambda: self._indexar(eliminado), ("borrar", id_unico),
+                                          ("eliminado", id_unico, eliminado.datos, None))
+            if not ok:
+                return False, detalle
+            return True, f"Producto {eliminado.get_nombre()} eliminado." + detalle
+        return False, "No existe ese producto."
+
+    def actualizar_nombre(self, id_unico, nuevo_nombre):
+        if id_unico in self.productos:
+            p = self.productos[id_unico]
+            antes = p.datos
+            anterior = p.get_nombre()
+            self._renombrar(p, nuevo_nombre)
+            fila = p.datos
+            ok, detalle = self._persistir(lambda: self._renombrar(p, anterior), ("guardar", fila),
+                                          ("nombre", id_unico, antes, fila))
+            if not ok:
+                return False, detalle
+            return True, "Nombre actualizado." + detalle
         return False, "No existe ese producto."
 
     def actualizar_cantidad(self, id_unico, nueva_cantidad):
         if id_unico in self.productos:
-            self.productos[id_unico].set_cantidad(nueva_cantidad)
-            self.guardar()
-            return True, "Cantidad actualizada."
+            p = self.productos[id_unico]
+            antes = p.datos
+            anterior = p.get_cantidad()
+            self._cambiar_cantidad(p, nueva_cantidad)
+            fila = p.datos
+            ok, detalle = self._persistir(lambda: self._cambiar_cantidad(p, anterior), ("guardar", fila),
+                                          ("cantidad", id_unico, antes, fila))
+            if not ok:
+                return False, detalle
+            return True, "Cantidad actualizada." + detalle
         return False, "No existe ese producto."
 
     def actualizar_precio(self, id_unico, nuevo_precio):
+        if not _numeros_finitos(nuevo_precio):
+            return False, "Error: el precio tiene que ser un número finito."
         if id_unico in self.productos:
-            self.productos[id_unico].set_precio(nuevo_precio)
-            self.guardar()
-            return True, "Precio actualizado."
+            p = self.productos[id_unico]
+            antes = p.datos
+            anterior = p.get_precio()
+            self._cambiar_precio(p, nuevo_precio)
+            fila = p.datos
+            ok, detalle = self._persistir(lambda: self._cambiar_precio(p, anterior), ("guardar", fila),
+                                          ("precio", id_unico, antes, fila))
+            if not ok:
+                return False, detalle
+            return True, "Precio actualizado." + detalle
         return False, "No existe ese producto."
 
+    # Consultas por categoría ---
+    def productos_por_categoria(self, categoria):
+        # Solo recorre los productos de esa categoría, no todo el inventario
+        return [self.productos[i] for i in self.por_categoria.get(categoria, ())]
+
+    def valor_por_categoria(self):
+        """
+        Devuelve {categoría: (productos, unidades, valor_stock)} sin recorrer los productos:
+        los totales se mantienen al día en cada alta, baja o actualización.
+        """
+        return {cat: (n, unidades, round(valor, 2)) for cat, (n, unidades, valor) in self.totales_categoria.items()}
+
+    # Transacciones y lotes ---
+    def transaccion(self):
+        """
+        Agrupa varias operaciones y guarda el archivo una sola vez al salir del bloque:
+            with inventario.transaccion() as tx:
+                inventario.actualizar_cantidad("P001", 10)
+            print(tx.msg)
+        Si hay una excepción o falla el guardado, se revierten todos los cambios.
+        """
+        return Transaccion(self)
+
+    def bulk_update(self, cambios):
+        """
+        Aplica un lote de ajustes (id_unico, nueva_cantidad, nuevo_precio); None = no cambiar.
+        Valida el lote completo (IDs repetidos o inexistentes, tipos) antes de aplicar nada
+        y lo guarda con una sola escritura.
+        """
+        validados = []
+        vistos = set()
+        errores = []
+        for n, cambio in enumerate(cambios, start=1):
+            try:
+                id_unico, cantidad, precio = cambio
+                cantidad = None if cantidad is None else int(cantidad)
+                precio = None if precio is None else float(precio)
+            except (TypeError, ValueError, OverflowError):
+                errores.append(f"cambio {n}: formato o tipo inválido")
+                continue
+            if precio is not None and not _numeros_finitos(precio):
+                errores.append(f"cambio {n}: el precio tiene que ser un número finito")
+                continue
+            if id_unico in vistos:
+                errores.append(f"cambio {n}: ID '{id_unico}' repetido en el lote")
+                continue
+            vistos.add(id_unico)
+            if id_unico not in self.productos:
+                errores.append(f"cambio {n}: no existe el ID '{id_unico}'")
+                continue
+            validados.append((id_unico, cantidad, precio))
+
+        if errores:
+            detalle = "; ".join(errores[:5])
+            if len(errores) > 5:
+                detalle += f" (y {len(errores) - 5} más)"
+            return False, f"Lote rechazado, no se aplicó ningún cambio. {len(errores)} error(es): {detalle}"
+
+        with self.transaccion() as tx:
+            for id_unico, cantidad, precio in validados:
+                if cantidad is not None:
+                    self.actualizar_cantidad(id_unico, cantidad)
+                if precio is not None:
+                    self.actualizar_precio(id_unico, precio)
+        if tx.ok:
+            return True, f"Lote aplicado: {len(validados)} producto(s) actualizado(s)."
+        return False, tx.msg
+
     def buscar_nombre(self, nombre):
-        # Lista de coincidencias
-        return [p for p in self.productos.values() if nombre.lower() in p.get_nombre().lower()]
+        # Lista de coincidencias (el índice de trigramas reduce los candidatos)
+        consulta = nombre.lower()
+        candidatos = self.indice_nombres.candidatos(consulta)
+        if candidatos is None:
+            # menos de 3 letras: recorrido con los nombres ya en minúsculas
+            return [p for p in self.productos.values() if consulta in p.get_nombre_min()]
+        return [self.productos[i] for i in candidatos if consulta in self.productos[i].get_nombre_min()]
 
     def mostrar_todos(self):
         return list(self.productos.values())
 
+    # Consultas por cantidad y precio (índices ordenados) ---
+    def _indice_orden(self, campo):
+        if campo == "cantidad":
+            return self.indice_cantidad
+        if campo == "precio":
+            return self.indice_precio
+        raise ValueError("campo debe ser 'cantidad' o 'precio'")
+
+    def productos_en_rango(self, campo, minimo=None, maximo=None):
+        """
+        Productos con minimo <= campo <= maximo ("cantidad" o "precio"), ordenados por ese campo.
+        None = sin límite por ese lado. Costo O(log n + k), sin recorrer el inventario.
+        """
+        return [self.productos[i] for _, i in self._indice_orden(campo).rango(minimo, maximo)]
+
+    def top_productos(self, campo, k, mayores=True):
+        """
+        Los k productos con mayor (o menor) cantidad o precio.
+        """
+        indice = self._indice_orden(campo)
+        pares = indice.mayores(k) if mayores else indice.menores(k)
+        return [self.productos[i] for _, i in pares]
+
+    def bajo_stock(self, umbral):
+        """
+        Reporte de reposición: productos con menos de `umbral` unidades, de menor a mayor cantidad.
+        """
+        return [self.productos[i] for _, i in self.indice_cantidad.rango(None, umbral, incluir_maximo=False)]
+
+    # Índices en memoria ------
+    def _indexar(self, producto):
+        self.version += 1
+        self.productos[producto.get_id()] = producto
+        self.indice_nombres.agregar(producto.get_id(), producto.get_nombre_min())
+        self.indice_cantidad.agregar(producto.get_cantidad(), producto.get_id())
+        self.indice_precio.agregar(producto.get_precio(), producto.get_id())
+        categoria = producto.get_categoria()
+        if categoria not in self.por_categoria:
+            self.categorias.add(categoria)
+            self.por_categoria[categoria] = {}
+            self.totales_categoria[categoria] = [0, 0, 0.0]
+        self.por_categoria[categoria][producto.get_id()] = None
+        totales = self.totales_categoria[categoria]
+        totales[0] += 1
+        totales[1] += producto.get_cantidad()
+        totales[2] += producto.get_cantidad() * producto.get_precio()
+
+    def _desindexar(self, id_unico):
+        self.version += 1
+        # Primero los índices: si alguno falla, el producto sigue en el diccionario
+        self.indice_nombres.quitar(id_unico, self.productos[id_unico].get_nombre_min())
+        self.indice_cantidad.quitar(id_unico)
+        self.indice_precio.quitar(id_unico)
+        # pop y no del: en modo columnar entrega un Producto independiente de la fila liberada
+        producto = self.productos.pop(id_unico)
+        categoria = producto.get_categoria()
+        del self.por_categoria[categoria][id_unico]
+        if not self.por_categoria[categoria]:
+            # Era el último producto de la categoría
+            del self.por_categoria[categoria]
+            del self.totales_categoria[categoria]
+            self.categorias.discard(categoria)
+        else:
+            totales = self.totales_categoria[categoria]
+            totales[0] -= 1
+            totales[1] -= producto.get_cantidad()
+            totales[2] -= producto.get_cantidad() * producto.get_precio()
+        return producto
+
+    def _cambiar_cantidad(self, producto, nueva_cantidad):
+        self.version += 1
+        totales = self.totales_categoria[producto.get_categoria()]
+        diferencia = nueva_cantidad - producto.get_cantidad()
+        totales[1] += diferencia
+        totales[2] += diferencia * producto.get_precio()
+        self.indice_cantidad.cambiar(producto.get_id(), nueva_cantidad)
+        producto.set_cantidad(nueva_cantidad)
+
+    def _cambiar_precio(self, producto, nuevo_precio):
+        self.version += 1
+        totales = self.totales_categoria[producto.get_categoria()]
+        totales[2] += producto.get_cantidad() * (nuevo_precio - producto.get_precio())
+        self.indice_precio.cambiar(producto.get_id(), nuevo_precio)
+        producto.set_precio(nuevo_precio)
+
+    def _renombrar(self, producto, nuevo_nombre):
+        self.version += 1
+        anterior_min = producto.get_nombre_min()
+        producto.set_nombre(nuevo_nombre)
+        self.indice_nombres.renombrar(producto.get_id(), anterior_min, producto.get_nombre_min())
+
+    def _persistir(self, deshacer, cambio, evento):
+        # cambio: ("guardar", fila) o ("borrar", id); el almacenamiento decide si escribe
+        # solo esa fila o todo el inventario.
+        # evento: (tipo, id, antes, despues), se publica recién cuando el cambio quedó guardado.
+        # Retorna (ok, detalle): si no se pudo guardar, (False, mensaje de error) y se deshace
+        # el cambio en memoria (con SQLite esa fila no se vuelve a escribir y quedaría distinta
+        # al disco); si se guardó, (True, aviso para agregar al mensaje, "" si no hay).
+        # Dentro de una transacción solo se anota; se guarda todo junto al confirmar
+        if self._transaccion is not None:
+            self._transaccion.deshacer.append(deshacer)
+            self._transaccion.cambios.append(cambio)
+            self._transaccion.eventos.append(evento)
+            return True, ""
+        try:
+            self.almacenamiento.aplicar([cambio], self.productos.values())
+        except OSError as e:
+            deshacer()
+            return False, f"Error guardando el cambio. Se revirtió. Detalle: {e}"
+        return True, self._publicar([evento])
+
+    def _publicar(self, eventos):
+        # El cambio ya está guardado: si falla el archivo de eventos no se deshace, se avisa
+        if not self.eventos.activo:
+            return ""
+        try:
+            self.eventos.publicar(eventos)
+        except OSError as e:
+            return f" Aviso: el cambio se guardó pero no se pudo registrar en el archivo de eventos. Detalle: {e}"
+        return ""
+
     # -------------------------
     # Archivos
     # -------------------------
     def guardar(self):
-        with open(self.archivo, mode="w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(["id", "nombre", "cantidad", "precio", "categoria"])
-            for p in self.productos.values():
-                writer.writerow([p.get_id(), p.get_nombre(), p.get_cantidad(), p.get_precio(), p.get_categoria()])
+        # Guarda el inventario completo
+        self.almacenamiento.guardar_todo(self.productos.values())
 
     def cargar(self):
-        if not os.path.exists(self.archivo):
+        descartadas = 0
+        for id_unico, nombre, cantidad, precio, categoria in self.almacenamiento.cargar():
+            if not _numeros_finitos(cantidad, precio):
+                # NaN o infinito (de un .bin o .db escrito por otro programa): fila corrupta
+                descartadas += 1
+                continue
+            if id_unico in self.productos:
+                # ID repetido en el archivo: gana la última línea
+                self._desindexar(id_unico)
+            self._indexar(Producto(id_unico, nombre, cantidad, precio, categoria))
+        self.aviso_carga = self.almacenamiento.aviso_carga
+        self.reporte_carga = self.almacenamiento.reporte_carga
+        self.lineas_corruptas = self.almacenamiento.lineas_corruptas + descartadas
+
+    def cerrar(self):
+        self.almacenamiento.cerrar()
+
+
+# ---------------------------
+# Transacción
+# ---------------------------
+class Transaccion:
+    """
+    Context manager de Inventario.transaccion(); al salir deja el resultado en ok/msg.
+    """
+    def __init__(self, inventario):
+        self.inventario = inventario
+        self.deshacer = []  # funciones para revertir cada cambio, en orden de aplicación
+        self.cambios = []   # ("guardar", fila) / ("borrar", id) para el almacenamiento
+        self.eventos = []   # (tipo, id, antes, despues) a publicar si se confirma
+        self.ok = False
+        self.msg = "Transacción sin confirmar."
+
+    def __enter__(self):
+        if self.inventario._transaccion is not None:
+            raise RuntimeError("Ya hay una transacción en curso en este inventario.")
+        self.inventario._transaccion = self
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        if self.terminar(tipo, valor):
+            self.resolver(self.guardar())
+        return False
+
+    # __exit__ en tres pasos, para quien guarda en otro hilo (servidor_inventario.py):
+    # terminar() y resolver() en el hilo dueño del inventario, guardar() en cualquiera
+    def terminar(self, tipo=None, valor=None):
+        """
+        Cierra la transacción. Retorna True si hay cambios para guardar(); si no, ok/msg
+        ya quedan definitivos (revertida por un error o sin cambios).
+        """
+        self.inventario._transaccion = None
+        if tipo is not None:
+            self._revertir()
+            self.ok, self.msg = False, f"Transacción revertida por un error: {valor}"
+            return False
+        if not self.deshacer:
+            self.ok, self.msg = True, "Transacción sin cambios."
+            return False
+        return True
+
+    def guardar(self):
+        """
+        Escribe los cambios en el almacenamiento. Solo lee el inventario (puede correr en
+        otro hilo mientras nadie lo cambie). Retorna el OSError si falló o None.
+        """
+        try:
+            self.inventario.almacenamiento.aplicar(self.cambios, self.inventario.productos.values())
+        except OSError as e:
+            return e
+        return None
+
+    def resolver(self, error):
+        # Con el resultado de guardar(): revierte o publica los eventos, y deja ok/msg
+        if error is not None:
+            self._revertir()
+            self.ok, self.msg = False, f"Error guardando la transacción. Se revirtieron todos los cambios. Detalle: {error}"
             return
-        with open(self.archivo, mode="r", newline="", encoding="utf-8") as f:
-            reader = csv.reader(f)
-            next(reader, None)  # saltar encabezado
-            for fila in reader:
-                if len(fila) == 5:
-                    id_unico, nombre, cant, precio, categoria = fila
-                    try:
-                        cantidad = int(cant)
-                        precio = float(precio)
-                        prod = Producto(id_unico, nombre, cantidad, precio, categoria)
-                        self.productos[id_unico] = prod
-                        self.categorias.add(categoria)
-                    except ValueError:
-                        continue
+        aviso = self.inventario._publicar(self.eventos)
+        self.ok, self.msg = True, f"Transacción guardada ({len(self.deshacer)} cambio(s))." + aviso
+
+    def _revertir(self):
+        for deshacer in reversed(self.deshacer):
+            deshacer()
+        self.deshacer = []
+        self.cambios = []
+        self.eventos = []
 
 
 # ---------------------------
 # Menú de consola
 # ---------------------------
 def menu():
-    inventario = Inventario()
+    # Con el archivo de eventos la secuencia sigue entre sesiones (la usan los deltas de la opción 14)
+    inventario = Inventario(eventos=BusEventos(FeedEventos("inventario.eventos")))
+    if inventario.aviso_carga:
+        print("Aviso:", inventario.aviso_carga)
+    if inventario.lineas_corruptas:
+        print(f"Aviso: se omitieron {inventario.lineas_corruptas} línea(s) corrupta(s) del archivo.")
+    analitica = None  # se crea al pedir los reportes (opción 13)
+    # Productos modificados desde el último delta exportado (opción 14), también en sesiones anteriores
+    from delta_csv import RegistroDelta
+    registro_delta = RegistroDelta(inventario, punto_control="inventario.punto_control.csv")
 
     while True:
         print("\n=== SISTEMA AVANZADO DE INVENTARIO ===")
@@ -139,6 +1166,13 @@ def menu():
         print("5) Buscar por nombre")
         print("6) Mostrar todos")
         print("7) Mostrar categorías")
+        print("8) Productos por categoría")
+        print("9) Valor de stock por categoría")
+        print("10) Reporte de bajo stock")
+        print("11) Productos por rango de cantidad o precio")
+        print("12) Top productos por cantidad o precio")
+        print("13) Reportes de análisis (valor total, ABC, bajo stock)")
+        print("14) Exportar cambios desde el último punto de control (delta CSV)")
         print("0) Salir")
         opcion = input("Opción: ").strip()
 
@@ -201,7 +1235,108 @@ def menu():
         elif opcion == "7":
             print("Categorías registradas:", inventario.categorias)
 
+        elif opcion == "8":
+            categoria = input("Categoría: ").strip()
+            productos = inventario.productos_por_categoria(categoria)
+            if productos:
+                for p in productos:
+                    print("-", p)
+            else:
+                print("No hay productos en esa categoría.")
+
+        elif opcion == "9":
+            totales = inventario.valor_por_categoria()
+            if totales:
+                for categoria, (n, unidades, valor) in totales.items():
+                    print(f"- {categoria}: {n} producto(s), {unidades} unidad(es), valor {valor:.2f}")
+            else:
+                print("Inventario vacío.")
+
+        elif opcion == "10":
+            try:
+                umbral = int(input("Mostrar productos con menos de (unidades): "))
+            except ValueError:
+                print("Error: umbral inválido.")
+                continue
+            productos = inventario.bajo_stock(umbral)
+            if productos:
+                for p in productos:
+                    print("-", p)
+            else:
+                print("Ningún producto por debajo de ese umbral.")
+
+        elif opcion == "11":
+            campo = "precio" if input("Campo (c = cantidad, p = precio): ").strip().lower() == "p" else "cantidad"
+            try:
+                minimo = float(input("Mínimo: "))
+                maximo = float(input("Máximo: "))
+            except ValueError:
+                print("Error: los límites deben ser numéricos.")
+                continue
+            if not _numeros_finitos(minimo, maximo):
+                print("Error: los límites tienen que ser números finitos.")
+                continue
+            productos = inventario.productos_en_rango(campo, minimo, maximo)
+            if productos:
+                for p in productos:
+                    print("-", p)
+            else:
+                print("No hay productos en ese rango.")
+
+        elif opcion == "12":
+            campo = "precio" if input("Campo (c = cantidad, p = precio): ").strip().lower() == "p" else "cantidad"
+            try:
+                k = int(input("¿Cuántos productos? "))
+            except ValueError:
+                print("Error: número inválido.")
+                continue
+            mayores = input("¿Mayores o menores? (M/m): ").strip() != "m"
+            productos = inventario.top_productos(campo, k, mayores)
+            if productos:
+                for p in productos:
+                    print("-", p)
+            else:
+                print("Inventario vacío.")
+
+        elif opcion == "13":
+            try:
+                umbral = int(input("Umbral de bajo stock (unidades): "))
+            except ValueError:
+                print("Error: umbral inválido.")
+                continue
+            if analitica is None:
+                from analitica_inventario import AnaliticaInventario
+                analitica = AnaliticaInventario(inventario)
+            n, unidades, valor = analitica.valor_total()
+            print(f"Total: {n} producto(s), {unidades} unidad(es), valor {valor:.2f}")
+            for categoria, (n_cat, unidades_cat, valor_cat) in analitica.valor_por_categoria().items():
+                print(f"- {categoria}: {n_cat} producto(s), {unidades_cat} unidad(es), valor {valor_cat:.2f}")
+            print("Clasificación ABC:")
+            for clase, (ids, valor_clase) in analitica.clasificacion_abc().items():
+                porcentaje = valor_clase / valor * 100 if valor else 0.0
+                print(f"- {clase}: {len(ids)} producto(s), valor {valor_clase:.2f} ({porcentaje:.1f} %)")
+            productos = analitica.bajo_stock(umbral)
+            print(f"Bajo stock (menos de {umbral}): {len(productos)} producto(s)")
+            for p in productos[:20]:
+                print("-", p)
+            if len(productos) > 20:
+                print(f"  ... y {len(productos) - 20} más")
+
+        elif opcion == "14":
+            if not registro_delta.pendientes:
+                print("No hay cambios desde el último punto de control.")
+                continue
+            ruta = input(f"Archivo delta [inventario.delta-{registro_delta.hasta}.csv]: ").strip() \
+                or f"inventario.delta-{registro_delta.hasta}.csv"
+            try:
+                filas = registro_delta.exportar(ruta)
+            except OSError as e:
+                print(f"Error al escribir el delta: {e}")
+                continue
+            print(f"Delta guardado en '{ruta}': {filas} fila(s).")
+
         elif opcion == "0":
+            inventario.eventos.cerrar()
             print("Saliendo...")
             break
 
@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor del inventario (asyncio, TCP local)
+Autor: Leslye Valencia
+
+Descripción:
+- Un solo proceso mantiene el Inventario en memoria (con sus índices) y lo comparte
+  con varias cajas por socket, en lugar de que cada una cargue el CSV.
+- Protocolo: una petición JSON por línea y una respuesta JSON por línea, en el mismo orden.
+    -> {"id": 1, "op": "actualizar_cantidad", "id_producto": "P001", "cantidad": 7}
+    <- {"id": 1, "ok": true, "msg": "Cantidad actualizada.", "datos": null}
+- Pipelining: el cliente puede enviar muchas peticiones sin esperar las respuestas.
+- Guardado por lotes (group commit): los cambios que llegan juntos se aplican dentro de
+  una transacción y el CSV se escribe una sola vez por lote (cada `ventana` segundos o
+  cada `max_lote` cambios). La respuesta de un cambio se envía recién cuando su lote
+  quedó guardado; si el guardado falla, se revierte el lote completo.
+  Las consultas ven los cambios ya aplicados aunque su lote todavía no se haya guardado.
+- El guardado de un lote corre en un hilo aparte, así el event loop sigue leyendo
+  peticiones y respondiendo consultas mientras se escribe el archivo. Los cambios que
+  llegan en ese momento (y lo que venga detrás de ellos) esperan y forman el lote siguiente.
+
+Operaciones:
+    ping, obtener(id_producto), listar(desde, limite), buscar(nombre),
+    agregar(producto={id, nombre, cantidad, precio, categoria}), eliminar(id_producto),
+    actualizar_nombre(id_producto, nombre), actualizar_cantidad(id_producto, cantidad),
+    actualizar_precio(id_producto, precio)
+
+Uso:
+    python servidor_inventario.py [--archivo inventario.csv] [--puerto 8765] [--ventana-ms 5] [--max-lote 256]
+"""
+
+import argparse
+import asyncio
+import json
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+
+from inventario_avanzado import Inventario, Producto
+
+LIMITE_LINEA = 1024 * 1024  # bytes máximos de una petición
+
+
+def producto_a_dict(p):
+    return {"id": p.get_id(), "nombre": p.get_nombre(), "cantidad": p.get_cantidad(),
+            "precio": p.get_precio(), "categoria": p.get_categoria()}
+
+
+# ---------------------------
+# Servicio (lógica, sin sockets)
+# ---------------------------
+class ServicioInventario:
+    """
+    Atiende peticiones ya decodificadas sobre un Inventario compartido.
+    Todo corre en el hilo del event loop, así el Inventario no necesita locks; solo la
+    escritura de un lote va a un hilo aparte, y mientras dura nadie cambia el Inventario
+    (los cambios que llegan quedan en espera).
+    """
+    CAMBIOS = ("agregar", "eliminar", "actualizar_nombre", "actualizar_cantidad", "actualizar_precio")
+
+    def __init__(self, inventario, ventana=0.005, max_lote=256):
+        self.inventario = inventario
+        self.ventana = ventana      # segundos que se espera para juntar cambios en un lote
+        self.max_lote = max_lote    # cambios por lote como máximo
+        self._tx = None             # Transaccion abierta del lote en curso
+        self._lote = []             # (futuro, respuesta) de los cambios del lote en curso
+        self._temporizador = None
+        self._guardando = None      # tarea del lote que se está escribiendo
+        self._en_espera = deque()   # (peticion, futuro) que llegaron durante el guardado
+        self._hilo_guardado = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inventario-guardado")
+        self.lotes_guardados = 0
+        self.cambios_guardados = 0
+
+    def atender(self, peticion):
+        """
+        Ejecuta una petición. Retorna la respuesta (dict) o, para los cambios,
+        un futuro que se resuelve con la respuesta cuando el lote se guarda.
+        """
+        if self._guardando is not None and (self._en_espera or self._es_cambio(peticion)):
+            # Se respeta el orden: una consulta detrás de un cambio en espera también espera
+            futuro = asyncio.get_running_loop().create_future()
+            self._en_espera.append((peticion, futuro))
+            return futuro
+        return self._responder(peticion)
+
+    def _es_cambio(self, peticion):
+        return isinstance(peticion, dict) and peticion.get("op") in self.CAMBIOS
+
+    def _responder(self, peticion):
+        id_peticion = peticion.get("id") if isinstance(peticion, dict) else None
+        try:
+            op = peticion["op"]
+            if op in self.CAMBIOS:
+                return self._cambio(id_peticion, op, peticion)
+            ok, msg, datos = self._consulta(op, peticion)
+        except (KeyError, TypeError, ValueError) as e:
+            ok, msg, datos = False, f"Petición inválida: {e!r}", None
+        return {"id": id_peticion, "ok": ok, "msg": msg, "datos": datos}
+
+    def _consulta(self, op, peticion):
+        inventario = self.inventario
+        if op == "ping":
+            return True, "pong", None
+        if op == "obtener":
+            p = inventario.productos.get(peticion["id_producto"])
+            if p is None:
+                return False, "No existe ese producto.", None
+            return True, "Producto encontrado.", producto_a_dict(p)
+        if op == "buscar":
+            resultados = inventario.buscar_nombre(str(peticion["nombre"]))
+            return True, f"{len(resultados)} coincidencia(s).", [producto_a_dict(p) for p in resultados]
+        if op == "listar":
+            desde = int(peticion.get("desde", 0))
+            limite = int(peticion.get("limite", 100))
+            # islice: recorre hasta desde + limite sin copiar todo el inventario en cada página
+            # (con valores negativos lanza ValueError: petición inválida)
+            productos = list(islice(inventario.productos.values(), desde, desde + limite))
+            return True, f"{len(productos)} de {len(inventario.productos)} producto(s).", \
+                [producto_a_dict(p) for p in productos]
+        return False, f"Operación desconocida: {op}", None
+
+    def _aplicar(self, op, peticion):
+        inventario = self.inventario
+        if op == "agregar":
+            d = peticion["producto"]
+            producto = Producto(str(d["id"]), str(d["nombre"]), int(d["cantidad"]), float(d["precio"]),
+                                str(d.get("categoria", "")))
+            return inventario.agregar(producto)
+        if op == "eliminar":
+            return inventario.eliminar(peticion["id_producto"])
+        if op == "actualizar_nombre":
+            return inventario.actualizar_nombre(peticion["id_producto"], str(peticion["nombre"]))
+        if op == "actualizar_cantidad":
+            return inventario.actualizar_cantidad(peticion["id_producto"], int(peticion["cantidad"]))
+        return inventario.actualizar_precio(peticion["id_producto"], float(peticion["precio"]))
+
+    def _cambio(self, id_peticion, op, peticion):
+        if self._tx is None:
+            self._tx = self.inventario.transaccion()
+            self._tx.__enter__()
+            self._temporizador = asyncio.get_running_loop().call_later(self.ventana, self.confirmar)
+        try:
+            ok, msg = self._aplicar(op, peticion)
+        except (KeyError, TypeError, ValueError, OverflowError) as e:
+            ok, msg = False, f"Petición inválida: {e!r}"
+        futuro = asyncio.get_running_loop().create_future()
+        self._lote.append((futuro, {"id": id_peticion, "ok": ok, "msg": msg, "datos": None}))
+        if len(self._lote) >= self.max_lote:
+            self.confirmar()
+        return futuro
+
+    def confirmar(self):
+        """
+        Cierra el lote en curso y lo guarda en el hilo de guardado (una sola escritura
+        del CSV); sus cambios se responden cuando termina.
+        """
+        if self._tx is None:
+            return
+        tx, lote = self._tx, self._lote
+        self._tx, self._lote = None, []
+        self._temporizador.cancel()
+        if tx.terminar():
+            self._guardando = asyncio.get_running_loop().create_task(self._guardar(tx, lote))
+        else:
+            self._responder_lote(tx, lote)
+
+    async def _guardar(self, tx, lote):
+        error = await asyncio.get_running_loop().run_in_executor(self._hilo_guardado, tx.guardar)
+        tx.resolver(error)
+        self._guardando = None
+        self._responder_lote(tx, lote)
+        self._atender_en_espera()
+
+    def _atender_en_espera(self):
+        # En orden de llegada; si un cambio completa otro lote, el resto espera a ese guardado
+        while self._en_espera and self._guardando is None:
+            peticion, futuro = self._en_espera.popleft()
+            respuesta = self._responder(peticion)
+            if isinstance(respuesta, asyncio.Future):
+                respuesta.add_done_callback(lambda r, futuro=futuro: futuro.set_result(r.result()))
+            else:
+                futuro.set_result(respuesta)
+
+    async def cerrar(self):
+        """
+        Espera el guardado en curso, guarda el último lote y libera el hilo de guardado.
+        """
+        while self._guardando is not None or self._tx is not None:
+            if self._guardando is not None:
+                await self._guardando
+            else:
+                self.confirmar()
+        self._hilo_guardado.shutdown()
+
+    def _responder_lote(self, tx, lote):
+        if tx.ok:
+            self.lotes_guardados += 1
+            self.cambios_guardados += len(lote)
+        for futuro, respuesta in lote:
+            if not tx.ok and respuesta["ok"]:
+                respuesta = dict(respuesta, ok=False, msg=tx.msg)
+            if not futuro.done():
+                futuro.set_result(respuesta)
+
+
+# ---------------------------
+# Servidor TCP
+# ---------------------------
+class ServidorInventario:
+    def __init__(self, servicio, host="127.0.0.1", puerto=8765):
+        self.servicio = servicio
+        self.host = host
+        self.puerto = puerto
+        self._servidor = None
+
+    async def iniciar(self):
+        self._servidor = await asyncio.start_server(self._atender_conexion, self.host, self.puerto,
+                                                    limit=LIMITE_LINEA)
+        # Con puerto 0 el sistema elige uno libre
+        self.puerto = self._servidor.sockets[0].getsockname()[1]
+        return self
+
+    async def cerrar(self):
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+        await self.servicio.cerrar()
+
+    async def _atender_conexion(self, reader, writer):
+        # Las respuestas se escriben en el orden de las peticiones, aunque un cambio
+        # espere a que se guarde su lote mientras se siguen leyendo peticiones nuevas.
+        pendientes = asyncio.Queue()
+        escritor = asyncio.create_task(self._escribir_respuestas(pendientes, writer))
+        try:
+            while True:
+                try:
+                    linea = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    pendientes.put_nowait({"id": None, "ok": False, "msg": "Petición demasiado larga.",
+                                           "datos": None})
+                    break
+                except ConnectionError:
+                    break
+                if not linea:
+                    break
+                if not linea.strip():
+                    continue
+                try:
+                    peticion = json.loads(linea)
+                except ValueError:
+                    pendientes.put_nowait({"id": None, "ok": False, "msg": "JSON inválido.", "datos": None})
+                    continue
+                pendientes.put_nowait(self.servicio.atender(peticion))
+        finally:
+            pendientes.put_nowait(None)
+            await escritor
+
+    async def _escribir_respuestas(self, pendientes, writer):
+        try:
+            while True:
+                respuesta = await pendientes.get()
+                if respuesta is None:
+                    break
+                if isinstance(respuesta, asyncio.Future):
+                    respuesta = await respuesta
+                writer.write(json.dumps(respuesta, ensure_ascii=False).encode("utf-8") + b"\n")
+                if pendientes.empty():
+                    await writer.drain()
+        except ConnectionError:
+            pass  # el cliente se fue; sus cambios igual quedan guardados con el lote
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+async def servir(archivo, host, puerto, ventana, max_lote):
+    inventario = Inventario(archivo)
+    if inventario.aviso_carga:
+        print("Aviso:", inventario.aviso_carga)
+    servidor = await ServidorInventario(ServicioInventario(inventario, ventana, max_lote), host, puerto).iniciar()
+    print(f"Inventario '{archivo}' ({len(inventario.productos)} productos) en {servidor.host}:{servidor.puerto}")
+    try:
+        await asyncio.Event().wait()  # hasta Ctrl+C
+    finally:
+        await servidor.cerrar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor TCP del inventario (JSON por línea).")
+    parser.add_argument("--archivo", default="inventario.csv")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--ventana-ms", type=float, default=5.0, help="espera para juntar cambios en un lote")
+    parser.add_argument("--max-lote", type=int, default=256, help="cambios por lote como máximo")
+    args = parser.parse_args()
+    try:
+        asyncio.run(servir(args.archivo, args.host, args.puerto, args.ventana_ms / 1000, args.max_lote))
+    except KeyboardInterrupt:
+        print("\nServidor detenido.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Microbenchmark del Inventario de la Semana 09.
+
+Compara la versión anterior (lista + recorrido lineal por ID) con la actual
+(diccionario indexado por ID) para 1k, 100k y 1M productos.
+Muestra el tiempo medio por operación, que debe crecer con N en la versión
+de lista y mantenerse constante en la versión indexada.
+También mide buscar_nombre (recorrido completo vs. índice de trigramas).
+
+Uso:
+    python benchmark_inventario.py [--tamanos 1000 100000 1000000] [--operaciones 200]
+"""
+
+import argparse
+import random
+import time
+
+from inventario import Inventario, Producto
+
+
+# ---------------------------
+# Versión anterior (referencia "antes")
+# ---------------------------
+class InventarioLista:
+    """
+    Copia de la implementación original basada en lista, solo para comparar.
+    """
+    def __init__(self):
+        self.productos = []
+
+    def agregar(self, producto):
+        for p in self.productos:
+            if p.get_id() == producto.get_id():
+                return False
+        self.productos.append(producto)
+        return True
+
+    def eliminar(self, id_unico):
+        for p in self.productos:
+            if p.get_id() == id_unico:
+                self.productos.remove(p)
+                return True
+        return False
+
+    def actualizar_cantidad(self, id_unico, nueva_cantidad):
+        for p in self.productos:
+            if p.get_id() == id_unico:
+                p.set_cantidad(nueva_cantidad)
+                return True
+        return False
+
+    def buscar_nombre(self, nombre):
+        resultados = []
+        for p in self.productos:
+            if nombre.lower() in p.get_nombre().lower():
+                resultados.append(p)
+        return resultados
+
+
+# ---------------------------
+# Medición
+# ---------------------------
+def construir(clase, n):
+    inventario = clase()
+    # En la versión lista se carga directamente la estructura interna: su agregar()
+    # es O(n) y llenar 1M productos así tardaría horas.
+    for i in range(n):
+        p = Producto(f"P{i:07d}", f"Producto {i}", i % 100, 1.0 + i % 50)
+        if isinstance(inventario, InventarioLista):
+            inventario.productos.append(p)
+        else:
+            inventario.agregar(p)
+    return inventario
+
+
+def medir(inventario, n, operaciones):
+    """
+    Retorna microsegundos medios por operación: (actualizar, agregar, eliminar, buscar).
+    """
+    ids = [f"P{random.randrange(n):07d}" for _ in range(operaciones)]
+
+    inicio = time.perf_counter()
+    for id_unico in ids:
+        inventario.actualizar_cantidad(id_unico, 7)
+    t_actualizar = (time.perf_counter() - inicio) / operaciones * 1e6
+
+    nuevos = [Producto(f"N{i:07d}", "Nuevo", 1, 1.0) for i in range(operaciones)]
+    inicio = time.perf_counter()
+    for p in nuevos:
+        inventario.agregar(p)
+    t_agregar = (time.perf_counter() - inicio) / operaciones * 1e6
+
+    inicio = time.perf_counter()
+    for p in nuevos:
+        inventario.eliminar(p.get_id())
+    t_eliminar = (time.perf_counter() - inicio) / operaciones * 1e6
+
+    # Consultas que coinciden con un solo producto (p. ej. "producto 4711")
+    consultas = [f"producto {random.randrange(n)}" for _ in range(min(operaciones, 20))]
+    inicio = time.perf_counter()
+    for consulta in consultas:
+        inventario.buscar_nombre(consulta)
+    t_buscar = (time.perf_counter() - inicio) / len(consultas) * 1e6
+
+    return t_actualizar, t_agregar, t_eliminar, t_buscar
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark de operaciones por ID y búsqueda por nombre.")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--operaciones", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'N':>10} | {'versión':<10} | {'actualizar µs':>14} | {'agregar µs':>12} | "
+          f"{'eliminar µs':>12} | {'buscar µs':>12}")
+    print("-" * 85)
+    for n in args.tamanos:
+        for nombre, clase in (("lista", InventarioLista), ("indexada", Inventario)):
+            inventario = construir(clase, n)
+            t_act, t_agr, t_eli, t_bus = medir(inventario, n, args.operaciones)
+            print(f"{n:>10} | {nombre:<10} | {t_act:>14.2f} | {t_agr:>12.2f} | {t_eli:>12.2f} | {t_bus:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
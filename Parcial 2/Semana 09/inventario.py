@@ -1,12 +1,19 @@
 # Sistema de Gestión de Inventarios simple para una tienda
 
+import math
+from bisect import bisect_left, insort
+
 # ---------------------------
 # Clase Producto
 # ---------------------------
 class Producto:
+    # __slots__: sin __dict__ por instancia, bastante menos memoria por producto
+    __slots__ = ("id", "nombre", "nombre_min", "cantidad", "precio")
+
     def __init__(self, id_unico, nombre, cantidad, precio):
         self.id = id_unico
         self.nombre = nombre
+        self.nombre_min = nombre.lower()  # se guarda para no recalcularlo en cada búsqueda
         self.cantidad = cantidad
         self.precio = precio
 
@@ -17,6 +24,9 @@ class Producto:
     def get_nombre(self):
         return self.nombre
 
+    def get_nombre_min(self):
+        return self.nombre_min
+
     def get_cantidad(self):
         return self.cantidad
 
@@ -26,6 +36,7 @@ class Producto:
     # Setters
     def set_nombre(self, nombre):
         self.nombre = nombre
+        self.nombre_min = nombre.lower()
 
     def set_cantidad(self, cantidad):
         self.cantidad = cantidad
@@ -37,51 +48,287 @@ class Producto:
         return f"ID: {self.id}, Nombre: {self.nombre}, Cantidad: {self.cantidad}, Precio: {self.precio}"
 
 
+# ---------------------------
+# Índice de trigramas para búsqueda por nombre
+# ---------------------------
+class IndiceTrigramas:
+    """
+    Índice invertido: trigrama (3 letras seguidas del nombre en minúsculas) -> IDs que lo contienen.
+    Una búsqueda solo revisa los productos que tienen todos los trigramas de la consulta.
+    """
+    def __init__(self):
+        self.trigramas = {}
+        self.orden = {}  # ID -> número de inserción, para devolver los resultados en orden
+        self._siguiente = 0
+
+    @staticmethod
+    def _trigramas(texto):
+        return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+    def agregar(self, id_unico, nombre_min):
+        self.orden[id_unico] = self._siguiente
+        self._siguiente += 1
+        for t in self._trigramas(nombre_min):
+            self.trigramas.setdefault(t, set()).add(id_unico)
+
+    def quitar(self, id_unico, nombre_min):
+        self.orden.pop(id_unico, None)
+        for t in self._trigramas(nombre_min):
+            ids = self.trigramas.get(t)
+            if ids is not None:
+                ids.discard(id_unico)
+                if not ids:
+                    del self.trigramas[t]
+
+    def renombrar(self, id_unico, anterior_min, nuevo_min):
+        # Solo se tocan los trigramas que cambian; el orden de inserción se conserva
+        anteriores = self._trigramas(anterior_min)
+        nuevos = self._trigramas(nuevo_min)
+        for t in anteriores - nuevos:
+            ids = self.trigramas.get(t)
+            if ids is not None:
+                ids.discard(id_unico)
+                if not ids:
+                    del self.trigramas[t]
+        for t in nuevos - anteriores:
+            self.trigramas.setdefault(t, set()).add(id_unico)
+
+    def candidatos(self, consulta_min):
+        """
+        Devuelve los IDs que contienen todos los trigramas de la consulta, en orden de inserción.
+        Retorna None si la consulta tiene menos de 3 letras (el índice no sirve).
+        """
+        trigramas = self._trigramas(consulta_min)
+        if not trigramas:
+            return None
+        # Se empieza por el conjunto más pequeño para que la intersección sea barata
+        conjuntos = sorted((self.trigramas.get(t, set()) for t in trigramas), key=len)
+        resultado = set(conjuntos[0])
+        for ids in conjuntos[1:]:
+            if not resultado:
+                break
+            resultado &= ids
+        return sorted(resultado, key=self.orden.__getitem__)
+
+
+# ---------------------------
+# Índice ordenado para consultas por rango (cantidad o precio)
+# ---------------------------
+class IndiceOrdenado:
+    """
+    Índice secundario: pares (valor, ID) siempre ordenados por valor.
+    Se guardan en varias listas ordenadas cortas (hasta 2 * CARGA pares cada una)
+    en lugar de una sola lista: insertar o quitar con bisect solo mueve los
+    elementos de una lista corta aunque haya millones de productos.
+    Rangos y top-k cuestan O(log n + k).
+    Los valores tienen que poder ordenarse: NaN se rechaza (no se podría volver a encontrar).
+    Se recuerda el valor con que se indexó cada ID, así quitar() y cambiar() encuentran el
+    par aunque el producto se haya modificado por fuera del Inventario (p.set_cantidad()).
+    """
+    CARGA = 512
+
+    def __init__(self):
+        self._listas = []   # listas ordenadas de (valor, ID), una a continuación de la otra
+        self._maximos = []  # último par de cada lista, para elegir la lista con bisect
+        self._valores = {}  # ID -> valor con el que está indexado
+
+    def __len__(self):
+        return len(self._valores)
+
+    def agregar(self, valor, id_unico):
+        if valor != valor:
+            raise ValueError(f"valor NaN para el ID {id_unico!r}: no se puede ordenar")
+        par = (valor, id_unico)
+        self._valores[id_unico] = valor
+        if not self._listas:
+            self._listas.append([par])
+            self._maximos.append(par)
+            return
+        i = bisect_left(self._maximos, par)
+        if i == len(self._listas):
+            # Mayor que todo lo anterior: va al final de la última lista
+            i -= 1
+            self._listas[i].append(par)
+            self._maximos[i] = par
+        else:
+            insort(self._listas[i], par)
+        lista = self._listas[i]
+        if len(lista) > 2 * self.CARGA:
+            # Lista demasiado larga: se parte en dos mitades
+            self._listas[i:i + 1] = [lista[:self.CARGA], lista[self.CARGA:]]
+            self._maximos[i:i + 1] = [lista[self.CARGA - 1], lista[-1]]
+
+    def quitar(self, id_unico):
+        """
+        Quita el ID con el valor con que se indexó. Lanza KeyError si el ID no está.
+        """
+        par = (self._valores.pop(id_unico), id_unico)
+        i = bisect_left(self._maximos, par)
+        lista = self._listas[i]
+        j = bisect_left(lista, par)
+        del lista[j]
+        if not lista:
+            del self._listas[i]
+            del self._maximos[i]
+        elif j == len(lista):
+            self._maximos[i] = lista[-1]
+
+    def cambiar(self, id_unico, nuevo):
+        if self._valores[id_unico] != nuevo:
+            self.quitar(id_unico)
+            self.agregar(nuevo, id_unico)
+
+    def rango(self, minimo=None, maximo=None, incluir_maximo=True):
+        """
+        Genera (valor, ID) con minimo <= valor <= maximo (o < maximo), de menor a mayor.
+        None = sin límite por ese lado.
+        """
+        i = j = 0
+        if minimo is not None:
+            # (minimo,) queda antes que cualquier (minimo, ID)
+            i = bisect_left(self._maximos, (minimo,))
+            if i < len(self._listas):
+                j = bisect_left(self._listas[i], (minimo,))
+        for lista in self._listas[i:]:
+            for k in range(j, len(lista)):
+                valor, id_unico = lista[k]
+                if maximo is not None and (valor > maximo or (valor == maximo and not incluir_maximo)):
+                    return
+                yield valor, id_unico
+            j = 0
+
+    def menores(self, k):
+        """
+        Los k pares de menor valor, de menor a mayor.
+        """
+        resultado = []
+        if k <= 0:
+            return resultado
+        for lista in self._listas:
+            resultado.extend(lista[:k - len(resultado)])
+            if len(resultado) >= k:
+                break
+        return resultado
+
+    def mayores(self, k):
+        """
+        Los k pares de mayor valor, de mayor a menor.
+        """
+        resultado = []
+        for lista in reversed(self._listas):
+            for par in reversed(lista):
+                if len(resultado) >= k:
+                    return resultado
+                resultado.append(par)
+        return resultado
+
+
 # ---------------------------
 # Clase Inventario
 # ---------------------------
 class Inventario:
     def __init__(self):
-        self.productos = []
+        # Diccionario: clave = ID, valor = Producto.
+        # Sirve de índice por ID (búsqueda, actualización y borrado en O(1))
+        # y a la vez conserva el orden de inserción de los productos.
+        self.productos = {}
+        self.indice_nombres = IndiceTrigramas()
+        # Índices ordenados para rangos, top-k y reporte de bajo stock
+        self.indice_cantidad = IndiceOrdenado()
+        self.indice_precio = IndiceOrdenado()
 
     def agregar(self, producto):
-        # Validar que el ID sea único
-        for p in self.productos:
-            if p.get_id() == producto.get_id():
-                return False
-        self.productos.append(producto)
+        # Validar que el ID sea único y el precio un número finito (NaN no se puede ordenar)
+        if producto.get_id() in self.productos or not math.isfinite(producto.get_precio()):
+            return False
+        self.productos[producto.get_id()] = producto
+        self.indice_nombres.agregar(producto.get_id(), producto.get_nombre_min())
+        self.indice_cantidad.agregar(producto.get_cantidad(), producto.get_id())
+        self.indice_precio.agregar(producto.get_precio(), producto.get_id())
         return True
 
     def eliminar(self, id_unico):
-        for p in self.productos:
-            if p.get_id() == id_unico:
-                self.productos.remove(p)
-                return True
-        return False
+        p = self.productos.get(id_unico)
+        if p is None:
+            return False
+        # Primero los índices: si alguno falla, el producto sigue en el diccionario
+        self.indice_nombres.quitar(id_unico, p.get_nombre_min())
+        self.indice_cantidad.quitar(id_unico)
+        self.indice_precio.quitar(id_unico)
+        del self.productos[id_unico]
+        return True
+
+    def actualizar_nombre(self, id_unico, nuevo_nombre):
+        p = self.productos.get(id_unico)
+        if p is None:
+            return False
+        anterior_min = p.get_nombre_min()
+        p.set_nombre(nuevo_nombre)
+        self.indice_nombres.renombrar(id_unico, anterior_min, p.get_nombre_min())
+        return True
 
     def actualizar_cantidad(self, id_unico, nueva_cantidad):
-        for p in self.productos:
-            if p.get_id() == id_unico:
-                p.set_cantidad(nueva_cantidad)
-                return True
-        return False
+        p = self.productos.get(id_unico)
+        if p is None:
+            return False
+        self.indice_cantidad.cambiar(id_unico, nueva_cantidad)
+        p.set_cantidad(nueva_cantidad)
+        return True
 
     def actualizar_precio(self, id_unico, nuevo_precio):
-        for p in self.productos:
-            if p.get_id() == id_unico:
-                p.set_precio(nuevo_precio)
-                return True
-        return False
+        p = self.productos.get(id_unico)
+        if p is None or not math.isfinite(nuevo_precio):
+            return False
+        self.indice_precio.cambiar(id_unico, nuevo_precio)
+        p.set_precio(nuevo_precio)
+        return True
 
     def buscar_nombre(self, nombre):
+        consulta = nombre.lower()
+        candidatos = self.indice_nombres.candidatos(consulta)
+        if candidatos is None:
+            # Consulta de menos de 3 letras: se recorre, pero con los nombres ya en minúsculas
+            return [p for p in self.productos.values() if consulta in p.get_nombre_min()]
+        # El índice descarta casi todo; aquí solo se confirma la subcadena completa
         resultados = []
-        for p in self.productos:
-            if nombre.lower() in p.get_nombre().lower():
+        for id_unico in candidatos:
+            p = self.productos[id_unico]
+            if consulta in p.get_nombre_min():
                 resultados.append(p)
         return resultados
 
     def mostrar_todos(self):
-        return self.productos
+        # Lista en orden de inserción
+        return list(self.productos.values())
+
+    # Consultas por cantidad y precio (índices ordenados) ---
+    def _indice_orden(self, campo):
+        if campo == "cantidad":
+            return self.indice_cantidad
+        if campo == "precio":
+            return self.indice_precio
+        raise ValueError("campo debe ser 'cantidad' o 'precio'")
+
+    def productos_en_rango(self, campo, minimo=None, maximo=None):
+        """
+        Productos con minimo <= campo <= maximo ("cantidad" o "precio"), ordenados por ese campo.
+        None = sin límite por ese lado. Costo O(log n + k), sin recorrer el inventario.
+        """
+        return [self.productos[i] for _, i in self._indice_orden(campo).rango(minimo, maximo)]
+
+    def top_productos(self, campo, k, mayores=True):
+        """
+        Los k productos con mayor (o menor) cantidad o precio.
+        """
+        indice = self._indice_orden(campo)
+        pares = indice.mayores(k) if mayores else indice.menores(k)
+        return [self.productos[i] for _, i in pares]
+
+    def bajo_stock(self, umbral):
+        """
+        Reporte de reposición: productos con menos de `umbral` unidades, de menor a mayor cantidad.
+        """
+        return [self.productos[i] for _, i in self.indice_cantidad.rango(None, umbral, incluir_maximo=False)]
 
 
 # ---------------------------
@@ -98,6 +345,9 @@ def menu():
         print("4) Actualizar precio")
         print("5) Buscar por nombre")
         print("6) Mostrar todos")
+        print("7) Reporte de bajo stock")
+        print("8) Productos por rango de cantidad o precio")
+        print("9) Top productos por cantidad o precio")
         print("0) Salir")
         opcion = input("Opción: ")
 
@@ -106,6 +356,9 @@ def menu():
             nombre = input("Nombre: ")
             cantidad = int(input("Cantidad: "))
             precio = float(input("Precio: "))
+            if not math.isfinite(precio):
+                print("Precio inválido: tiene que ser un número finito.")
+                continue
             producto = Producto(id_unico, nombre, cantidad, precio)
             if inventario.agregar(producto):
                 print("Producto agregado.")
@@ -130,6 +383,9 @@ def menu():
         elif opcion == "4":
             id_unico = input("ID del producto: ")
             precio = float(input("Nuevo precio: "))
+            if not math.isfinite(precio):
+                print("Precio inválido: tiene que ser un número finito.")
+                continue
             if inventario.actualizar_precio(id_unico, precio):
                 print("Precio actualizado.")
             else:
@@ -152,6 +408,40 @@ def menu():
             else:
                 print("Inventario vacío.")
 
+        elif opcion == "7":
+            umbral = int(input("Mostrar productos con menos de (unidades): "))
+            productos = inventario.bajo_stock(umbral)
+            if productos:
+                for p in productos:
+                    print(p)
+            else:
+                print("Ningún producto por debajo de ese umbral.")
+
+        elif opcion == "8":
+            campo = "precio" if input("Campo (c = cantidad, p = precio): ").strip().lower() == "p" else "cantidad"
+            minimo = float(input("Mínimo: "))
+            maximo = float(input("Máximo: "))
+            if not (math.isfinite(minimo) and math.isfinite(maximo)):
+                print("Los límites tienen que ser números finitos.")
+                continue
+            productos = inventario.productos_en_rango(campo, minimo, maximo)
+            if productos:
+                for p in productos:
+                    print(p)
+            else:
+                print("No hay productos en ese rango.")
+
+        elif opcion == "9":
+            campo = "precio" if input("Campo (c = cantidad, p = precio): ").strip().lower() == "p" else "cantidad"
+            k = int(input("¿Cuántos? "))
+            mayores = input("¿Mayores o menores? (M/m): ").strip() != "m"
+            productos = inventario.top_productos(campo, k, mayores)
+            if productos:
+                for p in productos:
+                    print(p)
+            else:
+                print("Inventario vacío.")
+
         elif opcion == "0":
             print("¡Hasta luego!")
             break
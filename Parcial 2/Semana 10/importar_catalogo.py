@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+Importación masiva de catálogos de proveedores al Inventario
+Autor: Leslye Valencia
+
+Descripción:
+- Lee archivos CSV o JSONL muy grandes sin cargarlos enteros en memoria: cada etapa es
+  un generador que recibe las filas de la anterior, de a una.
+      leer (CSV / JSONL) -> validar -> quitar duplicados -> alta o actualización
+- Validación: las mismas reglas de líneas corruptas que al cargar inventario.txt
+  (validar_fila de inventario_mejorado.py) y además ID vacío, cantidad o precio negativos
+  y precios no finitos. En JSONL, id y nombre tienen que ser texto y cantidad y precio
+  números (null, listas, objetos o true/false se rechazan).
+- IDs repetidos en el archivo: una fila idéntica a la primera se omite; con otros datos
+  se rechaza (gana la primera aparición).
+- Las filas rechazadas van a un archivo de rechazos (CSV: línea, motivo, contenido) a
+  medida que aparecen.
+- Todo se guarda con una sola escritura al final (Inventario.importar_productos): si falla,
+  el inventario queda como estaba.
+- Memoria: además del inventario, solo un registro por ID distinto (para detectar repetidos).
+
+Formatos de entrada:
+    CSV:   id,nombre,cantidad,precio            (el encabezado es opcional)
+    JSONL: {"id": "P001", "nombre": "Leche", "cantidad": 12, "precio": 1.25}   una línea por producto
+
+Uso:
+    python importar_catalogo.py proveedor.csv
+    python importar_catalogo.py proveedor.jsonl --inventario inventario.txt --rechazos rechazos.csv
+    python importar_catalogo.py proveedor.csv --solo-validar
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import time
+
+from inventario_mejorado import Inventario, validar_fila
+
+CAMPOS = ("id", "nombre", "cantidad", "precio")
+CAMPOS_TEXTO = ("id", "nombre")
+JSON_INVALIDO = "JSON inválido (se esperaba un objeto por línea)"
+EXTENSIONES_JSONL = (".jsonl", ".ndjson")
+AVISO_CADA = 100_000  # filas entre avisos de progreso
+
+
+class ResultadoImportacion:
+    """
+    Contadores de una importación (se completan mientras corre el pipeline).
+    """
+    def __init__(self):
+        self.leidas = 0
+        self.rechazadas = 0
+        self.repetidas = 0     # filas idénticas a otra anterior con el mismo ID (omitidas)
+        self.validas = 0       # filas que llegaron al inventario
+        self.nuevos = 0
+        self.actualizados = 0
+        self.sin_cambios = 0
+        self.segundos = 0.0
+
+    def __str__(self):
+        texto = (f"{self.leidas} fila(s) leídas: {self.validas} válidas, {self.rechazadas} rechazadas, "
+                 f"{self.repetidas} repetidas omitidas. Inventario: {self.nuevos} nuevo(s), "
+                 f"{self.actualizados} actualizado(s), {self.sin_cambios} sin cambios.")
+        if self.segundos:
+            texto += f" {self.segundos:.1f} s ({self.leidas / self.segundos * 60:,.0f} filas/min)."
+        return texto
+
+
+class ArchivoRechazos:
+    """
+    Escribe las filas rechazadas a medida que aparecen. El archivo se crea con el
+    primer rechazo: si no hay ninguno, no queda un archivo vacío.
+    """
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._archivo = None
+        self._writer = None
+
+    def agregar(self, linea, motivo, contenido):
+        if self.ruta is None:
+            return
+        if self._writer is None:
+            self._archivo = open(self.ruta, mode="w", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._archivo)
+            self._writer.writerow(["linea", "motivo", "contenido"])
+        self._writer.writerow([linea, motivo, contenido])
+
+    def cerrar(self):
+        if self._archivo is not None:
+            self._archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.cerrar()
+        return False
+
+
+# ---------------------------
+# Etapas del pipeline (generadores)
+# ---------------------------
+def leer_csv(ruta):
+    """
+    Genera (línea, fila, contenido original) de un CSV. "utf-8-sig" quita el BOM que
+    agregan algunas planillas; bytes inválidos se reemplazan y la fila se valida igual.
+    """
+    with open(ruta, newline="", encoding="utf-8-sig", errors="replace") as f:
+        lector = csv.reader(f)
+        for fila in lector:
+            if not fila:
+                continue  # línea en blanco
+            yield lector.line_num, fila, ",".join(fila)
+
+
+def leer_jsonl(ruta):
+    """
+    Genera (línea, fila, contenido original) de un JSONL: cada objeto se pasa a una fila
+    de texto [id, nombre, cantidad, precio] para validarla con las mismas reglas que el CSV
+    (así 12.5 no pasa como cantidad entera). Si la línea ya es inválida (JSON mal formado
+    o un campo con otro tipo), fila es el motivo (str).
+    """
+    with open(ruta, encoding="utf-8-sig", errors="replace") as f:
+        for n, linea in enumerate(f, start=1):
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                objeto = json.loads(linea)
+            except ValueError:
+                yield n, JSON_INVALIDO, linea
+                continue
+            if not isinstance(objeto, dict):
+                yield n, JSON_INVALIDO, linea
+                continue
+            motivo = _motivo_tipos(objeto)
+            if motivo is not None:
+                yield n, motivo, linea
+                continue
+            # Campos faltantes: la fila queda con menos de 4 y la regla de siempre la rechaza
+            yield n, [str(objeto[c]) for c in CAMPOS if c in objeto], linea
+
+
+def _motivo_tipos(objeto):
+    # str() convertiría null en "None" o ["x"] en "['x']"; bool es un int para Python
+    for campo in CAMPOS:
+        if campo not in objeto:
+            continue
+        valor = objeto[campo]
+        if campo in CAMPOS_TEXTO:
+            if not isinstance(valor, str):
+                return f"{campo} tiene que ser texto: {json.dumps(valor, ensure_ascii=False)}"
+        elif isinstance(valor, bool) or not isinstance(valor, (int, float)):
+            return f"{campo} tiene que ser un número: {json.dumps(valor, ensure_ascii=False)}"
+    return None
+
+
+def validar(filas, rechazos, resultado):
+    """
+    Deja pasar (línea, producto) con producto = (id, nombre, cantidad, precio) válido.
+    """
+    for linea, fila, contenido in filas:
+        resultado.leidas += 1
+        if isinstance(fila, str):
+            motivo = fila
+            producto = None
+        else:
+            producto, motivo = validar_fila(fila)
+            if producto is None and motivo is None:
+                continue  # encabezado o línea de control
+        if producto is not None:
+            motivo = _motivo_extra(producto)
+        if motivo is not None:
+            resultado.rechazadas += 1
+            rechazos.agregar(linea, motivo, contenido)
+            continue
+        yield linea, producto
+
+
+def _motivo_extra(producto):
+    # Reglas de la importación que la carga de inventario.txt no aplica
+    id_unico, nombre, cantidad, precio = producto
+    if not id_unico.strip():
+        return "ID vacío"
+    if cantidad < 0:
+        return f"cantidad negativa: {cantidad}"
+    if not math.isfinite(precio) or precio < 0:
+        return f"precio inválido: {precio}"
+    return None
+
+
+def quitar_duplicados(productos, rechazos, resultado):
+    """
+    Un ID por archivo: la primera aparición pasa; una fila repetida idéntica se omite y
+    una con otros datos se rechaza. Se recuerda (línea, hash de la fila) por ID.
+    """
+    vistos = {}
+    for linea, producto in productos:
+        anterior = vistos.get(producto[0])
+        if anterior is None:
+            vistos[producto[0]] = (linea, hash(producto))
+            resultado.validas += 1
+            yield producto
+        elif anterior[1] == hash(producto):
+            resultado.repetidas += 1
+        else:
+            resultado.rechazadas += 1
+            rechazos.agregar(linea, f"ID repetido con otros datos (primera aparición en la línea {anterior[0]})",
+                             ",".join(map(str, producto)))
+
+
+def avisar_progreso(productos, resultado, progreso):
+    # Llama progreso(filas_leídas) cada AVISO_CADA filas
+    siguiente = AVISO_CADA
+    for producto in productos:
+        if resultado.leidas >= siguiente:
+            progreso(resultado.leidas)
+            siguiente += AVISO_CADA
+        yield producto
+
+
+# ---------------------------
+# Importación completa
+# ---------------------------
+def importar_catalogo(inventario, ruta, ruta_rechazos=None, formato=None, solo_validar=False, progreso=None):
+    """
+    Importa un catálogo CSV o JSONL al inventario (alta de nuevos, actualización de existentes).
+    formato: "csv" o "jsonl" (None = según la extensión). Con solo_validar se recorre todo el
+    archivo y se escriben los rechazos, sin tocar el inventario.
+    Retorna (ok: bool, msg: str, resultado: ResultadoImportacion)
+    """
+    resultado = ResultadoImportacion()
+    if formato is None:
+        formato = "jsonl" if ruta.lower().endswith(EXTENSIONES_JSONL) else "csv"
+    if formato not in ("csv", "jsonl"):
+        return False, f"Formato desconocido: {formato}", resultado
+    inicio = time.perf_counter()
+    try:
+        with ArchivoRechazos(ruta_rechazos) as rechazos:
+            filas = leer_jsonl(ruta) if formato == "jsonl" else leer_csv(ruta)
+            productos = quitar_duplicados(validar(filas, rechazos, resultado), rechazos, resultado)
+            if progreso is not None:
+                productos = avisar_progreso(productos, resultado, progreso)
+            if solo_validar:
+                for _ in productos:
+                    pass
+                ok, msg = True, "Validación terminada (el inventario no se modificó)."
+            else:
+                ok, msg, conteo = inventario.importar_productos(productos)
+                resultado.nuevos = conteo["nuevos"]
+                resultado.actualizados = conteo["actualizados"]
+                resultado.sin_cambios = conteo["sin_cambios"]
+    except FileNotFoundError:
+        return False, f"No existe el archivo '{ruta}'.", resultado
+    except PermissionError as e:
+        return False, f"Permiso denegado: {e.filename}", resultado
+    except csv.Error as e:
+        return False, f"Error de formato CSV en '{ruta}': {e}. No se importó nada.", resultado
+    except OSError as e:
+        return False, f"Error OS durante la importación: {e}. No se importó nada.", resultado
+    resultado.segundos = time.perf_counter() - inicio
+    if resultado.rechazadas and ruta_rechazos:
+        msg += f" Rechazos en '{ruta_rechazos}'."
+    return ok, msg, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa un catálogo CSV/JSONL al inventario.")
+    parser.add_argument("archivo", help="catálogo del proveedor (.csv o .jsonl)")
+    parser.add_argument("--inventario", default="inventario.txt")
+    parser.add_argument("--rechazos", help="archivo de rechazos (por defecto <archivo>.rechazos.csv)")
+    parser.add_argument("--formato", choices=("csv", "jsonl"), help="por defecto, según la extensión")
+    parser.add_argument("--solo-validar", action="store_true", help="no modifica el inventario")
+    parser.add_argument("--sin-journal", action="store_true", help="inventario sin journal (Semana 10 básico)")
+    args = parser.parse_args()
+    ruta_rechazos = args.rechazos or os.path.splitext(args.archivo)[0] + ".rechazos.csv"
+
+    # Mismo modo que el menú: puede correr con las cajas abiertas
+    inventario = Inventario(args.inventario, usar_journal=not args.sin_journal, multiproceso=True)
+    print(f"> {inventario.ultimo_mensaje_archivo}")
+    ok, msg, resultado = importar_catalogo(inventario, args.archivo, ruta_rechazos, args.formato,
+                                           args.solo_validar,
+                                           progreso=lambda n: print(f"  {n:,} filas...", file=sys.stderr))
+    print(resultado)
+    print(msg)
+    inventario.esperar_compactacion()
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,25 +8,71 @@ Descripción:
 - Maneja excepciones comunes de archivos (FileNotFoundError, PermissionError).
 - Tolera líneas corruptas en el archivo y las ignora con aviso.
 - La interfaz de consola informa el éxito o fallo de cada operación de archivo.
+- Carga por bloques: los archivos grandes se dividen en rangos de bytes que se
+  parsean en paralelo en un pool de procesos.
+- Guardado atómico: se escribe un temporal, se hace fsync y se renombra; se conservan
+  generaciones anteriores y una línea de control (CRC32) permite detectar un archivo dañado.
+- Transacciones y lotes (bulk_update): muchos cambios se guardan con una sola escritura.
+- Índices ordenados por cantidad y precio: rangos, top-k y reporte de bajo stock sin
+  recorrer todo el inventario.
+- Modo journal opcional: cada cambio se agrega como un registro pequeño a un log
+  (inventario.txt.log) en vez de reescribir todo el archivo; el log se reproduce
+  sobre el último snapshot al cargar y se compacta en segundo plano al crecer.
+- Importación masiva de catálogos CSV/JSONL (importar_catalogo.py): pipeline de
+  generadores con las mismas reglas de líneas corruptas, archivo de rechazos y una
+  sola escritura al final.
+- Modo multiproceso opcional: varias cajas pueden trabajar sobre el mismo inventario.txt.
+  Cada cambio se hace con el archivo bloqueado (inventario.txt.lock) y después de leer
+  lo que escribieron los demás (solo la cola nueva del journal); si otro proceso cambió
+  el mismo producto, la actualización se rechaza en lugar de pisarlo.
 
 Formato del archivo (inventario.txt):
 id,nombre,cantidad,precio
 P001,Leche,12,1.25
 P002,Pan,20,0.30
 ...
+#fin,2,1a2b3c4d         -> línea de control: filas y CRC32 de todo lo anterior
+
+Formato del journal (inventario.txt.log), un registro por línea:
+A,P003,Azúcar,5,1.10    -> alta (o reemplazo) de producto
+E,P002                  -> eliminación
+C,P001,15               -> nueva cantidad
+P,P001,1.30             -> nuevo precio
+N,P001,Leche entera     -> nuevo nombre
+T,2 ... F,2             -> transacción: los registros entre T y F se aplican todos o ninguno
 """
 
 import csv
+import errno
+import io
+import math
 import os
+import shutil
+import threading
+import zlib
+from bisect import bisect_left, insort
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 
 # ---------------------------
 # Clase Producto
 # ---------------------------
 class Producto:
+    # __slots__: sin __dict__ por instancia, bastante menos memoria por producto
+    __slots__ = ("id", "nombre", "nombre_min", "cantidad", "precio")
+
     def __init__(self, id_unico, nombre, cantidad, precio):
         self.id = id_unico
         self.nombre = nombre
+        self.nombre_min = nombre.lower()  # se guarda para no recalcularlo en cada búsqueda
         self.cantidad = cantidad
         self.precio = precio
 
@@ -37,6 +83,9 @@ class Producto:
     def get_nombre(self):
         return self.nombre
 
+    def get_nombre_min(self):
+        return self.nombre_min
+
     def get_cantidad(self):
         return self.cantidad
 
@@ -46,6 +95,7 @@ class Producto:
     # Setters
     def set_nombre(self, nombre):
         self.nombre = nombre
+        self.nombre_min = nombre.lower()
 
     def set_cantidad(self, cantidad):
         self.cantidad = cantidad
@@ -57,18 +107,532 @@ class Producto:
         return f"ID: {self.id}, Nombre: {self.nombre}, Cantidad: {self.cantidad}, Precio: {self.precio:.2f}"
 
 
+# ---------------------------
+# Índice de trigramas para búsqueda por nombre
+# ---------------------------
+class IndiceTrigramas:
+    """
+    Índice invertido: trigrama (3 letras seguidas del nombre en minúsculas) -> IDs que lo contienen.
+    Una búsqueda solo revisa los productos que tienen todos los trigramas de la consulta.
+    """
+    def __init__(self):
+        self.trigramas = {}
+        self.orden = {}  # ID -> número de inserción, para devolver los resultados en orden
+        self._siguiente = 0
+
+    @staticmethod
+    def _trigramas(texto):
+        return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+    def agregar(self, id_unico, nombre_min):
+        self.orden[id_unico] = self._siguiente
+        self._siguiente += 1
+        for t in self._trigramas(nombre_min):
+            self.trigramas.setdefault(t, set()).add(id_unico)
+
+    def quitar(self, id_unico, nombre_min):
+        self.orden.pop(id_unico, None)
+        for t in self._trigramas(nombre_min):
+            ids = self.trigramas.get(t)
+            if ids is not None:
+                ids.discard(id_unico)
+                if not ids:
+                    del self.trigramas[t]
+
+    def renombrar(self, id_unico, anterior_min, nuevo_min):
+        # Solo se tocan los trigramas que cambian; el orden de inserción se conserva
+        anteriores = self._trigramas(anterior_min)
+        nuevos = self._trigramas(nuevo_min)
+        for t in anteriores - nuevos:
+            ids = self.trigramas.get(t)
+            if ids is not None:
+                ids.discard(id_unico)
+                if not ids:
+                    del self.trigramas[t]
+        for t in nuevos - anteriores:
+            self.trigramas.setdefault(t, set()).add(id_unico)
+
+    def candidatos(self, consulta_min):
+        """
+        Devuelve los IDs que contienen todos los trigramas de la consulta, en orden de inserción.
+        Retorna None si la consulta tiene menos de 3 letras (el índice no sirve).
+        """
+        trigramas = self._trigramas(consulta_min)
+        if not trigramas:
+            return None
+        # Se empieza por el conjunto más pequeño para que la intersección sea barata
+        conjuntos = sorted((self.trigramas.get(t, set()) for t in trigramas), key=len)
+        resultado = set(conjuntos[0])
+        for ids in conjuntos[1:]:
+            if not resultado:
+                break
+            resultado &= ids
+        return sorted(resultado, key=self.orden.__getitem__)
+
+
+# ---------------------------
+# Índice ordenado para consultas por rango (cantidad o precio)
+# ---------------------------
+class IndiceOrdenado:
+    """
+    Índice secundario: pares (valor, ID) siempre ordenados por valor.
+    Se guardan en varias listas ordenadas cortas (hasta 2 * CARGA pares cada una)
+    en lugar de una sola lista: insertar o quitar con bisect solo mueve los
+    elementos de una lista corta aunque haya millones de productos.
+    Rangos y top-k cuestan O(log n + k).
+    Los valores tienen que poder ordenarse: NaN se rechaza (no se podría volver a encontrar).
+    Se recuerda el valor con que se indexó cada ID, así quitar() y cambiar() encuentran el
+    par aunque el producto se haya modificado por fuera del Inventario (p.set_cantidad()).
+    """
+    CARGA = 512
+
+    def __init__(self):
+        self._listas = []   # listas ordenadas de (valor, ID), una a continuación de la otra
+        self._maximos = []  # último par de cada lista, para elegir la lista con bisect
+        self._valores = {}  # ID -> valor con el que está indexado
+
+    def __len__(self):
+        return len(self._valores)
+
+    def agregar(self, valor, id_unico):
+        if valor != valor:
+            raise ValueError(f"valor NaN para el ID {id_unico!r}: no se puede ordenar")
+        par = (valor, id_unico)
+        self._valores[id_unico] = valor
+        if not self._listas:
+            self._listas.append([par])
+            self._maximos.append(par)
+            return
+        i = bisect_left(self._maximos, par)
+        if i == len(self._listas):
+            # Mayor que todo lo anterior: va al final de la última lista
+            i -= 1
+            self._listas[i].append(par)
+            self._maximos[i] = par
+        else:
+            insort(self._listas[i], par)
+        lista = self._listas[i]
+        if len(lista) > 2 * self.CARGA:
+            # Lista demasiado larga: se parte en dos mitades
+            self._listas[i:i + 1] = [lista[:self.CARGA], lista[self.CARGA:]]
+            self._maximos[i:i + 1] = [lista[self.CARGA - 1], lista[-1]]
+
+    def quitar(self, id_unico):
+        """
+        Quita el ID con el valor con que se indexó. Lanza KeyError si el ID no está.
+        """
+        par = (self._valores.pop(id_unico), id_unico)
+        i = bisect_left(self._maximos, par)
+        lista = self._listas[i]
+        j = bisect_left(lista, par)
+        del lista[j]
+        if not lista:
+            del self._listas[i]
+            del self._maximos[i]
+        elif j == len(lista):
+            self._maximos[i] = lista[-1]
+
+    def cambiar(self, id_unico, nuevo):
+        if self._valores[id_unico] != nuevo:
+            self.quitar(id_unico)
+            self.agregar(nuevo, id_unico)
+
+    def rango(self, minimo=None, maximo=None, incluir_maximo=True):
+        """
+        Genera (valor, ID) con minimo <= valor <= maximo (o < maximo), de menor a mayor.
+        None = sin límite por ese lado.
+        """
+        i = j = 0
+        if minimo is not None:
+            # (minimo,) queda antes que cualquier (minimo, ID)
+            i = bisect_left(self._maximos, (minimo,))
+            if i < len(self._listas):
+                j = bisect_left(self._listas[i], (minimo,))
+        for lista in self._listas[i:]:
+            for k in range(j, len(lista)):
+                valor, id_unico = lista[k]
+                if maximo is not None and (valor > maximo or (valor == maximo and not incluir_maximo)):
+                    return
+                yield valor, id_unico
+            j = 0
+
+    def menores(self, k):
+        """
+        Los k pares de menor valor, de menor a mayor.
+        """
+        resultado = []
+        if k <= 0:
+            return resultado
+        for lista in self._listas:
+            resultado.extend(lista[:k - len(resultado)])
+            if len(resultado) >= k:
+                break
+        return resultado
+
+    def mayores(self, k):
+        """
+        Los k pares de mayor valor, de mayor a menor.
+        """
+        resultado = []
+        for lista in reversed(self._listas):
+            for par in reversed(lista):
+                if len(resultado) >= k:
+                    return resultado
+                resultado.append(par)
+        return resultado
+
+
+# ---------------------------
+# Snapshots atómicos (archivo temporal + fsync + rename)
+# ---------------------------
+# Niveles de durabilidad: cuánto se espera al disco en cada escritura.
+# - "ninguna":  sin fsync (lo más rápido; un corte de luz puede perder lo último escrito)
+# - "archivo":  fsync del archivo antes de renombrarlo
+# - "completa": fsync del archivo y también del directorio (el rename queda en disco)
+DURABILIDADES = ("ninguna", "archivo", "completa")
+MARCA_FIN = "#fin"  # línea de control al final del snapshot: #fin,<filas>,<crc32>
+
+
+class _EscritorCRC:
+    """
+    Envoltorio de un archivo binario que va calculando el CRC32 de lo escrito.
+    csv.writer solo necesita un método write().
+    """
+    def __init__(self, f):
+        self.f = f
+        self.crc = 0
+
+    def write(self, texto):
+        datos = texto.encode("utf-8")
+        self.crc = zlib.crc32(datos, self.crc)
+        self.f.write(datos)
+
+
+def _fsync_directorio(ruta):
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(ruta)), os.O_RDONLY)
+    except OSError:
+        return  # p. ej. Windows no permite abrir directorios
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def escribir_snapshot_atomico(ruta, encabezado, filas, durabilidad="archivo", generaciones=2):
+    """
+    Escribe un snapshot CSV sin riesgo de dejarlo a medias:
+    1) Se escribe todo en ruta.tmp, terminando con la línea de control #fin,<filas>,<crc32>.
+    2) fsync del temporal (según la durabilidad).
+    3) Se conservan las generaciones anteriores: ruta.1 es la versión previa, ruta.2 la anterior, etc.
+    4) os.replace(ruta.tmp, ruta): el cambio es atómico, se ve el archivo viejo o el nuevo completo.
+    Lanza OSError si algo falla; en ese caso el snapshot anterior queda intacto.
+    """
+    temporal = ruta + ".tmp"
+    with open(temporal, mode="wb") as f:
+        escritor = _EscritorCRC(f)
+        writer = csv.writer(escritor)
+        writer.writerow(encabezado)
+        total = 0
+        for fila in filas:
+            writer.writerow(fila)
+            total += 1
+        f.write(f"{MARCA_FIN},{total},{escritor.crc:08x}\r\n".encode("ascii"))
+        f.flush()
+        if durabilidad != "ninguna":
+            os.fsync(f.fileno())
+
+    if generaciones > 0 and os.path.exists(ruta):
+        for n in range(generaciones - 1, 0, -1):
+            if os.path.exists(f"{ruta}.{n}"):
+                os.replace(f"{ruta}.{n}", f"{ruta}.{n + 1}")
+        # Enlace duro: ruta.1 apunta al contenido actual sin copiarlo
+        if os.path.exists(ruta + ".1"):
+            os.remove(ruta + ".1")
+        try:
+            os.link(ruta, ruta + ".1")
+        except OSError:
+            shutil.copy2(ruta, ruta + ".1")
+
+    os.replace(temporal, ruta)
+    if durabilidad == "completa":
+        _fsync_directorio(ruta)
+
+
+def verificar_snapshot(ruta):
+    """
+    Revisa la línea de control del final del archivo.
+    Retorna "ok", "sin_control" (archivo antiguo o editado a mano: no se puede verificar)
+    o "dañado" (el CRC no coincide, p. ej. el archivo quedó truncado).
+    """
+    tamano = os.path.getsize(ruta)
+    with open(ruta, mode="rb") as f:
+        f.seek(max(0, tamano - 256))
+        cola = f.read()
+        contenido = cola.rstrip(b"\r\n")
+        corte = contenido.rfind(b"\n")
+        ultima = contenido[corte + 1:].strip()
+        if not ultima.startswith(MARCA_FIN.encode("ascii") + b","):
+            return "sin_control"
+        try:
+            _, _, crc_txt = ultima.decode("ascii").split(",")
+            crc_esperado = int(crc_txt, 16)
+        except ValueError:
+            return "dañado"
+
+        # CRC de todo lo anterior a la línea de control, leído por bloques
+        restante = tamano - len(cola) + corte + 1
+        f.seek(0)
+        crc = 0
+        while restante > 0:
+            bloque = f.read(min(1024 * 1024, restante))
+            if not bloque:
+                break
+            crc = zlib.crc32(bloque, crc)
+            restante -= len(bloque)
+    return "ok" if crc == crc_esperado else "dañado"
+
+
+def elegir_snapshot(ruta, generaciones):
+    """
+    Devuelve (ruta_a_cargar, aviso). Si el snapshot actual está dañado, busca la
+    generación más reciente que sí esté bien; aviso es None si no hubo problema.
+    Un archivo sin línea de control se acepta tal cual (versión anterior del programa
+    o creado a mano), salvo que la generación previa sí la tenga: entonces quedó truncado.
+    """
+    estado = verificar_snapshot(ruta)
+    if estado == "ok":
+        return ruta, None
+    previa = ruta + ".1"
+    if estado == "sin_control" and not (os.path.exists(previa) and verificar_snapshot(previa) == "ok"):
+        return ruta, None
+    for n in range(1, generaciones + 1):
+        anterior = f"{ruta}.{n}"
+        if os.path.exists(anterior) and verificar_snapshot(anterior) == "ok":
+            return anterior, f"'{ruta}' está dañado; se cargó la generación anterior '{anterior}'."
+    return ruta, f"'{ruta}' está dañado y no hay generaciones válidas; se cargan las filas legibles."
+
+
+# ---------------------------
+# Carga por bloques (en paralelo para archivos grandes)
+# ---------------------------
+UMBRAL_CARGA_PARALELA = 8 * 1024 * 1024  # bytes; por debajo no compensa lanzar procesos
+
+
+def _dividir_en_bloques(ruta, inicio, fin, n_bloques):
+    """
+    Divide el rango [inicio, fin) del archivo en n_bloques rangos de bytes
+    que empiezan siempre al comienzo de una línea.
+    NOTA: supone que ningún nombre contiene saltos de línea.
+    """
+    limites = [inicio]
+    with open(ruta, mode="rb") as f:
+        for i in range(1, n_bloques):
+            pos = inicio + (fin - inicio) * i // n_bloques
+            if pos <= limites[-1]:
+                continue
+            f.seek(pos - 1)
+            f.readline()  # avanza hasta el inicio de la línea siguiente
+            pos = f.tell()
+            if limites[-1] < pos < fin:
+                limites.append(pos)
+    limites.append(fin)
+    return list(zip(limites, limites[1:]))
+
+
+def validar_fila(fila):
+    """
+    Reglas de siempre para una fila del archivo (también las usa importar_catalogo.py):
+    se salta la línea de control y los encabezados repetidos, y es corrupta toda fila
+    con campos faltantes o tipos inválidos.
+    Retorna (producto, motivo): producto = (id, nombre, cantidad, precio) si la fila es
+    válida; motivo = por qué es corrupta; los dos None si la línea solo se salta.
+    """
+    if fila and fila[0] == MARCA_FIN:
+        # Línea de control del snapshot, no es un producto
+        return None, None
+    # Cada fila debe tener 4 campos: id, nombre, cantidad, precio
+    if len(fila) != 4:
+        return None, f"se esperaban 4 campos y hay {len(fila)}"
+    id_unico, nombre, cant_str, precio_str = fila
+    if id_unico == "id" and nombre == "nombre":
+        # Si reencuentra encabezado, lo salta
+        return None, None
+    # Tipos inválidos
+    try:
+        cantidad = int(cant_str)
+    except ValueError:
+        return None, f"cantidad no es un número entero: {cant_str!r}"
+    try:
+        precio = float(precio_str)
+    except ValueError:
+        return None, f"precio no es un número: {precio_str!r}"
+    if not math.isfinite(precio):
+        # NaN o infinito: no se pueden ordenar en el índice de precios
+        return None, f"precio no es un número finito: {precio_str!r}"
+    return (id_unico, nombre, cantidad, precio), None
+
+
+def _parsear_bloque(ruta, inicio, fin):
+    """
+    Parsea las filas de un rango de bytes del snapshot (puede correr en otro proceso).
+    Retorna (filas, errores) con filas = [(id, nombre, cantidad, precio), ...]
+    """
+    with open(ruta, mode="rb") as f:
+        f.seek(inicio)
+        texto = f.read(fin - inicio).decode("utf-8", errors="replace")
+    filas = []
+    errores = 0
+    for fila in csv.reader(io.StringIO(texto, newline="")):
+        producto, motivo = validar_fila(fila)
+        if producto is not None:
+            filas.append(producto)
+        elif motivo is not None:
+            errores += 1
+    return filas, errores
+
+
+def parsear_snapshot(ruta, procesos=None, progreso=None):
+    """
+    Lee un snapshot completo. Si el archivo supera UMBRAL_CARGA_PARALELA, lo divide
+    en bloques de bytes que se parsean en un pool de procesos; si no (o si no se
+    pueden crear procesos), lo parsea en este mismo proceso.
+    progreso: función opcional progreso(bloques_listos, total_bloques).
+    Retorna una lista, en orden de archivo, de (inicio, fin, filas, errores) por bloque.
+    """
+    with open(ruta, mode="rb") as f:
+        primera = f.readline()
+    encabezado = next(csv.reader([primera.decode("utf-8", errors="replace")]), None)
+    # Si no hay encabezado válido, asumimos que no tiene encabezado y se lee desde el principio
+    inicio = len(primera) if encabezado is not None and len(encabezado) >= 4 else 0
+    fin = os.path.getsize(ruta)
+
+    procesos = procesos or os.cpu_count() or 1
+    if procesos > 1 and fin - inicio >= UMBRAL_CARGA_PARALELA:
+        bloques = _dividir_en_bloques(ruta, inicio, fin, procesos * 4)
+        try:
+            resultados = [None] * len(bloques)
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                futuros = {pool.submit(_parsear_bloque, ruta, a, b): i for i, (a, b) in enumerate(bloques)}
+                for listos, futuro in enumerate(as_completed(futuros), start=1):
+                    resultados[futuros[futuro]] = futuro.result()
+                    if progreso:
+                        progreso(listos, len(bloques))
+            return [(a, b, filas, errores) for (a, b), (filas, errores) in zip(bloques, resultados)]
+        except (OSError, BrokenProcessPool):
+            pass  # sin procesos disponibles: se sigue en secuencial
+
+    filas, errores = _parsear_bloque(ruta, inicio, fin)
+    if progreso:
+        progreso(1, 1)
+    return [(inicio, fin, filas, errores)]
+
+
+# ---------------------------
+# Bloqueo entre procesos
+# ---------------------------
+class BloqueoArchivo:
+    """
+    Bloqueo exclusivo entre procesos sobre un archivo auxiliar (p. ej. inventario.txt.lock).
+    Usa fcntl.flock en Linux/macOS y msvcrt.locking en Windows.
+    Es reentrante dentro del proceso (un RLock ordena también a los hilos): una transacción
+    puede tomarlo y las operaciones que hace adentro volver a pedirlo.
+    """
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._hilos = threading.RLock()
+        self._nivel = 0
+        # Se abre una vez al crear el inventario: si no se puede, el error aparece al inicio
+        self._f = open(ruta, mode="a+b")
+
+    def __enter__(self):
+        self._hilos.acquire()
+        if self._nivel == 0:
+            try:
+                self._tomar()
+            except OSError:
+                self._hilos.release()
+                raise
+        self._nivel += 1
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self._nivel -= 1
+        try:
+            if self._nivel == 0:
+                self._soltar()
+        finally:
+            self._hilos.release()
+        return False
+
+    def _tomar(self):
+        if fcntl is not None:
+            fcntl.flock(self._f.fileno(), fcntl.LOCK_EX)
+            return
+        self._f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(self._f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError as e:
+                # LK_LOCK se rinde tras ~10 segundos; mientras otro proceso lo tenga, se sigue esperando
+                if e.errno not in (errno.EACCES, getattr(errno, "EDEADLOCK", errno.EDEADLK)):
+                    raise
+
+    def _soltar(self):
+        if fcntl is not None:
+            fcntl.flock(self._f.fileno(), fcntl.LOCK_UN)
+        else:
+            self._f.seek(0)
+            msvcrt.locking(self._f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
 # ---------------------------
 # Clase Inventario (con archivo)
 # ---------------------------
 class Inventario:
     """
-    Esta clase mantiene una lista en memoria y además la sincroniza con un archivo CSV.
+    Esta clase mantiene los productos en memoria y además los sincroniza con un archivo CSV.
     Cada operación que modifica el inventario intenta guardarse inmediatamente en el archivo.
     """
-    def __init__(self, ruta_archivo="inventario.txt"):
-        self.productos = []
+    def __init__(self, ruta_archivo="inventario.txt", usar_journal=False, umbral_compactacion=1024 * 1024,
+                 durabilidad="archivo", generaciones=2, procesos=None, progreso=None, multiproceso=False):
+        if durabilidad not in DURABILIDADES:
+            raise ValueError(f"durabilidad debe ser una de {DURABILIDADES}")
+        # Diccionario ID -> Producto: índice O(1) por ID que conserva el orden de inserción
+        self.productos = {}
+        # Índice de trigramas para buscar_nombre; se mantiene en cada alta, baja o cambio de nombre
+        self.indice_nombres = IndiceTrigramas()
+        # Índices ordenados (valor, ID) para rangos, top-k y reporte de bajo stock
+        self.indice_cantidad = IndiceOrdenado()
+        self.indice_precio = IndiceOrdenado()
         self.ruta_archivo = ruta_archivo
-        ok, msg = self._cargar_desde_archivo()
+        # Modo journal: los cambios se agregan al log y el snapshot CSV se reescribe solo al compactar
+        self.usar_journal = usar_journal
+        self.ruta_journal = ruta_archivo + ".log"
+        self.ruta_journal_compactando = ruta_archivo + ".log.compactando"
+        self.umbral_compactacion = umbral_compactacion  # tamaño del log (bytes) que dispara la compactación
+        self._hilo_compactacion = None
+        self.durabilidad = durabilidad    # ver DURABILIDADES: costo de fsync vs. seguridad
+        self.generaciones = generaciones  # snapshots anteriores que se conservan (inventario.txt.1, .2, ...)
+        self.procesos = procesos          # procesos para la carga en paralelo (None = núcleos disponibles)
+        self.progreso = progreso          # función opcional progreso(bloques_listos, total_bloques)
+        self.reporte_carga = []           # (inicio, fin, filas, errores) por bloque de la última carga
+        self._transaccion = None  # Transaccion en curso (o None)
+        # Modo multiproceso: varios programas (p. ej. varias cajas) sobre el mismo archivo.
+        # Cada cambio se hace con el archivo bloqueado y después de leer lo que escribieron los demás.
+        self.multiproceso = multiproceso
+        self._bloqueo = BloqueoArchivo(ruta_archivo + ".lock") if multiproceso else nullcontext()
+        # Cómo estaban los archivos la última vez que este proceso los leyó o escribió
+        self._marca_snapshot = None      # (inodo, mtime, tamaño) de inventario.txt
+        self._marca_compactando = None   # ídem del log en compactación (o None)
+        self._marca_journal = None       # inodo del journal actual (o None)
+        self._offset_journal = 0         # bytes del journal ya aplicados en memoria
+        with self._bloqueo:
+            ok, msg = self._cargar_desde_archivo()
+            self._registrar_estado()
         # Guardamos el estado del último mensaje de archivo para que el menú pueda mostrarlo si se desea
         self.ultimo_mensaje_archivo = msg
 
@@ -80,95 +644,513 @@ class Inventario:
         Agrega un producto verificando que el ID sea único.
         Retorna (ok: bool, msg: str)
         """
-        for p in self.productos:
-            if p.get_id() == producto.get_id():
+        with self._bloqueo:
+            error = self._cambios_externos()
+            if error:
+                return False, error
+            if producto.get_id() in self.productos:
                 return False, "Error: el ID ya existe en el inventario."
+            if not math.isfinite(producto.get_precio()):
+                return False, "Error: el precio tiene que ser un número finito."
 
-        self.productos.append(producto)
-        ok, msg = self._guardar_a_archivo()
-        if ok:
-            return True, "Producto agregado y guardado en archivo correctamente."
-        else:
-            # Si falló el guardado, revertimos el cambio en memoria para mantener consistencia
-            self.productos.pop()
-            return False, f"Error guardando en archivo. Operación revertida. Detalle: {msg}"
+            self._alta_en_memoria(producto)
+            ok, msg = self._persistir(["A", producto.get_id(), producto.get_nombre(),
+                                       producto.get_cantidad(), f"{producto.get_precio():.2f}"],
+                                      lambda: self._baja_en_memoria(producto.get_id()))
+            if ok:
+                return True, "Producto agregado y guardado en archivo correctamente."
+            else:
+                # Si falló el guardado, revertimos el cambio en memoria para mantener consistencia
+                self._baja_en_memoria(producto.get_id())
+                return False, f"Error guardando en archivo. Operación revertida. Detalle: {msg}"
 
     def eliminar(self, id_unico):
         """
         Elimina un producto por ID.
         Retorna (ok: bool, msg: str)
         """
-        for p in self.productos:
-            if p.get_id() == id_unico:
-                self.productos.remove(p)
-                ok, msg = self._guardar_a_archivo()
-                if ok:
-                    return True, "Producto eliminado y cambios guardados en archivo."
-                else:
-                    # Si falla guardado, intentamos revertir (re-agregar)
-                    self.productos.append(p)
-                    return False, f"Error guardando en archivo. Operación revertida. Detalle: {msg}"
-        return False, "No se encontró el producto con ese ID."
+        with self._bloqueo:
+            error = self._cambios_externos()
+            if error:
+                return False, error
+            p = self._baja_en_memoria(id_unico)
+            if p is None:
+                return False, "No se encontró el producto con ese ID."
+            ok, msg = self._persistir(["E", id_unico], lambda: self._alta_en_memoria(p))
+            if ok:
+                return True, "Producto eliminado y cambios guardados en archivo."
+            else:
+                # Si falla guardado, intentamos revertir (re-agregar)
+                self._alta_en_memoria(p)
+                return False, f"Error guardando en archivo. Operación revertida. Detalle: {msg}"
+
+    def actualizar_nombre(self, id_unico, nuevo_nombre):
+        """
+        Cambia el nombre de un producto (y actualiza el índice de búsqueda).
+        Retorna (ok: bool, msg: str)
+        """
+        with self._bloqueo:
+            error = self._cambios_externos(id_unico)
+            if error:
+                return False, error
+            p = self.productos.get(id_unico)
+            if p is None:
+                return False, "No se encontró el producto con ese ID."
+            anterior = p.get_nombre()
+            self._renombrar_en_memoria(p, nuevo_nombre)
+            ok, msg = self._persistir(["N", id_unico, nuevo_nombre],
+                                      lambda: self._renombrar_en_memoria(p, anterior))
+            if ok:
+                return True, "Nombre actualizado y guardado en archivo."
+            else:
+                # revertir
+                self._renombrar_en_memoria(p, anterior)
+                return False, f"Error guardando en archivo. Operación revertida. Detalle: {msg}"
 
     def actualizar_cantidad(self, id_unico, nueva_cantidad):
         """
-        Actualiza la cantidad de un producto.
+        Actualiza la cantidad de un producto (valor absoluto).
+        En modo multiproceso se rechaza si otro proceso cambió el producto desde la
+        última sincronización; para ventas o reposiciones conviene ajustar_cantidad().
         Retorna (ok: bool, msg: str)
         """
-        for p in self.productos:
-            if p.get_id() == id_unico:
-                anterior = p.get_cantidad()
-                p.set_cantidad(nueva_cantidad)
-                ok, msg = self._guardar_a_archivo()
-                if ok:
-                    return True, "Cantidad actualizada y guardada en archivo."
-                else:
-                    # revertir
-                    p.set_cantidad(anterior)
-                    return False, f"Error guardando en archivo. Operación revertida. Detalle: {msg}"
-        return False, "No se encontró el producto con ese ID."
+        with self._bloqueo:
+            error = self._cambios_externos(id_unico)
+            if error:
+                return False, error
+            return self._guardar_cantidad(id_unico, nueva_cantidad)
+
+    def ajustar_cantidad(self, id_unico, diferencia):
+        """
+        Suma (o resta, si es negativa) unidades a la cantidad actual: -2 = se vendieron 2.
+        Se calcula sobre el valor más reciente del archivo, así dos cajas que venden el
+        mismo producto a la vez no se pisan. No permite dejar el stock en negativo.
+        Retorna (ok: bool, msg: str)
+        """
+        with self._bloqueo:
+            error = self._cambios_externos()
+            if error:
+                return False, error
+            p = self.productos.get(id_unico)
+            if p is None:
+                return False, "No se encontró el producto con ese ID."
+            nueva_cantidad = p.get_cantidad() + diferencia
+            if nueva_cantidad < 0:
+                return False, f"Stock insuficiente: quedan {p.get_cantidad()} unidad(es)."
+            return self._guardar_cantidad(id_unico, nueva_cantidad)
+
+    def _guardar_cantidad(self, id_unico, nueva_cantidad):
+        p = self.productos.get(id_unico)
+        if p is None:
+            return False, "No se encontró el producto con ese ID."
+        anterior = p.get_cantidad()
+        self._cambiar_cantidad_en_memoria(p, nueva_cantidad)
+        ok, msg = self._persistir(["C", id_unico, nueva_cantidad],
+                                  lambda: self._cambiar_cantidad_en_memoria(p, anterior))
+        if ok:
+            return True, "Cantidad actualizada y guardada en archivo."
+        else:
+            # revertir
+            self._cambiar_cantidad_en_memoria(p, anterior)
+            return False, f"Error guardando en archivo. Operación revertida. Detalle: {msg}"
 
     def actualizar_precio(self, id_unico, nuevo_precio):
         """
         Actualiza el precio de un producto.
         Retorna (ok: bool, msg: str)
         """
-        for p in self.productos:
-            if p.get_id() == id_unico:
-                anterior = p.get_precio()
-                p.set_precio(nuevo_precio)
-                ok, msg = self._guardar_a_archivo()
+        with self._bloqueo:
+            error = self._cambios_externos(id_unico)
+            if error:
+                return False, error
+            p = self.productos.get(id_unico)
+            if p is None:
+                return False, "No se encontró el producto con ese ID."
+            if not math.isfinite(nuevo_precio):
+                return False, "Error: el precio tiene que ser un número finito."
+            anterior = p.get_precio()
+            self._cambiar_precio_en_memoria(p, nuevo_precio)
+            ok, msg = self._persistir(["P", id_unico, f"{nuevo_precio:.2f}"],
+                                      lambda: self._cambiar_precio_en_memoria(p, anterior))
+            if ok:
+                return True, "Precio actualizado y guardado en archivo."
+            else:
+                # revertir
+                self._cambiar_precio_en_memoria(p, anterior)
+                return False, f"Error guardando en archivo. Operación revertida. Detalle: {msg}"
+
+    def refrescar(self):
+        """
+        Trae a memoria los cambios que guardaron otros procesos (modo multiproceso).
+        Conviene llamarlo antes de mostrar datos; las operaciones que modifican lo hacen solas.
+        Retorna (ok: bool, msg: str)
+        """
+        if not self.multiproceso:
+            return True, "Sin otros procesos: no hay nada que refrescar."
+        try:
+            with self._bloqueo:
+                cambiados = self._sincronizar()
+        except OSError as e:
+            return False, f"No se pudieron leer los cambios de otros procesos. Detalle: {e}"
+        if cambiados:
+            return True, f"{len(cambiados)} producto(s) actualizados por otros procesos."
+        return True, "Sin cambios de otros procesos."
+
+    # -----------------------
+    # Transacciones y lotes
+    # -----------------------
+    def transaccion(self):
+        """
+        Agrupa varias operaciones en una sola escritura a disco. Uso:
+            with inventario.transaccion() as tx:
+                inventario.actualizar_cantidad("P001", 10)
+                inventario.actualizar_precio("P002", 0.35)
+            print(tx.msg)
+        Dentro del bloque los cambios se aplican solo en memoria; al salir se guardan
+        una vez. Si el guardado falla o hay una excepción, se revierten todos.
+        """
+        return Transaccion(self)
+
+    def bulk_update(self, cambios):
+        """
+        Aplica muchos ajustes de una vez (por ejemplo, un manifiesto de entrega).
+        cambios: iterable de (id_unico, nueva_cantidad, nuevo_precio); None = no cambiar ese campo.
+        Primero se valida todo el lote (IDs repetidos, IDs inexistentes, tipos) y,
+        si no hay errores, se aplica en una transacción que guarda una sola vez.
+        Retorna (ok: bool, msg: str)
+        """
+        # Se valida contra el estado más reciente del archivo y nadie escribe hasta terminar
+        with self._bloqueo:
+            error = self._cambios_externos()
+            if error:
+                return False, error
+            validados = []
+            vistos = set()
+            errores = []
+            for n, cambio in enumerate(cambios, start=1):
+                try:
+                    id_unico, cantidad, precio = cambio
+                    cantidad = None if cantidad is None else int(cantidad)
+                    precio = None if precio is None else float(precio)
+                except (TypeError, ValueError, OverflowError):
+                    errores.append(f"cambio {n}: formato o tipo inválido")
+                    continue
+                if precio is not None and not math.isfinite(precio):
+                    errores.append(f"cambio {n}: el precio tiene que ser un número finito")
+                    continue
+                if id_unico in vistos:
+                    errores.append(f"cambio {n}: ID '{id_unico}' repetido en el lote")
+                    continue
+                vistos.add(id_unico)
+                if id_unico not in self.productos:
+                    errores.append(f"cambio {n}: no existe el ID '{id_unico}'")
+                    continue
+                validados.append((id_unico, cantidad, precio))
+
+            if errores:
+                detalle = "; ".join(errores[:5])
+                if len(errores) > 5:
+                    detalle += f" (y {len(errores) - 5} más)"
+                return False, f"Lote rechazado, no se aplicó ningún cambio. {len(errores)} error(es): {detalle}"
+
+            with self.transaccion() as tx:
+                for id_unico, cantidad, precio in validados:
+                    if cantidad is not None:
+                        self.actualizar_cantidad(id_unico, cantidad)
+                    if precio is not None:
+                        self.actualizar_precio(id_unico, precio)
+            if tx.ok:
+                return True, f"Lote aplicado: {len(validados)} producto(s) actualizado(s). {tx.msg}"
+            return False, tx.msg
+
+    def importar_productos(self, productos):
+        """
+        Alta o actualización (upsert) de muchos productos con una sola escritura al final
+        (la usa importar_catalogo.py). productos: iterable de (id, nombre, cantidad, precio)
+        ya validados y sin IDs repetidos; se consume de a uno, puede ser un generador.
+        A diferencia de una transacción no se anota cómo deshacer cada cambio: si algo
+        falla, se vuelve a cargar el inventario desde el archivo, que no se tocó.
+        Retorna (ok: bool, msg: str, conteo: {"nuevos", "actualizados", "sin_cambios"})
+        """
+        conteo = {"nuevos": 0, "actualizados": 0, "sin_cambios": 0}
+        if self._transaccion is not None:
+            return False, "No se puede importar dentro de una transacción.", conteo
+        # La compactación en curso también escribe el snapshot: se espera a que termine
+        self.esperar_compactacion()
+        with self._bloqueo:
+            error = self._cambios_externos()
+            if error:
+                return False, error, conteo
+            try:
+                for id_unico, nombre, cantidad, precio in productos:
+                    p = self.productos.get(id_unico)
+                    if p is None:
+                        self._alta_en_memoria(Producto(id_unico, nombre, cantidad, precio))
+                        conteo["nuevos"] += 1
+                        continue
+                    if (p.get_nombre(), p.get_cantidad(), p.get_precio()) == (nombre, cantidad, precio):
+                        conteo["sin_cambios"] += 1
+                        continue
+                    if p.get_nombre() != nombre:
+                        self._renombrar_en_memoria(p, nombre)
+                    if p.get_cantidad() != cantidad:
+                        self._cambiar_cantidad_en_memoria(p, cantidad)
+                    if p.get_precio() != precio:
+                        self._cambiar_precio_en_memoria(p, precio)
+                    conteo["actualizados"] += 1
+            except BaseException:
+                # Error leyendo la fuente (o Ctrl+C): se descarta lo importado hasta aquí
+                self._descartar_importacion()
+                raise
+
+            if not conteo["nuevos"] and not conteo["actualizados"]:
+                return True, "Importación sin cambios: nada que guardar.", conteo
+            if self.usar_journal:
+                # El snapshot nuevo ya incluye todo el journal: se escribe y se borran los logs
+                ok, msg = self._compactar(en_segundo_plano=False)
                 if ok:
-                    return True, "Precio actualizado y guardado en archivo."
-                else:
-                    # revertir
-                    p.set_precio(anterior)
-                    return False, f"Error guardando en archivo. Operación revertida. Detalle: {msg}"
-        return False, "No se encontró el producto con ese ID."
+                    self._registrar_estado()
+            else:
+                ok, msg = self._guardar_a_archivo()
+            if not ok:
+                aviso = self._descartar_importacion()
+                return False, f"Error guardando la importación. No se importó ningún producto. Detalle: {msg}{aviso}", conteo
+            return True, (f"Importación guardada: {conteo['nuevos']} nuevo(s), {conteo['actualizados']} "
+                          f"actualizado(s), {conteo['sin_cambios']} sin cambios."), conteo
+
+    def _descartar_importacion(self):
+        """
+        Deja en memoria lo que hay en el archivo. Retorna un aviso si no se pudo leer.
+        """
+        try:
+            self._recargar()
+        except OSError as e:
+            return f" Aviso: no se pudo volver a leer el archivo, la memoria puede no coincidir con él ({e})."
+        return ""
 
     def buscar_nombre(self, nombre):
         """
         Devuelve una lista de productos cuyo nombre contenga el texto buscado (case-insensitive).
+        Con 3 o más letras el índice de trigramas reduce los candidatos antes de comparar.
         """
+        consulta = nombre.lower()
+        candidatos = self.indice_nombres.candidatos(consulta)
+        if candidatos is None:
+            # Consulta de menos de 3 letras: se recorre, pero con los nombres ya en minúsculas
+            return [p for p in self.productos.values() if consulta in p.get_nombre_min()]
         resultados = []
-        for p in self.productos:
-            if nombre.lower() in p.get_nombre().lower():
+        for id_unico in candidatos:
+            p = self.productos[id_unico]
+            if consulta in p.get_nombre_min():
                 resultados.append(p)
         return resultados
 
     def mostrar_todos(self):
         """
-        Devuelve la lista completa de productos.
+        Devuelve la lista completa de productos (en orden de inserción).
+        """
+        return list(self.productos.values())
+
+    # -----------------------
+    # Consultas por cantidad y precio (índices ordenados)
+    # -----------------------
+    def _indice_orden(self, campo):
+        if campo == "cantidad":
+            return self.indice_cantidad
+        if campo == "precio":
+            return self.indice_precio
+        raise ValueError("campo debe ser 'cantidad' o 'precio'")
+
+    def productos_en_rango(self, campo, minimo=None, maximo=None):
+        """
+        Productos con minimo <= campo <= maximo ("cantidad" o "precio"), ordenados por ese campo.
+        None = sin límite por ese lado. Costo O(log n + k), sin recorrer el inventario.
+        """
+        return [self.productos[i] for _, i in self._indice_orden(campo).rango(minimo, maximo)]
+
+    def top_productos(self, campo, k, mayores=True):
+        """
+        Los k productos con mayor (o menor) cantidad o precio.
+        """
+        indice = self._indice_orden(campo)
+        pares = indice.mayores(k) if mayores else indice.menores(k)
+        return [self.productos[i] for _, i in pares]
+
+    def bajo_stock(self, umbral):
+        """
+        Reporte de reposición: productos con menos de `umbral` unidades, de menor a mayor cantidad.
+        """
+        return [self.productos[i] for _, i in self.indice_cantidad.rango(None, umbral, incluir_maximo=False)]
+
+    # -----------------------
+    # Cambios en memoria (productos + índices)
+    # -----------------------
+    def _alta_en_memoria(self, producto):
+        self.productos[producto.get_id()] = producto
+        self.indice_nombres.agregar(producto.get_id(), producto.get_nombre_min())
+        self.indice_cantidad.agregar(producto.get_cantidad(), producto.get_id())
+        self.indice_precio.agregar(producto.get_precio(), producto.get_id())
+
+    def _baja_en_memoria(self, id_unico):
+        """
+        Quita el producto de memoria y del índice. Retorna el producto o None si no existía.
+        """
+        p = self.productos.get(id_unico)
+        if p is not None:
+            # Primero los índices: si alguno falla, el producto sigue en el diccionario
+            self.indice_nombres.quitar(id_unico, p.get_nombre_min())
+            self.indice_cantidad.quitar(id_unico)
+            self.indice_precio.quitar(id_unico)
+            del self.productos[id_unico]
+        return p
+
+    def _renombrar_en_memoria(self, producto, nuevo_nombre):
+        anterior_min = producto.get_nombre_min()
+        producto.set_nombre(nuevo_nombre)
+        self.indice_nombres.renombrar(producto.get_id(), anterior_min, producto.get_nombre_min())
+
+    def _cambiar_cantidad_en_memoria(self, producto, nueva_cantidad):
+        self.indice_cantidad.cambiar(producto.get_id(), nueva_cantidad)
+        producto.set_cantidad(nueva_cantidad)
+
+    def _cambiar_precio_en_memoria(self, producto, nuevo_precio):
+        self.indice_precio.cambiar(producto.get_id(), nuevo_precio)
+        producto.set_precio(nuevo_precio)
+
+    # -----------------------
+    # Varios procesos: detección de cambios externos
+    # -----------------------
+    @staticmethod
+    def _identidad(ruta):
+        """
+        (inodo, mtime en ns, tamaño) del archivo, o None si no existe.
+        """
+        try:
+            st = os.stat(ruta)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _registrar_estado(self, journal=True):
+        """
+        Anota cómo quedaron los archivos después de que este proceso los leyó o escribió
+        (siempre con el archivo bloqueado). journal=False deja sin tocar la posición del
+        journal: lo usa la compactación, que no leyó lo que otros agregaron al log nuevo.
+        """
+        self._marca_snapshot = self._identidad(self.ruta_archivo)
+        self._marca_compactando = self._identidad(self.ruta_journal_compactando)
+        if journal:
+            marca = self._identidad(self.ruta_journal)
+            self._marca_journal = marca[0] if marca else None
+            self._offset_journal = marca[2] if marca else 0
+
+    def _sincronizar(self):
+        """
+        Trae a memoria lo que otros procesos guardaron desde la última lectura o escritura.
+        Se llama con el archivo bloqueado.
+        - Mismo snapshot y mismo journal, más largo: solo se aplica la cola nueva del journal.
+        - Otro proceso reescribió el snapshot o compactó el journal: se recarga todo.
+        Retorna el conjunto de IDs que cambiaron. Lanza OSError si no se pudo leer.
+        """
+        if not self.multiproceso:
+            return set()
+        if (self._identidad(self.ruta_archivo) == self._marca_snapshot
+                and self._identidad(self.ruta_journal_compactando) == self._marca_compactando):
+            journal = self._identidad(self.ruta_journal)
+            if journal is None:
+                if self._offset_journal == 0:
+                    return set()
+            elif (journal[0] == self._marca_journal or self._offset_journal == 0) \
+                    and journal[2] >= self._offset_journal:
+                if journal[2] == self._offset_journal:
+                    return set()
+                self._marca_journal = journal[0]
+                return self._leer_cola_journal()
+        return self._recargar()
+
+    def _leer_cola_journal(self):
+        """
+        Aplica los registros agregados al journal después de self._offset_journal.
+        Retorna los IDs tocados.
+        """
+        tocados = set()
+        _, _, fin_valido = self._reproducir_log(self.ruta_journal, self._offset_journal, tocados)
+        if fin_valido < os.path.getsize(self.ruta_journal):
+            # Otro proceso se cortó a mitad de una escritura: se recorta su registro incompleto
+            os.truncate(self.ruta_journal, fin_valido)
+        self._offset_journal = fin_valido
+        return tocados
+
+    def _recargar(self):
+        """
+        Recarga snapshot y journal desde cero. Si falla, la memoria queda como estaba.
+        Retorna los IDs cuyo contenido cambió respecto de lo que había en memoria.
         """
-        return self.productos
+        anteriores = {i: (p.get_nombre(), p.get_cantidad(), p.get_precio()) for i, p in self.productos.items()}
+        estructuras = (self.productos, self.indice_nombres, self.indice_cantidad, self.indice_precio)
+        self.productos = {}
+        self.indice_nombres = IndiceTrigramas()
+        self.indice_cantidad = IndiceOrdenado()
+        self.indice_precio = IndiceOrdenado()
+        ok, msg = self._cargar_snapshot()
+        if ok and self.usar_journal:
+            ok, msg = self._reproducir_journal()
+        if not ok:
+            self.productos, self.indice_nombres, self.indice_cantidad, self.indice_precio = estructuras
+            raise OSError(msg)
+        self._registrar_estado()
+        cambiados = {i for i in anteriores if i not in self.productos}
+        for i, p in self.productos.items():
+            if anteriores.get(i) != (p.get_nombre(), p.get_cantidad(), p.get_precio()):
+                cambiados.add(i)
+        return cambiados
+
+    def _cambios_externos(self, id_unico=None):
+        """
+        Sincroniza antes de un cambio. Retorna un mensaje de error si no se pudo leer el
+        archivo o si otro proceso modificó id_unico desde la última sincronización
+        (conflicto: el valor que vio el usuario ya no es el actual); si no, None.
+        """
+        try:
+            cambiados = self._sincronizar()
+        except OSError as e:
+            return f"No se pudieron leer los cambios de otros procesos. Operación cancelada. Detalle: {e}"
+        if id_unico is not None and id_unico in cambiados:
+            p = self.productos.get(id_unico)
+            estado = f"ahora {p}" if p is not None else "ya no existe"
+            return (f"Conflicto: otro proceso modificó el producto {id_unico} ({estado}). "
+                    f"Revisa los datos y vuelve a intentarlo.")
+        return None
 
     # -----------------------
     # Persistencia en archivo
     # -----------------------
     def _cargar_desde_archivo(self):
+        """
+        Carga el snapshot CSV y, en modo journal, reproduce encima los cambios del log.
+        Retorna (ok: bool, msg: str)
+        """
+        ok, msg = self._cargar_snapshot()
+        if not ok or not self.usar_journal:
+            return ok, msg
+
+        compactacion_pendiente = os.path.exists(self.ruta_journal_compactando)
+        ok_j, msg_j = self._reproducir_journal()
+        if not ok_j:
+            return False, f"{msg} {msg_j}"
+        if compactacion_pendiente:
+            # Una compactación anterior quedó a medias (p. ej. el programa se cerró):
+            # la terminamos ahora, en este mismo hilo, antes de aceptar nuevos cambios.
+            ok_c, msg_c = self._compactar(en_segundo_plano=False)
+            if not ok_c:
+                return True, f"{msg} {msg_j} Aviso: {msg_c}"
+        return True, f"{msg} {msg_j}"
+
+    def _cargar_snapshot(self):
         """
         Carga productos desde el archivo CSV (self.ruta_archivo).
         - Si el archivo no existe, lo crea con encabezado.
+        - Si la línea de control indica que está dañado, usa la última generación válida.
         - Si una línea está corrupta (campos faltantes, tipos inválidos), se omite y se informa.
         Retorna (ok: bool, msg: str)
         """
@@ -185,44 +1167,32 @@ class Inventario:
             except OSError as e:
                 return False, f"No se pudo crear el archivo '{self.ruta_archivo}'. Detalle: {e}"
 
-        # Si existe, lo leemos:
+        # Si existe, lo leemos (por bloques; en paralelo si es grande):
         errores = 0
         cargados = 0
         try:
-            with open(self.ruta_archivo, mode="r", newline="", encoding="utf-8") as f:
-                reader = csv.reader(f)
-                encabezado = next(reader, None)  # Puede ser None si el archivo está vacío
-                # Si no hay encabezado válido, asumimos que no tiene encabezado y volvemos a leer desde el principio
-                if encabezado is None or len(encabezado) < 4:
-                    f.seek(0)
-                    reader = csv.reader(f)
-
-                for fila in reader:
-                    # Cada fila debe tener 4 campos: id, nombre, cantidad, precio
-                    if len(fila) != 4:
-                        errores += 1
-                        continue
-                    id_unico, nombre, cant_str, precio_str = fila
-                    if id_unico == "id" and nombre == "nombre":
-                        # Si reencuentra encabezado, lo salta
-                        continue
-                    try:
-                        cantidad = int(cant_str)
-                        precio = float(precio_str)
-                    except ValueError:
-                        # Tipos inválidos
-                        errores += 1
-                        continue
-
-                    # Si pasa todo, lo agregamos a memoria
-                    self.productos.append(Producto(id_unico, nombre, cantidad, precio))
+            ruta, aviso = elegir_snapshot(self.ruta_archivo, self.generaciones)
+            aviso = f" Aviso: {aviso}" if aviso else ""
+            bloques = parsear_snapshot(ruta, self.procesos, self.progreso)
+            self.reporte_carga = [(inicio, fin, len(filas), errores_bloque)
+                                  for inicio, fin, filas, errores_bloque in bloques]
+            # Se unen los bloques en el orden del archivo
+            for _, _, filas, errores_bloque in bloques:
+                errores += errores_bloque
+                for id_unico, nombre, cantidad, precio in filas:
+                    # Si el ID se repite en el archivo, gana la última línea
+                    self._baja_en_memoria(id_unico)
+                    self._alta_en_memoria(Producto(id_unico, nombre, cantidad, precio))
                     cargados += 1
 
             if errores == 0:
-                return True, f"Inventario cargado: {cargados} producto(s)."
+                return True, f"Inventario cargado: {cargados} producto(s).{aviso}"
             else:
+                por_bloque = ""
+                if len(bloques) > 1:
+                    por_bloque = " Errores por bloque: " + ", ".join(str(b[3]) for b in bloques) + "."
                 return True, (f"Inventario cargado con advertencias: {cargados} producto(s) válidos, "
-                              f"{errores} línea(s) corrupta(s) omitida(s).")
+                              f"{errores} línea(s) corrupta(s) omitida(s).{por_bloque}{aviso}")
         except PermissionError:
             return False, (f"Sin permisos para leer '{self.ruta_archivo}'. "
                            f"El programa funcionará solo en memoria.")
@@ -245,13 +1215,14 @@ class Inventario:
         Guarda el inventario completo en el archivo CSV (sobreescritura segura).
         Retorna (ok: bool, msg: str)
         NOTA: Sobrescribimos todo el archivo para mantener la consistencia (más simple para 2do semestre).
+        La escritura es atómica: si falla a la mitad, el archivo anterior queda intacto.
         """
         try:
-            with open(self.ruta_archivo, mode="w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(["id", "nombre", "cantidad", "precio"])
-                for p in self.productos:
-                    writer.writerow([p.get_id(), p.get_nombre(), p.get_cantidad(), f"{p.get_precio():.2f}"])
+            filas = ([p.get_id(), p.get_nombre(), p.get_cantidad(), f"{p.get_precio():.2f}"]
+                     for p in self.productos.values())
+            escribir_snapshot_atomico(self.ruta_archivo, ["id", "nombre", "cantidad", "precio"], filas,
+                                      self.durabilidad, self.generaciones)
+            self._registrar_estado()
             return True, "Cambios guardados en el archivo correctamente."
         except PermissionError:
             return False, f"Permiso denegado al escribir en '{self.ruta_archivo}'."
@@ -261,6 +1232,318 @@ class Inventario:
             # Captura de cualquier otra excepción no prevista (defensivo)
             return False, f"Error inesperado al guardar: {e}"
 
+    # -----------------------
+    # Journal (log de cambios)
+    # -----------------------
+    def _persistir(self, registro, deshacer):
+        """
+        Persiste un cambio que ya se aplicó en memoria.
+        - Dentro de una transacción: solo se anota (registro + cómo deshacerlo).
+        - Sin journal: reescribe el archivo completo (comportamiento original).
+        - Con journal: solo agrega el registro al final del log.
+        Retorna (ok: bool, msg: str); si falla, el llamador revierte el cambio en memoria.
+        """
+        if self._transaccion is not None:
+            self._transaccion.cambios.append((registro, deshacer))
+            return True, "Cambio pendiente hasta confirmar la transacción."
+        if not self.usar_journal:
+            return self._guardar_a_archivo()
+        return self._escribir_journal([registro])
+
+    def _confirmar(self, cambios):
+        """
+        Guarda de una sola vez los cambios de una transacción.
+        En el journal se escriben entre un registro T (inicio) y uno F (fin):
+        si el programa se corta a la mitad, al cargar se descarta la transacción entera.
+        Retorna (ok: bool, msg: str)
+        """
+        if not cambios:
+            return True, "Transacción sin cambios."
+        if not self.usar_journal:
+            return self._guardar_a_archivo()
+        registros = [["T", len(cambios)]] + [registro for registro, _ in cambios] + [["F", len(cambios)]]
+        return self._escribir_journal(registros)
+
+    def _escribir_journal(self, registros):
+        """
+        Agrega registros al final del journal. Si la escritura falla, el log se recorta
+        a su tamaño anterior para no dejar registros a medias.
+        Retorna (ok: bool, msg: str)
+        """
+        tamano_anterior = None
+        try:
+            with open(self.ruta_journal, mode="a", newline="", encoding="utf-8") as f:
+                tamano_anterior = f.tell()
+                writer = csv.writer(f)
+                writer.writerows(registros)
+                if self.durabilidad != "ninguna":
+                    f.flush()
+                    os.fsync(f.fileno())
+        except OSError as e:
+            if tamano_anterior is not None:
+                try:
+                    os.truncate(self.ruta_journal, tamano_anterior)
+                except OSError:
+                    pass  # si tampoco se puede recortar, la carga descartará la cola incompleta
+            if isinstance(e, PermissionError):
+                return False, f"Permiso denegado al escribir en '{self.ruta_journal}'."
+            return False, f"Error OS al escribir en '{self.ruta_journal}': {e}"
+        self._registrar_estado()
+        self._compactar_si_corresponde()
+        return True, "Cambio registrado en el journal correctamente."
+
+    def _reproducir_journal(self):
+        """
+        Aplica sobre los productos ya cargados los registros del journal.
+        Primero el log que estaba compactándose (si quedó alguno) y luego el log actual.
+        Los registros guardan valores absolutos, así que reaplicar uno ya incluido
+        en el snapshot no cambia el resultado.
+        Retorna (ok: bool, msg: str)
+        """
+        aplicados = 0
+        errores = 0
+        for ruta in (self.ruta_journal_compactando, self.ruta_journal):
+            if not os.path.exists(ruta):
+                continue
+            try:
+                aplicados_log, errores_log, fin_valido = self._reproducir_log(ruta)
+                if fin_valido < os.path.getsize(ruta):
+                    # Cola incompleta (línea cortada o transacción sin F): se recorta
+                    # para que los próximos registros empiecen en una línea limpia.
+                    os.truncate(ruta, fin_valido)
+            except OSError as e:
+                return False, f"Error al leer el journal '{ruta}': {e}"
+            aplicados += aplicados_log
+            errores += errores_log
+
+        if errores == 0:
+            return True, f"Journal: {aplicados} cambio(s) aplicados."
+        return True, f"Journal: {aplicados} cambio(s) aplicados, {errores} registro(s) corrupto(s) omitido(s)."
+
+    def _reproducir_log(self, ruta, desde=0, tocados=None):
+        """
+        Reproduce un archivo de journal línea por línea, a partir del byte `desde`.
+        Si se pasa el conjunto `tocados`, se le agregan los IDs de los registros aplicados.
+        Retorna (aplicados, errores, fin_valido) donde fin_valido es el byte donde
+        termina el último registro completo fuera de una transacción abierta.
+        """
+        aplicados = 0
+        errores = 0
+        posicion = desde
+        fin_valido = desde
+        pendientes = None  # registros de una transacción aún sin su F
+        with open(ruta, mode="rb") as f:
+            f.seek(desde)
+            for linea in f:
+                posicion += len(linea)
+                if not linea.endswith(b"\n"):
+                    # Última línea cortada por un cierre abrupto
+                    errores += 1
+                    break
+                fila = next(csv.reader([linea.decode("utf-8", errors="replace")]), [])
+                op = fila[0] if fila else ""
+                if op == "T":
+                    if pendientes is not None:
+                        errores += len(pendientes)
+                    pendientes = []
+                elif op == "F":
+                    if pendientes is None:
+                        errores += 1
+                    else:
+                        for registro in pendientes:
+                            if self._aplicar_registro(registro):
+                                aplicados += 1
+                                if tocados is not None:
+                                    tocados.add(registro[1])
+                            else:
+                                errores += 1
+                        pendientes = None
+                elif pendientes is not None:
+                    pendientes.append(fila)
+                elif self._aplicar_registro(fila):
+                    aplicados += 1
+                    if tocados is not None:
+                        tocados.add(fila[1])
+                else:
+                    errores += 1
+                if pendientes is None:
+                    fin_valido = posicion
+        if pendientes is not None:
+            # Transacción que nunca llegó a su F: se descarta completa
+            errores += len(pendientes)
+        return aplicados, errores, fin_valido
+
+    def _aplicar_registro(self, fila):
+        """
+        Aplica un registro del journal. Retorna False si el registro es inválido.
+        """
+        try:
+            op = fila[0]
+            if op == "A" and len(fila) == 5:
+                id_unico, nombre = fila[1], fila[2]
+                cantidad, precio = int(fila[3]), float(fila[4])
+                if not math.isfinite(precio):
+                    return False
+                p = self.productos.get(id_unico)
+                if p is None:
+                    self._alta_en_memoria(Producto(id_unico, nombre, cantidad, precio))
+                else:
+                    self._renombrar_en_memoria(p, nombre)
+                    self._cambiar_cantidad_en_memoria(p, cantidad)
+                    self._cambiar_precio_en_memoria(p, precio)
+            elif op == "E" and len(fila) == 2:
+                self._baja_en_memoria(fila[1])
+            elif op == "C" and len(fila) == 3:
+                cantidad = int(fila[2])
+                if fila[1] in self.productos:
+                    self._cambiar_cantidad_en_memoria(self.productos[fila[1]], cantidad)
+            elif op == "P" and len(fila) == 3:
+                precio = float(fila[2])
+                if not math.isfinite(precio):
+                    return False
+                if fila[1] in self.productos:
+                    self._cambiar_precio_en_memoria(self.productos[fila[1]], precio)
+            elif op == "N" and len(fila) == 3:
+                if fila[1] in self.productos:
+                    self._renombrar_en_memoria(self.productos[fila[1]], fila[2])
+            else:
+                return False
+        except (ValueError, IndexError):
+            return False
+        return True
+
+    def _compactar_si_corresponde(self):
+        """
+        Lanza la compactación en segundo plano cuando el log supera el umbral.
+        """
+        if self._hilo_compactacion is not None and self._hilo_compactacion.is_alive():
+            return
+        try:
+            if os.path.getsize(self.ruta_journal) < self.umbral_compactacion:
+                return
+        except OSError:
+            return
+        if os.path.exists(self.ruta_journal_compactando):
+            # Una compactación anterior falló: se reintenta en este hilo con los dos logs
+            # (si no, el journal crecería sin límite hasta la próxima carga)
+            ok, msg = self._compactar(en_segundo_plano=False)
+            if ok:
+                self._registrar_estado()
+        else:
+            ok, msg = self._compactar(en_segundo_plano=True)
+        if not ok:
+            self.ultimo_mensaje_archivo = msg
+
+    def _compactar(self, en_segundo_plano):
+        """
+        Compacta el journal en un snapshot nuevo.
+        - En segundo plano: se copian las filas en memoria y se rota el log en el hilo
+          actual (los cambios siguientes van a un log nuevo); el snapshot se escribe en otro hilo.
+        - Síncrona (al cargar): el snapshot cubre todos los logs existentes y luego se borran.
+        Retorna (ok: bool, msg: str)
+        """
+        filas = [[p.get_id(), p.get_nombre(), p.get_cantidad(), f"{p.get_precio():.2f}"]
+                 for p in self.productos.values()]
+        if not en_segundo_plano:
+            return self._escribir_compactacion(filas, [self.ruta_journal_compactando, self.ruta_journal])
+
+        try:
+            os.replace(self.ruta_journal, self.ruta_journal_compactando)
+        except OSError as e:
+            return False, f"No se pudo rotar el journal '{self.ruta_journal}': {e}"
+        self._registrar_estado()
+        self._hilo_compactacion = threading.Thread(target=self._escribir_compactacion,
+                                                   args=(filas, [self.ruta_journal_compactando],
+                                                         self._marca_compactando))
+        self._hilo_compactacion.start()
+        return True, "Compactación del journal iniciada en segundo plano."
+
+    def _escribir_compactacion(self, filas, logs, rotado=None):
+        """
+        Escribe el snapshot de forma atómica y recién entonces elimina los logs
+        que ya quedaron incluidos en él. Se hace con el archivo bloqueado para que
+        otro proceso no lea el snapshot nuevo junto con un log ya incluido o borrado.
+        rotado: identidad del log que rotó este proceso; si ya no está, otro proceso
+        terminó la compactación al cargar y estas filas quedaron viejas.
+        Retorna (ok: bool, msg: str)
+        """
+        try:
+            with self._bloqueo:
+                if rotado is not None and self._identidad(self.ruta_journal_compactando) != rotado:
+                    return True, "Otro proceso ya completó esta compactación."
+                escribir_snapshot_atomico(self.ruta_archivo, ["id", "nombre", "cantidad", "precio"], filas,
+                                          self.durabilidad, self.generaciones)
+                for ruta in logs:
+                    if os.path.exists(ruta):
+                        os.remove(ruta)
+                # El log nuevo puede tener registros de otros procesos aún no leídos: su posición no se toca
+                self._registrar_estado(journal=False)
+            return True, "Journal compactado en el archivo correctamente."
+        except OSError as e:
+            msg = f"Error al compactar el journal en '{self.ruta_archivo}': {e}"
+            self.ultimo_mensaje_archivo = msg
+            return False, msg
+
+    def esperar_compactacion(self):
+        """
+        Espera a que termine la compactación en segundo plano (si hay una en curso).
+        """
+        if self._hilo_compactacion is not None:
+            self._hilo_compactacion.join()
+            self._hilo_compactacion = None
+
+
+# ---------------------------
+# Transacción (varias operaciones, una sola escritura)
+# ---------------------------
+class Transaccion:
+    """
+    Context manager devuelto por Inventario.transaccion().
+    Al salir del bloque deja en ok/msg el resultado del guardado.
+    """
+    def __init__(self, inventario):
+        self.inventario = inventario
+        self.cambios = []  # lista de (registro, deshacer)
+        self.ok = False
+        self.msg = "Transacción sin confirmar."
+
+    def __enter__(self):
+        if self.inventario._transaccion is not None:
+            raise RuntimeError("Ya hay una transacción en curso en este inventario.")
+        # En modo multiproceso el archivo queda bloqueado hasta confirmar: se parte del
+        # estado más reciente y ningún otro proceso escribe en el medio.
+        self.inventario._bloqueo.__enter__()
+        try:
+            self.inventario._sincronizar()
+        except OSError:
+            self.inventario._bloqueo.__exit__(None, None, None)
+            raise
+        self.inventario._transaccion = self
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.inventario._transaccion = None
+        try:
+            if tipo is not None:
+                self._revertir()
+                self.ok, self.msg = False, f"Transacción revertida por un error: {valor}"
+                return False  # la excepción sigue su curso
+            ok, msg = self.inventario._confirmar(self.cambios)
+            if ok:
+                self.ok, self.msg = True, f"Transacción guardada ({len(self.cambios)} cambio(s))."
+            else:
+                self._revertir()
+                self.ok, self.msg = False, f"Error guardando la transacción. Se revirtieron todos los cambios. Detalle: {msg}"
+            return False
+        finally:
+            self.inventario._bloqueo.__exit__(None, None, None)
+
+    def _revertir(self):
+        # Se deshace en orden inverso al que se aplicaron los cambios
+        for _, deshacer in reversed(self.cambios):
+            deshacer()
+        self.cambios = []
+
 
 # ---------------------------
 # Utilidades de entrada segura (defensivas)
@@ -284,16 +1567,21 @@ def pedir_flotante(mensaje):
     while True:
         dato = input(mensaje)
         try:
-            return float(dato)
+            numero = float(dato)
         except ValueError:
             print("Entrada inválida: por favor, ingresa un número (usa punto decimal).")
+            continue
+        if math.isfinite(numero):
+            return numero
+        print("Entrada inválida: el número tiene que ser finito.")
 
 
 # ---------------------------
 # Menú de consola
 # ---------------------------
 def menu():
-    inventario = Inventario(ruta_archivo="inventario.txt")
+    # multiproceso=True: se pueden abrir varias cajas a la vez sobre el mismo archivo
+    inventario = Inventario(ruta_archivo="inventario.txt", usar_journal=True, multiproceso=True)
 
     print("\n=== SISTEMA DE INVENTARIO (con archivos y excepciones) ===")
     # Mostrar mensaje de carga del archivo
@@ -307,8 +1595,18 @@ def menu():
         print("4) Actualizar precio")
         print("5) Buscar por nombre")
         print("6) Mostrar todos")
+        print("7) Reporte de bajo stock")
+        print("8) Productos por rango de cantidad o precio")
+        print("9) Top productos por cantidad o precio")
+        print("10) Vender / reponer (sumar o restar unidades)")
+        print("11) Importar catálogo de proveedor (CSV/JSONL)")
         print("0) Salir")
         opcion = input("Opción: ").strip()
+        if opcion in ("5", "6", "7", "8", "9"):
+            # Antes de mostrar datos se leen los cambios de las otras cajas
+            ok, msg = inventario.refrescar()
+            if not ok:
+                print(msg)
 
         if opcion == "1":
             id_unico = input("ID: ").strip()
@@ -356,7 +1654,55 @@ def menu():
             else:
                 print("Inventario vacío.")
 
+        elif opcion == "7":
+            umbral = pedir_entero("Mostrar productos con menos de (unidades): ")
+            productos = inventario.bajo_stock(umbral)
+            if productos:
+                print(f"Productos para reponer ({len(productos)}):")
+                for p in productos:
+                    print("  -", p)
+            else:
+                print("Ningún producto por debajo de ese umbral.")
+
+        elif opcion == "8":
+            campo = "precio" if input("Campo (c = cantidad, p = precio): ").strip().lower() == "p" else "cantidad"
+            minimo = pedir_flotante("Mínimo: ")
+            maximo = pedir_flotante("Máximo: ")
+            productos = inventario.productos_en_rango(campo, minimo, maximo)
+            if productos:
+                print(f"Productos con {campo} entre {minimo} y {maximo} ({len(productos)}):")
+                for p in productos:
+                    print("  -", p)
+            else:
+                print("No hay productos en ese rango.")
+
+        elif opcion == "9":
+            campo = "precio" if input("Campo (c = cantidad, p = precio): ").strip().lower() == "p" else "cantidad"
+            k = pedir_entero("¿Cuántos productos? ")
+            mayores = input("¿Mayores o menores? (M/m): ").strip() != "m"
+            productos = inventario.top_productos(campo, k, mayores)
+            if productos:
+                for p in productos:
+                    print("  -", p)
+            else:
+                print("Inventario vacío.")
+
+        elif opcion == "10":
+            id_unico = input("ID del producto: ").strip()
+            diferencia = pedir_entero("Unidades (+ reposición, - venta): ")
+            ok, msg = inventario.ajustar_cantidad(id_unico, diferencia)
+            print(msg)
+
+        elif opcion == "11":
+            from importar_catalogo import importar_catalogo
+            ruta = input("Archivo del catálogo (.csv o .jsonl): ").strip()
+            ruta_rechazos = os.path.splitext(ruta)[0] + ".rechazos.csv"
+            ok, msg, resultado = importar_catalogo(inventario, ruta, ruta_rechazos)
+            print(resultado)
+            print(msg)
+
         elif opcion == "0":
+            inventario.esperar_compactacion()
             print("¡Hasta luego!")
             break
 
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de arranque en frío de la Biblioteca persistente (snapshot + journal).
+
+1) Arma en memoria un catálogo de N libros, U usuarios y P préstamos y escribe el snapshot.
+2) Arranque en frío: carga del snapshot + índices de búsqueda (por etapa).
+3) Hace K operaciones (préstamos y devoluciones) que quedan en el journal y vuelve a
+   arrancar: muestra cuánto suma reproducir el journal.
+4) Como referencia, el costo de reimportar el catálogo con añadir_libro (medido sobre
+   una muestra y extrapolado a N).
+
+Uso:
+    python benchmark_biblioteca.py [--libros 1000000] [--usuarios 100000] [--prestamos 200000]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import time
+from datetime import date, timedelta
+
+from biblioteca import Biblioteca, Libro, Usuario
+from persistencia_biblioteca import AlmacenBiblioteca
+
+PALABRAS = ["historia", "de", "la", "programación", "python", "datos", "estructuras", "cien", "años",
+            "soledad", "quijote", "mancha", "redes", "teoría", "álgebra", "cálculo", "física", "química"]
+CATEGORIAS = ["Novela", "Poesía", "Informática", "Matemática", "Historia", "Filosofía", "Arte", "Ciencia"]
+
+
+def generar(biblioteca, n_libros, n_usuarios, n_prestamos, semilla=1):
+    # Directo a memoria (sin journal ni historial): solo prepara los datos
+    azar = random.Random(semilla)
+    autores = ["{} {}".format(azar.choice(["Ana", "Luis", "José", "María"]), "Autor{}".format(i))
+               for i in range(max(1, n_libros // 200))]
+    for i in range(n_libros):
+        titulo = " ".join(azar.choices(PALABRAS, k=4)) + " {}".format(i)
+        biblioteca._alta_libro(Libro(titulo, azar.choice(autores), azar.choice(CATEGORIAS),
+                                     "978{:010d}".format(i)), indexar=False)
+    for i in range(n_usuarios):
+        biblioteca._alta_usuario(Usuario("Usuario {}".format(i), "U{:06d}".format(i)))
+    isbns = list(biblioteca.libros)
+    hoy = date.today()
+    for isbn in azar.sample(isbns, n_prestamos):
+        vence = hoy + timedelta(days=azar.randrange(-30, 30))
+        biblioteca._prestar(isbn, "U{:06d}".format(azar.randrange(n_usuarios)), vence)
+    biblioteca.reindexar()
+
+
+def cronometrar(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return time.perf_counter() - inicio, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arranque en frío de la Biblioteca persistente.")
+    parser.add_argument("--libros", type=int, default=1_000_000)
+    parser.add_argument("--usuarios", type=int, default=100_000)
+    parser.add_argument("--prestamos", type=int, default=200_000)
+    parser.add_argument("--operaciones", type=int, default=100_000, help="operaciones en el journal")
+    parser.add_argument("--muestra", type=int, default=100_000, help="libros para medir añadir_libro")
+    parser.add_argument("--carpeta", default="bench_biblioteca")
+    args = parser.parse_args()
+    shutil.rmtree(args.carpeta, ignore_errors=True)
+
+    almacen = AlmacenBiblioteca(args.carpeta, durabilidad="ninguna")
+    biblioteca = Biblioteca(almacen=almacen)
+    t_gen, _ = cronometrar(lambda: generar(biblioteca, args.libros, args.usuarios, args.prestamos))
+    t_snap, _ = cronometrar(almacen.compactar)
+    biblioteca.cerrar()
+    tamano = os.path.getsize(almacen.ruta_snapshot)
+    print("Catálogo: {} libros, {} usuarios, {} préstamos (generado en {:.1f} s)".format(
+        args.libros, args.usuarios, args.prestamos, t_gen))
+    print("Snapshot: {:.1f} MB escrito en {:.1f} s".format(tamano / 1e6, t_snap))
+
+    def arrancar():
+        almacen = AlmacenBiblioteca(args.carpeta, durabilidad="ninguna")
+        t, biblioteca = cronometrar(lambda: Biblioteca(almacen=almacen))
+        etapas = ", ".join("{} {:.1f} s".format(k, v) for k, v in almacen.tiempos.items())
+        print("  {:.1f} s ({}) -> {}".format(t, etapas, almacen.mensaje))
+        return biblioteca
+
+    print("Arranque en frío (solo snapshot):")
+    biblioteca = arrancar()
+
+    azar = random.Random(2)
+    isbns = list(biblioteca.libros)
+    usuarios = list(biblioteca.usuarios)
+    inicio = time.perf_counter()
+    for _ in range(args.operaciones // 2):
+        isbn = azar.choice(isbns)
+        if isbn in biblioteca.prestamos:
+            biblioteca.devolver_libro(isbn, biblioteca.prestamos[isbn])
+        else:
+            biblioteca.prestar_libro(isbn, azar.choice(usuarios))
+        biblioteca.prestar_lote(azar.sample(isbns, 1), azar.choice(usuarios))
+    t_ops = time.perf_counter() - inicio
+    biblioteca.cerrar()
+    print("{} operaciones al journal: {:.1f} us/op, journal {:.1f} MB".format(
+        args.operaciones, t_ops / args.operaciones * 1e6, os.path.getsize(biblioteca.almacen.ruta_journal) / 1e6))
+    print("Arranque en frío (snapshot + journal):")
+    arrancar().cerrar()
+
+    # Referencia: reimportar el catálogo libro por libro
+    muestra = Biblioteca()
+    libros = [Libro(l.titulo, l.autor, l.categoria, l.isbn) for l in list(biblioteca.libros.values())[:args.muestra]]
+    t_muestra, _ = cronometrar(lambda: [muestra.añadir_libro(l) for l in libros])
+    print("Reimportar con añadir_libro: {:.1f} us/libro -> ~{:.0f} s para {} libros".format(
+        t_muestra / len(libros) * 1e6, t_muestra / len(libros) * args.libros, args.libros))
+    shutil.rmtree(args.carpeta, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
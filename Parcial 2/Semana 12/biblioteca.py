@@ -11,9 +11,93 @@ Este sistema permite gestionar una biblioteca digital:
 - Prestar y devolver libros.
 - Buscar libros por título, autor o categoría.
 - Listar libros prestados por usuario.
+- Cargar catálogos grandes de una vez (importar_libros; lectura de CSV / JSONL en
+  importar_libros.py).
+
+Búsqueda indexada:
+- Un índice invertido por campo (título, autor, categoría): palabra -> ISBNs.
+  Se actualiza en añadir_libro / quitar_libro; buscar no recorre el catálogo.
+- Sin distinguir mayúsculas ni tildes ("Ramirez" encuentra "Ramírez").
+- Cada palabra buscada puede ser el comienzo de una palabra del campo ("estruc"
+  encuentra "Estructuras"): el vocabulario se guarda ordenado y se usa bisect.
+- buscar() combina varios campos con Y (todas las palabras deben aparecer), ordena
+  por relevancia y entrega los resultados de a uno (generador); paginas() los agrupa.
+
+Préstamos:
+- Cada usuario guarda sus préstamos en un diccionario ISBN -> fecha de vencimiento
+  (en orden de préstamo): prestar y devolver son O(1) aunque tenga miles.
+- Índice de vencimientos (fecha -> ISBNs) para listar los préstamos vencidos sin
+  recorrer todos.
+- prestar_lote / devolver_lote procesan un carrito entero: primero se valida todo y,
+  si un libro no se puede, no se presta (o devuelve) ninguno.
+
+Concurrencia (Biblioteca(concurrente=True), para varios mostradores en hilos):
+- Cada operación toma los candados de sus claves (ISBN y usuario) antes de verificar y
+  cambiar: dos mostradores no pueden prestar el mismo libro. Los candados se reparten
+  en franjas (hash de la clave % franjas) y se toman siempre en el mismo orden, así un
+  carrito no puede trabarse con otro.
+- Operaciones sobre libros y usuarios distintos no se esperan entre sí; solo comparten
+  un candado corto para las estructuras comunes (journal, historial, índices). Con
+  durabilidad "completa" el fsync del journal se hace fuera de ese candado: mientras un
+  mostrador espera el disco, los demás siguen (y un fsync cubre a varios).
+- La compactación del journal toma todas las franjas: el snapshot ve un estado quieto.
+
+Memoria (catálogos de millones de libros):
+- Libro y Usuario usan __slots__ (sin un __dict__ por objeto) y los autores y
+  categorías de los libros se internan: una copia de cada texto, no una por libro.
+- Biblioteca(catalogo_compacto=True) guarda el catálogo por columnas
+  (CatalogoCompacto: títulos en UTF-8 en un solo bytearray, autor y categoría como
+  códigos) y arma los Libro al leerlos. memoria_biblioteca.py mide los
+  bytes por libro de cada forma.
+
+Historial: los eventos van a un HistorialEventos (historial_biblioteca.py). Con una
+carpeta se guardan en disco por segmentos, con índices por usuario, ISBN y acción;
+sin ella solo se conservan en memoria los últimos eventos.
 """
 
-from datetime import datetime
+import heapq
+import re
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+from collections.abc import ItemsView, MutableMapping, ValuesView
+from contextlib import nullcontext
+from datetime import date, timedelta
+from functools import lru_cache
+from itertools import islice
+
+from historial_biblioteca import HistorialEventos
+
+# Peso de cada campo en la relevancia de buscar()
+PESOS = {"titulo": 3, "autor": 2, "categoria": 1}
+DIAS_PRESTAMO = 14
+FRANJAS = 64  # candados por tipo de clave en el modo concurrente
+_PALABRA = re.compile(r"\w+")
+_TILDES = re.compile("[\u0300-\u036f]")  # marcas diacríticas combinantes (tras NFKD)
+
+
+def normalizar(texto):
+    """
+    Minúsculas y sin tildes: "Pérez" -> "perez", "Ñandú" -> "nandu".
+    """
+    texto = texto.casefold()
+    if texto.isascii():
+        return texto
+    return _TILDES.sub("", unicodedata.normalize("NFKD", texto))
+
+
+@lru_cache(maxsize=1 << 16)
+def palabras(texto):
+    # Caché: autores y categorías se repiten en miles de libros
+    return tuple(_PALABRA.findall(normalizar(texto)))
+
+
+def _internar(texto):
+    # Una sola copia de cada autor / categoría aunque llegue de miles de filas distintas
+    return sys.intern(texto) if type(texto) is str else texto
 
 
 # ---------------------------
@@ -22,26 +106,357 @@ from datetime import datetime
 class Libro(object):
     """
     Representa un libro.
-    Guarda el título y autor en una tupla (inmutable).
+    Título y autor son de solo lectura (titulo_autor los entrega como tupla).
+    Con __slots__ no hay un __dict__ por libro; autor y categoría se internan.
     """
 
+    __slots__ = ("_titulo", "_autor", "categoria", "isbn")
+
     def __init__(self, titulo, autor, categoria, isbn):
-        self.titulo_autor = (titulo, autor)  # tupla inmutable
-        self.categoria = categoria
+        self._titulo = titulo
+        self._autor = _internar(autor)
+        self.categoria = _internar(categoria)
         self.isbn = isbn
 
     @property
     def titulo(self):
-        return self.titulo_autor[0]
+        return self._titulo
 
     @property
     def autor(self):
-        return self.titulo_autor[1]
+        return self._autor
+
+    @property
+    def titulo_autor(self):
+        return self._titulo, self._autor
 
     def __str__(self):
         return "[{}] {} — {} ({})".format(self.isbn, self.titulo, self.autor, self.categoria)
 
 
+# ---------------------------
+# Índice invertido (un campo)
+# ---------------------------
+class IndiceInvertido(object):
+    """
+    Palabra normalizada -> conjunto de ISBN que la tienen en el campo.
+    El vocabulario ordenado permite buscar por prefijo sin recorrer todas las palabras.
+    """
+
+    def __init__(self):
+        self.postings = {}       # palabra -> set(isbn)
+        self.vocabulario = []    # palabras en orden alfabético
+
+    def agregar(self, isbn, texto):
+        for palabra in set(palabras(texto)):
+            isbns = self.postings.get(palabra)
+            if isbns is None:
+                self.postings[palabra] = isbns = set()
+                insort(self.vocabulario, palabra)
+            isbns.add(isbn)
+
+    def agregar_lote(self, pares):
+        """
+        Agrega muchos (isbn, texto) de una vez: el vocabulario se ordena una sola vez al final.
+        """
+        postings = self.postings
+        for isbn, texto in pares:
+            for palabra in set(palabras(texto)):
+                isbns = postings.get(palabra)
+                if isbns is None:
+                    postings[palabra] = isbns = set()
+                isbns.add(isbn)
+        self.vocabulario = sorted(postings)
+
+    def quitar(self, isbn, texto):
+        for palabra in set(palabras(texto)):
+            isbns = self.postings.get(palabra)
+            if isbns is None:
+                continue
+            isbns.discard(isbn)
+            if not isbns:
+                del self.postings[palabra]
+                del self.vocabulario[bisect_left(self.vocabulario, palabra)]
+
+    def exactos(self, palabra):
+        return self.postings.get(palabra, set())
+
+    def con_prefijo(self, prefijo):
+        """
+        ISBNs con alguna palabra que empieza con `prefijo`.
+        """
+        i = bisect_left(self.vocabulario, prefijo)
+        encontrados = []
+        while i < len(self.vocabulario) and self.vocabulario[i].startswith(prefijo):
+            encontrados.append(self.postings[self.vocabulario[i]])
+            i += 1
+        if len(encontrados) == 1:
+            return encontrados[0]
+        return set().union(*encontrados)
+
+
+# ---------------------------
+# Índice de vencimientos
+# ---------------------------
+class IndiceVencimientos(object):
+    """
+    Fecha de vencimiento -> ISBNs prestados que vencen ese día.
+    Las fechas se guardan ordenadas: los vencidos se listan sin recorrer todos los préstamos.
+    """
+
+    def __init__(self):
+        self.por_fecha = {}   # fecha -> {isbn: None} (en orden de préstamo)
+        self.fechas = []      # fechas con préstamos, ordenadas
+
+    def agregar(self, fecha, isbn):
+        isbns = self.por_fecha.get(fecha)
+        if isbns is None:
+            self.por_fecha[fecha] = isbns = {}
+            insort(self.fechas, fecha)
+        isbns[isbn] = None
+
+    def quitar(self, fecha, isbn):
+        isbns = self.por_fecha.get(fecha)
+        if isbns is None:
+            return
+        isbns.pop(isbn, None)
+        if not isbns:
+            del self.por_fecha[fecha]
+            del self.fechas[bisect_left(self.fechas, fecha)]
+
+    def antes_de(self, fecha):
+        """
+        Generador de (fecha, isbn) con vencimiento anterior a `fecha`, del más viejo al más nuevo.
+        """
+        for vence in self.fechas[:bisect_left(self.fechas, fecha)]:
+            for isbn in list(self.por_fecha.get(vence, ())):
+                yield vence, isbn
+
+
+# ---------------------------
+# Candados por franjas (modo concurrente)
+# ---------------------------
+class _Bloqueo(object):
+    # Toma varios candados en el orden dado y los suelta al revés
+    __slots__ = ("candados",)
+
+    def __init__(self, candados):
+        self.candados = candados
+
+    def __enter__(self):
+        for candado in self.candados:
+            candado.acquire()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        for candado in reversed(self.candados):
+            candado.release()
+        return False
+
+
+class CandadosPorFranjas(object):
+    """
+    `franjas` candados para ISBNs y otros tantos para usuarios: la clave k usa el de
+    posición hash(k) % franjas. Las posiciones se toman ordenadas (primero libros, luego
+    usuarios), así dos operaciones que piden varias claves nunca se esperan en círculo.
+    """
+
+    def __init__(self, franjas=FRANJAS):
+        if franjas < 1:
+            raise ValueError("franjas debe ser al menos 1")
+        self.franjas = franjas
+        self.candados = [threading.Lock() for _ in range(2 * franjas)]
+
+    def para(self, isbns=(), user_ids=()):
+        n = self.franjas
+        posiciones = {hash(isbn) % n for isbn in isbns}
+        posiciones.update(n + hash(user_id) % n for user_id in user_ids)
+        return _Bloqueo([self.candados[i] for i in sorted(posiciones)])
+
+    def todas(self):
+        return _Bloqueo(self.candados)
+
+
+_SIN_BLOQUEO = nullcontext()
+
+
+# ---------------------------
+# Catálogo compacto (por columnas)
+# ---------------------------
+class TablaInternado(object):
+    """
+    Texto <-> código entero: cada texto distinto se guarda una sola vez. Los códigos no
+    se reutilizan (un autor que se quedó sin libros sigue en la tabla).
+    """
+
+    def __init__(self):
+        self.textos = []    # código -> texto
+        self.codigos = {}   # texto -> código
+
+    def codigo(self, texto):
+        codigo = self.codigos.get(texto)
+        if codigo is None:
+            codigo = self.codigos[texto] = len(self.textos)
+            self.textos.append(texto)
+        return codigo
+
+    def __getitem__(self, codigo):
+        return self.textos[codigo]
+
+    def __len__(self):
+        return len(self.textos)
+
+
+class _VistaLibros(ValuesView):
+    def __iter__(self):
+        for _, libro in self._mapping._recorrer():
+            yield libro
+
+
+class _VistaPares(ItemsView):
+    def __iter__(self):
+        return self._mapping._recorrer()
+
+
+class CatalogoCompacto(MutableMapping):
+    """
+    isbn -> Libro, guardado por columnas en lugar de un objeto por libro: los títulos en
+    UTF-8, uno detrás de otro en un solo bytearray (con su inicio y largo en arrays), y
+    autor y categoría como códigos de una TablaInternado. Se usa como el diccionario
+    Biblioteca.libros (Biblioteca(catalogo_compacto=True)).
+
+    Los Libro se arman al leerlos: dos lecturas del mismo ISBN dan objetos distintos y
+    cambiar uno no cambia el catálogo (hay que volver a asignarlo). Al quitar un libro
+    el último ocupa su lugar, así que el orden de recorrido no es el de alta.
+    """
+
+    def __init__(self, concurrente=False):
+        self.isbns = []
+        self.titulos = bytearray()     # títulos en UTF-8, seguidos
+        self.inicios = array("Q")      # fila -> dónde empieza su título en self.titulos
+        self.largos = array("I")       # fila -> largo en bytes de su título
+        self.autores = array("I")      # códigos en self.textos
+        self.categorias = array("I")
+        self.textos = TablaInternado()  # autores y categorías
+        self.filas = {}                # isbn -> fila
+        self.basura = 0                # bytes de títulos quitados o reemplazados
+        self._candado = threading.Lock() if concurrente else _SIN_BLOQUEO
+
+    def _libro(self, fila):
+        inicio = self.inicios[fila]
+        titulo = self.titulos[inicio:inicio + self.largos[fila]].decode("utf-8", "surrogatepass")
+        textos = self.textos.textos
+        return Libro(titulo, textos[self.autores[fila]], textos[self.categorias[fila]], self.isbns[fila])
+
+    def __getitem__(self, isbn):
+        with self._candado:
+            return self._libro(self.filas[isbn])
+
+    def get(self, isbn, defecto=None):
+        with self._candado:
+            fila = self.filas.get(isbn)
+            return defecto if fila is None else self._libro(fila)
+
+    def __contains__(self, isbn):
+        return isbn in self.filas
+
+    def __len__(self):
+        return len(self.filas)
+
+    def __setitem__(self, isbn, libro):
+        titulo = libro.titulo.encode("utf-8", "surrogatepass")
+        with self._candado:
+            autor = self.textos.codigo(libro.autor)
+            categoria = self.textos.codigo(libro.categoria)
+            fila = self.filas.get(isbn)
+            if fila is None:
+                self.filas[isbn] = len(self.isbns)
+                self.isbns.append(isbn)
+                self.inicios.append(len(self.titulos))
+                self.largos.append(len(titulo))
+                self.autores.append(autor)
+                self.categorias.append(categoria)
+            else:
+                self.basura += self.largos[fila]
+                self.inicios[fila] = len(self.titulos)
+                self.largos[fila] = len(titulo)
+                self.autores[fila] = autor
+                self.categorias[fila] = categoria
+            self.titulos += titulo
+            self._limpiar_si_hace_falta()
+
+    def __delitem__(self, isbn):
+        with self._candado:
+            fila = self.filas.pop(isbn)
+            self.basura += self.largos[fila]
+            columnas = (self.isbns, self.inicios, self.largos, self.autores, self.categorias)
+            # La última fila pasa al hueco: las columnas quedan sin espacios libres
+            if fila != len(self.isbns) - 1:
+                for columna in columnas:
+                    columna[fila] = columna[-1]
+                self.filas[self.isbns[fila]] = fila
+            for columna in columnas:
+                columna.pop()
+            self._limpiar_si_hace_falta()
+
+    def _limpiar_si_hace_falta(self):
+        # Si más de la mitad de self.titulos es de títulos que ya no están, se reescribe
+        # (en el lugar: quien está recorriendo sigue viendo las mismas columnas)
+        if self.basura <= max(1 << 16, len(self.titulos) // 2):
+            return
+        titulos = bytearray()
+        inicios = array("Q")
+        for inicio, largo in zip(self.inicios, self.largos):
+            inicios.append(len(titulos))
+            titulos += self.titulos[inicio:inicio + largo]
+        self.titulos[:] = titulos
+        self.inicios[:] = inicios
+        self.basura = 0
+
+    def _columnas(self):
+        # En modo concurrente se recorre una copia tomada con el candado
+        if self._candado is _SIN_BLOQUEO:
+            return self
+        with self._candado:
+            copia = CatalogoCompacto()
+            copia.isbns = self.isbns[:]
+            copia.titulos = bytes(self.titulos)
+            copia.inicios = self.inicios[:]
+            copia.largos = self.largos[:]
+            copia.autores = self.autores[:]
+            copia.categorias = self.categorias[:]
+            copia.textos = self.textos
+            return copia
+
+    def _recorrer(self):
+        # (isbn, Libro) por fila; como en un dict, cambiar el tamaño mientras se recorre es un error
+        columnas = self._columnas()
+        isbns, titulos, inicios, largos = columnas.isbns, columnas.titulos, columnas.inicios, columnas.largos
+        autores, categorias, textos = columnas.autores, columnas.categorias, columnas.textos.textos
+        n = len(isbns)
+        for fila in range(n):
+            if len(isbns) != n:
+                raise RuntimeError("el catálogo cambió de tamaño durante la iteración")
+            inicio = inicios[fila]
+            isbn = isbns[fila]
+            yield isbn, Libro(titulos[inicio:inicio + largos[fila]].decode("utf-8", "surrogatepass"),
+                              textos[autores[fila]], textos[categorias[fila]], isbn)
+
+    def __iter__(self):
+        isbns = self._columnas().isbns
+        n = len(isbns)
+        for isbn in isbns:
+            if len(isbns) != n:
+                raise RuntimeError("el catálogo cambió de tamaño durante la iteración")
+            yield isbn
+
+    def values(self):
+        return _VistaLibros(self)
+
+    def items(self):
+        return _VistaPares(self)
+
+
 # ---------------------------
 # Clase Usuario
 # ---------------------------
@@ -50,10 +465,12 @@ class Usuario(object):
     Representa un usuario de la biblioteca.
     """
 
+    __slots__ = ("nombre", "user_id", "libros_prestados")
+
     def __init__(self, nombre, user_id):
         self.nombre = nombre
         self.user_id = user_id
-        self.libros_prestados = []  # lista de ISBN
+        self.libros_prestados = {}  # isbn -> fecha de vencimiento (en orden de préstamo)
 
     def __str__(self):
         return "{} (ID: {})".format(self.nombre, self.user_id)
@@ -70,97 +487,392 @@ class Biblioteca(object):
     Clase principal que maneja libros, usuarios y préstamos.
     """
 
-    def __init__(self):
-        self.libros = {}        # isbn -> Libro
+    def __init__(self, historial=None, almacen=None, concurrente=False, franjas=FRANJAS,
+                 catalogo_compacto=False):
+        # isbn -> Libro (CatalogoCompacto: menos memoria por libro, los Libro se arman al leerlos)
+        self.libros = CatalogoCompacto(concurrente) if catalogo_compacto else {}
         self.usuarios = {}      # user_id -> Usuario
         self.user_ids = set()   # conjunto de IDs únicos
         self.prestamos = {}     # isbn -> user_id
-        self.historial = []     # lista de eventos
-
-    def _timestamp(self):
-        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.vencimientos = IndiceVencimientos()  # fecha de vencimiento -> ISBNs
+        # Eventos (HistorialEventos): en disco si se le da una carpeta
+        self.historial = historial if historial is not None else HistorialEventos()
+        self.indices = {campo: IndiceInvertido() for campo in PESOS}  # búsqueda por palabras
+        # Modo concurrente: candados por ISBN / usuario y uno corto para lo compartido
+        self.candados = CandadosPorFranjas(franjas) if concurrente else None
+        self._compartido = threading.Lock() if concurrente else _SIN_BLOQUEO
+        self._eventos_diferidos = None  # lista mientras se difieren las escrituras (diferir_escrituras)
+        # Persistencia opcional (AlmacenBiblioteca de persistencia_biblioteca.py): snapshot + journal
+        self.almacen = almacen
+        if almacen is not None:
+            almacen.cargar(self)
+            # Con varios hilos la compactación la decide la Biblioteca (ver _compactar_si_hace_falta)
+            almacen.compactacion_automatica = not concurrente
+
+    def _bloquear(self, isbns=(), user_ids=()):
+        # Candados de las claves que toca una operación (nada si no es concurrente)
+        if self.candados is None:
+            return _SIN_BLOQUEO
+        return self.candados.para(isbns, user_ids)
+
+    def _bloquear_todo(self):
+        return _SIN_BLOQUEO if self.candados is None else self.candados.todas()
 
     def _registrar_evento(self, accion, user_id=None, isbn=None):
-        self.historial.append((self._timestamp(), accion, user_id, isbn))
+        if self._eventos_diferidos is not None:
+            self._eventos_diferidos.append((accion, user_id, isbn, int(time.time())))
+            return
+        with self._compartido:
+            self.historial.registrar(accion, user_id, isbn)
+
+    def _anotar(self, *registros):
+        # Se llama antes de cambiar la memoria: si el journal falla (OSError) no cambia nada
+        if self.almacen is None:
+            return
+        if self.candados is None:
+            self.almacen.anotar(registros, sincronizar=self._eventos_diferidos is None)
+            return
+        # Modo concurrente: se escribe con el candado compartido y el fsync se hace fuera,
+        # así un mostrador esperando el disco no frena a los demás (las claves de esta
+        # operación siguen tomadas hasta que termine)
+        with self._compartido:
+            self.almacen.anotar(registros, sincronizar=False)
+        self.almacen.sincronizar()
+
+    # ---- Escrituras diferidas (un solo hilo escritor que guarda por lotes) ----
+    def diferir_escrituras(self):
+        """
+        Desde ahora los eventos del historial se juntan en memoria y el journal no hace
+        fsync en cada operación. Quien coordina (BibliotecaAsync) toma los eventos con
+        tomar_eventos_diferidos() y los guarda con guardar_diferido() una vez por lote,
+        antes de dar esas operaciones por hechas. No combina con concurrente=True.
+        """
+        if self.candados is not None:
+            raise ValueError("diferir_escrituras no se usa con concurrente=True")
+        if self._eventos_diferidos is None:
+            self._eventos_diferidos = []
+
+    def tomar_eventos_diferidos(self):
+        eventos, self._eventos_diferidos = self._eventos_diferidos, []
+        return eventos
+
+    def guardar_diferido(self, eventos):
+        """
+        Escribe los eventos de un lote de una vez y hace el fsync pendiente del journal.
+        Puede correr en otro hilo mientras el escritor no toque el historial ni el journal.
+        """
+        self.historial.registrar_lote(eventos)
+        if self.almacen is not None:
+            self.almacen.sincronizar()
+
+    def _compactar_si_hace_falta(self):
+        # Modo concurrente: con todas las franjas tomadas ninguna operación quedó anotada
+        # en el journal sin aplicarse en memoria, y nadie cambia los diccionarios
+        if self.candados is None or self.almacen is None or not self.almacen.necesita_compactar():
+            return
+        with self._bloquear_todo(), self._compartido:
+            if self.almacen.necesita_compactar():
+                self.almacen.compactar()
 
     # ---- Gestión de libros ----
     def añadir_libro(self, libro):
-        if libro.isbn in self.libros:
-            return False
-        self.libros[libro.isbn] = libro
-        self._registrar_evento("ALTA_LIBRO", None, libro.isbn)
+        with self._bloquear(isbns=(libro.isbn,)):
+            if libro.isbn in self.libros:
+                return False
+            self._anotar(["AL", libro.isbn, libro.titulo, libro.autor, libro.categoria])
+            self._alta_libro(libro)
+            self._registrar_evento("ALTA_LIBRO", None, libro.isbn)
+        self._compactar_si_hace_falta()
         return True
 
     def quitar_libro(self, isbn):
-        if isbn not in self.libros:
-            return False
-        if isbn in self.prestamos:
-            return False
-        del self.libros[isbn]
-        self._registrar_evento("BAJA_LIBRO", None, isbn)
+        with self._bloquear(isbns=(isbn,)):
+            if isbn not in self.libros:
+                return False
+            if isbn in self.prestamos:
+                return False
+            self._anotar(["BL", isbn])
+            self._baja_libro(isbn)
+            self._registrar_evento("BAJA_LIBRO", None, isbn)
+        self._compactar_si_hace_falta()
         return True
 
     # ---- Gestión de usuarios ----
     def registrar_usuario(self, usuario):
-        if usuario.user_id in self.user_ids:
-            return False
-        self.user_ids.add(usuario.user_id)
-        self.usuarios[usuario.user_id] = usuario
-        self._registrar_evento("ALTA_USUARIO", usuario.user_id, None)
+        with self._bloquear(user_ids=(usuario.user_id,)):
+            if usuario.user_id in self.user_ids:
+                return False
+            self._anotar(["AU", usuario.user_id, usuario.nombre])
+            self._alta_usuario(usuario)
+            self._registrar_evento("ALTA_USUARIO", usuario.user_id, None)
+        self._compactar_si_hace_falta()
         return True
 
     def dar_baja_usuario(self, user_id):
-        if user_id not in self.usuarios:
-            return False
-        u = self.usuarios[user_id]
-        if u.tiene_prestamos():
-            return False
+        with self._bloquear(user_ids=(user_id,)):
+            if user_id not in self.usuarios:
+                return False
+            u = self.usuarios[user_id]
+            if u.tiene_prestamos():
+                return False
+            self._anotar(["BU", user_id])
+            self._baja_usuario(user_id)
+            self._registrar_evento("BAJA_USUARIO", user_id, None)
+        self._compactar_si_hace_falta()
+        return True
+
+    # ---- Cambios en memoria (sin historial ni journal; también los usa la carga) ----
+    def _alta_libro(self, libro, indexar=True):
+        self.libros[libro.isbn] = libro
+        if indexar:
+            with self._compartido:
+                for campo, indice in self.indices.items():
+                    indice.agregar(libro.isbn, getattr(libro, campo))
+
+    def _baja_libro(self, isbn):
+        libro = self.libros.pop(isbn)
+        with self._compartido:
+            for campo, indice in self.indices.items():
+                indice.quitar(isbn, getattr(libro, campo))
+
+    def _alta_usuario(self, usuario):
+        self.user_ids.add(usuario.user_id)
+        self.usuarios[usuario.user_id] = usuario
+
+    def _baja_usuario(self, user_id):
         del self.usuarios[user_id]
         self.user_ids.remove(user_id)
-        self._registrar_evento("BAJA_USUARIO", user_id, None)
-        return True
+
+    def importar_libros(self, libros, tamano_lote=10000):
+        """
+        Alta masiva de un iterable de Libro (puede ser un generador: se consume de a
+        `tamano_lote`). Los libros no se indexan uno por uno: los índices de búsqueda se
+        completan en una sola pasada al final y, con almacén, se guarda un snapshot en
+        lugar de una línea de journal por libro. Los ISBN que ya están se saltean.
+        La entrada se lee sin candados; en modo concurrente las demás operaciones solo
+        esperan el alta en memoria, el snapshot y los índices.
+        Retorna la cantidad de libros agregados. Si algo falla (al leer o al guardar) el
+        catálogo queda como estaba y se relanza el error.
+        """
+        leidos = {}  # ISBN -> Libro; nada entra al catálogo hasta terminar de leer
+        libros = iter(libros)
+        for lote in iter(lambda: list(islice(libros, tamano_lote)), []):
+            for libro in lote:
+                if libro.isbn not in leidos and libro.isbn not in self.libros:
+                    leidos[libro.isbn] = libro
+        nuevos = []
+        with self._bloquear_todo():
+            try:
+                for isbn, libro in leidos.items():
+                    if isbn not in self.libros:  # otra operación pudo darlo de alta mientras se leía
+                        self.libros[isbn] = libro
+                        nuevos.append(isbn)
+                leidos.clear()  # con catálogo compacto los Libro ya pasaron a las columnas
+                if self.almacen is not None and nuevos:
+                    with self._compartido:
+                        self.almacen.compactar()
+            except BaseException:
+                for isbn in nuevos:
+                    del self.libros[isbn]
+                raise
+            with self._compartido:
+                for campo, indice in self.indices.items():
+                    indice.agregar_lote((isbn, getattr(self.libros[isbn], campo)) for isbn in nuevos)
+        ahora = int(time.time())
+        for i in range(0, len(nuevos), tamano_lote):
+            eventos = [("ALTA_LIBRO", None, isbn, ahora) for isbn in nuevos[i:i + tamano_lote]]
+            if self._eventos_diferidos is not None:
+                self._eventos_diferidos.extend(eventos)
+            else:
+                with self._compartido:
+                    self.historial.registrar_lote(eventos)
+        return len(nuevos)
+
+    def reindexar(self):
+        """
+        Arma de nuevo los índices de búsqueda de todo el catálogo, en una sola pasada
+        (más rápido que indexar libro por libro al cargar muchos).
+        """
+        self.indices = {campo: IndiceInvertido() for campo in PESOS}
+        for campo, indice in self.indices.items():
+            indice.agregar_lote((isbn, getattr(libro, campo)) for isbn, libro in self.libros.items())
 
     # ---- Préstamos ----
-    def prestar_libro(self, isbn, user_id):
-        if isbn not in self.libros:
-            return False
-        if user_id not in self.usuarios:
-            return False
-        if isbn in self.prestamos:
-            return False
-        self.prestamos[isbn] = user_id
-        self.usuarios[user_id].libros_prestados.append(isbn)
-        self._registrar_evento("PRESTAMO", user_id, isbn)
+    def prestar_libro(self, isbn, user_id, dias=DIAS_PRESTAMO):
+        with self._bloquear((isbn,), (user_id,)):
+            if isbn not in self.libros:
+                return False
+            if user_id not in self.usuarios:
+                return False
+            if isbn in self.prestamos:
+                return False
+            vence = date.today() + timedelta(days=dias)
+            self._anotar(["P", isbn, user_id, vence.isoformat()])
+            self._prestar(isbn, user_id, vence)
+            self._registrar_evento("PRESTAMO", user_id, isbn)
+        self._compactar_si_hace_falta()
         return True
 
     def devolver_libro(self, isbn, user_id):
-        if isbn not in self.prestamos:
-            return False
-        if self.prestamos[isbn] != user_id:
-            return False
-        del self.prestamos[isbn]
-        self.usuarios[user_id].libros_prestados.remove(isbn)
-        self._registrar_evento("DEVOLUCION", user_id, isbn)
+        with self._bloquear((isbn,), (user_id,)):
+            if isbn not in self.prestamos:
+                return False
+            if self.prestamos[isbn] != user_id:
+                return False
+            self._anotar(["D", isbn, user_id])
+            self._devolver(isbn, user_id)
+            self._registrar_evento("DEVOLUCION", user_id, isbn)
+        self._compactar_si_hace_falta()
         return True
 
+    def _prestar(self, isbn, user_id, vence):
+        self.prestamos[isbn] = user_id
+        self.usuarios[user_id].libros_prestados[isbn] = vence
+        with self._compartido:
+            self.vencimientos.agregar(vence, isbn)
+
+    def _devolver(self, isbn, user_id):
+        del self.prestamos[isbn]
+        vence = self.usuarios[user_id].libros_prestados.pop(isbn)
+        with self._compartido:
+            self.vencimientos.quitar(vence, isbn)
+
+    def prestar_lote(self, isbns, user_id, dias=DIAS_PRESTAMO):
+        """
+        Presta un carrito de libros a un usuario: todos o ninguno.
+        Retorna (ok, problemas) con problemas = [(isbn, motivo), ...] si no se prestó nada.
+        """
+        isbns = list(isbns)
+        with self._bloquear(isbns, (user_id,)):
+            if user_id not in self.usuarios:
+                return False, [(None, "usuario inexistente")]
+            problemas = []
+            vistos = set()
+            for isbn in isbns:
+                if isbn in vistos:
+                    problemas.append((isbn, "repetido en el carrito"))
+                elif isbn not in self.libros:
+                    problemas.append((isbn, "libro inexistente"))
+                elif isbn in self.prestamos:
+                    problemas.append((isbn, "ya está prestado"))
+                vistos.add(isbn)
+            if problemas:
+                return False, problemas
+            vence = date.today() + timedelta(days=dias)
+            # Un solo bloque en el journal: al recargar se aplica el carrito entero o nada
+            self._anotar(*[["P", isbn, user_id, vence.isoformat()] for isbn in isbns])
+            for isbn in isbns:
+                self._prestar(isbn, user_id, vence)
+                self._registrar_evento("PRESTAMO", user_id, isbn)
+        self._compactar_si_hace_falta()
+        return True, []
+
+    def devolver_lote(self, isbns, user_id):
+        """
+        Devuelve un carrito de libros de un usuario: todos o ninguno.
+        Retorna (ok, problemas) como prestar_lote.
+        """
+        isbns = list(isbns)
+        with self._bloquear(isbns, (user_id,)):
+            problemas = []
+            vistos = set()
+            for isbn in isbns:
+                if isbn in vistos:
+                    problemas.append((isbn, "repetido en el carrito"))
+                elif self.prestamos.get(isbn) != user_id:
+                    problemas.append((isbn, "no está prestado a este usuario"))
+                vistos.add(isbn)
+            if problemas:
+                return False, problemas
+            self._anotar(*[["D", isbn, user_id] for isbn in isbns])
+            for isbn in isbns:
+                self._devolver(isbn, user_id)
+                self._registrar_evento("DEVOLUCION", user_id, isbn)
+        self._compactar_si_hace_falta()
+        return True, []
+
+    def vencimiento(self, isbn):
+        """
+        Fecha de vencimiento del préstamo de `isbn` (None si no está prestado).
+        """
+        with self._bloquear(isbns=(isbn,)):
+            user_id = self.prestamos.get(isbn)
+            if user_id is None:
+                return None
+            return self.usuarios[user_id].libros_prestados[isbn]
+
+    def prestamos_vencidos(self, hoy=None):
+        """
+        Generador de (fecha de vencimiento, Libro, user_id) de los préstamos vencidos,
+        del más atrasado al más reciente.
+        """
+        hoy = hoy or date.today()
+        vencidos = self.vencimientos.antes_de(hoy)
+        if self.candados is not None:
+            # Con varios hilos se copia la lista; un libro devuelto mientras tanto se salta
+            with self._compartido:
+                vencidos = list(vencidos)
+        for vence, isbn in vencidos:
+            user_id = self.prestamos.get(isbn)
+            if user_id is not None:
+                yield vence, self.libros[isbn], user_id
+
     # ---- Búsquedas ----
     def buscar_por_titulo(self, texto):
-        q = texto.strip().lower()
-        return [lib for lib in self.libros.values() if q in lib.titulo.lower()]
+        return list(self.buscar(titulo=texto))
 
     def buscar_por_autor(self, texto):
-        q = texto.strip().lower()
-        return [lib for lib in self.libros.values() if q in lib.autor.lower()]
+        return list(self.buscar(autor=texto))
 
     def buscar_por_categoria(self, texto):
-        q = texto.strip().lower()
-        return [lib for lib in self.libros.values() if q in lib.categoria.lower()]
+        return list(self.buscar(categoria=texto))
+
+    def buscar(self, titulo=None, autor=None, categoria=None):
+        """
+        Generador de libros que cumplen TODOS los criterios, de más a menos relevante.
+        En cada campo, cada palabra buscada debe ser una palabra (o el comienzo de una)
+        del libro. Relevancia: peso del campo (PESOS) por palabra, doble si es completa.
+        A igual relevancia, por ISBN. Sin palabras para buscar se entrega todo el catálogo.
+        """
+        consultas = [(campo, palabras(texto)) for campo, texto in
+                     (("titulo", titulo), ("autor", autor), ("categoria", categoria)) if texto]
+        consultas = [(campo, qs) for campo, qs in consultas if qs]
+        if not consultas:
+            yield from (self.libros.values() if self.candados is None else list(self.libros.values()))
+            return
+
+        # Los índices se leen con el candado compartido tomado (modo concurrente); los
+        # resultados se entregan ya sin él
+        with self._compartido:
+            # Conjunto de cada palabra (por prefijo); se intersecta empezando por el más chico
+            grupos = [(campo, q, self.indices[campo].con_prefijo(q)) for campo, qs in consultas for q in qs]
+            grupos.sort(key=lambda g: len(g[2]))
+            candidatos = set(grupos[0][2])
+            for _, _, isbns in grupos[1:]:
+                if not candidatos:
+                    return
+                candidatos &= isbns
+
+            puntajes = dict.fromkeys(candidatos, 0)
+            for campo, q, _ in grupos:
+                exactos = self.indices[campo].exactos(q)
+                for isbn in candidatos:
+                    puntajes[isbn] += PESOS[campo] * (2 if isbn in exactos else 1)
+        # Montículo: ordenar todo cuesta O(n log n); aquí solo se paga por lo que se consume
+        monticulo = [(-puntaje, isbn) for isbn, puntaje in puntajes.items()]
+        heapq.heapify(monticulo)
+        while monticulo:
+            _, isbn = heapq.heappop(monticulo)
+            libro = self.libros.get(isbn)
+            if libro is not None:  # None: se quitó mientras tanto (modo concurrente)
+                yield libro
 
     # ---- Listados ----
     def listar_libros_prestados_usuario(self, user_id):
-        if user_id not in self.usuarios:
-            return []
-        return [self.libros[i] for i in self.usuarios[user_id].libros_prestados]
+        with self._bloquear(user_ids=(user_id,)):
+            if user_id not in self.usuarios:
+                return []
+            return [self.libros[i] for i in self.usuarios[user_id].libros_prestados]
 
     def catalogo(self):
         return self.libros.values()
@@ -168,8 +880,30 @@ class Biblioteca(object):
     def prestamos_vigentes(self):
         return self.prestamos.items()
 
-    def ver_historial(self):
-        return self.historial
+    def ver_historial(self, **filtros):
+        """
+        Generador de eventos (Evento: momento, accion, user_id, isbn) en orden cronológico.
+        Filtros opcionales de HistorialEventos.consultar: user_id, isbn, accion, desde, hasta.
+        """
+        return self.historial.consultar(**filtros)
+
+    def cerrar(self):
+        if self.almacen is not None:
+            self.almacen.cerrar()
+        self.historial.cerrar()
+
+
+def paginas(resultados, por_pagina=20):
+    """
+    Agrupa un generador de resultados en páginas (listas) sin calcular las siguientes:
+        primera = next(paginas(biblioteca.buscar(autor="torres")))
+    """
+    resultados = iter(resultados)
+    while True:
+        pagina = list(islice(resultados, por_pagina))
+        if not pagina:
+            return
+        yield pagina
 
 
 # ============================================================================
@@ -192,6 +926,12 @@ if __name__ == "__main__":
     biblioteca.añadir_libro(l1)
     biblioteca.añadir_libro(l2)
 
+    # Buscar (sin tildes, por comienzo de palabra y en varios campos a la vez)
+    print("Buscar 'estruc' de 'torres':")
+    for lib in biblioteca.buscar(titulo="estruc", autor="torres"):
+        print("  ", lib)
+    print("Buscar autor 'ramirez':", [lib.isbn for lib in biblioteca.buscar_por_autor("ramirez")])
+
     # Prestar libro
     print("Prestar libro ISBN-001 a U001:", biblioteca.prestar_libro("ISBN-001", "U001"))
 
@@ -203,7 +943,17 @@ if __name__ == "__main__":
     # Devolver libro
     print("Devolver ISBN-001:", biblioteca.devolver_libro("ISBN-001", "U001"))
 
+    # Carrito: todos o ninguno (ISBN-999 no existe, así que no se presta nada)
+    print("Prestar carrito con ISBN-999 a U002:", biblioteca.prestar_lote(["ISBN-001", "ISBN-999"], "U002"))
+    print("Prestar carrito a U002:", biblioteca.prestar_lote(["ISBN-001", "ISBN-002"], "U002"))
+    en_un_mes = date.today() + timedelta(days=30)
+    print("Vencidos dentro de un mes:")
+    for vence, lib, user_id in biblioteca.prestamos_vencidos(hoy=en_un_mes):
+        print("   {} {} ({})".format(vence, lib, user_id))
+    print("Devolver carrito de U002:", biblioteca.devolver_lote(["ISBN-001", "ISBN-002"], "U002"))
+
     # Mostrar historial
     print("Historial de eventos:")
     for evento in biblioteca.ver_historial():
-        print(" ", evento)
+        print("  {:%Y-%m-%d %H:%M:%S} {} {} {}".format(*evento))
+    print("Préstamos de ISBN-001:", [e.user_id for e in biblioteca.ver_historial(isbn="ISBN-001", accion="PRESTAMO")])
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+Fachada asyncio de la Biblioteca (muchos clientes, un solo proceso)
+Estudiante: Leslye Valencia
+
+Descripción:
+------------
+- Un solo escritor: préstamos, devoluciones, altas y bajas van a una cola y una tarea
+  (el despachador) las aplica de a lotes, en orden de llegada. La Biblioteca no
+  necesita candados: todo lo que la toca corre en el hilo del event loop.
+- Guardado por lotes (group commit): durante el lote los eventos del historial se
+  juntan en memoria y el journal no hace fsync por operación
+  (Biblioteca.diferir_escrituras). Al terminar el lote se escriben los eventos de una
+  vez y se hace un solo fsync, en un hilo aparte para no frenar el event loop. Cada
+  cliente recibe su respuesta recién cuando su lote quedó guardado. Mientras se
+  guarda, la cola junta los pedidos siguientes: con más carga, lotes más grandes.
+- Si el guardado de un lote falla, sus operaciones ya están aplicadas (en memoria y en
+  el journal sin fsync) y no se deshacen: cada una recibe LoteNoGuardado, con lo que
+  retornó en `resultado`, y desde ahí se rechazan las escrituras nuevas.
+- Lecturas: buscar, vencimiento y los listados corren directo en el event loop, entre
+  lote y lote, sin pasar por la cola: nunca ven medio carrito ni esperan al escritor.
+  Pueden ver un lote aplicado cuyo guardado todavía está en curso.
+- Búsquedas compartidas: la misma consulta sobre la misma versión del catálogo se
+  calcula una sola vez y el resultado (una tupla) se reparte a todos los que la
+  pidieron. Préstamos y devoluciones no cambian lo que encuentra buscar; la versión
+  solo avanza con un lote que tiene altas o bajas de libros.
+- ver_historial corre en el hilo de guardado, así no se cruza con una escritura del
+  historial.
+
+Ejemplo:
+    async with BibliotecaAsync(abrir_biblioteca("datos")) as fachada:
+        ok = await fachada.prestar_libro("ISBN-001", "U001")
+        primeros = await fachada.buscar(autor="torres", limite=10)
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from biblioteca import DIAS_PRESTAMO
+
+MAX_BUSQUEDAS = 4096  # resultados guardados por versión como máximo
+CAMBIOS_CATALOGO = ("añadir_libro", "quitar_libro")  # las únicas que cambian lo que encuentra buscar
+
+
+class LoteNoGuardado(OSError):
+    """
+    La operación se aplicó (las lecturas ya la ven) pero el guardado de su lote falló:
+    puede perderse si el proceso se cae. `resultado` es lo que retornó la operación.
+    """
+
+    def __init__(self, resultado, error):
+        super(LoteNoGuardado, self).__init__("La operación se aplicó pero no se pudo guardar en disco: {}".format(error))
+        self.resultado = resultado
+
+
+class BibliotecaAsync(object):
+    """
+    Fachada async de una Biblioteca. Hay que usarla desde un solo event loop, entre
+    iniciar() y cerrar() (o con `async with`). cerrar() también cierra la Biblioteca.
+    """
+
+    def __init__(self, biblioteca, max_lote=512):
+        if biblioteca.candados is not None:
+            raise ValueError("BibliotecaAsync usa una Biblioteca normal (sin concurrente=True)")
+        if max_lote < 1:
+            raise ValueError("max_lote debe ser al menos 1")
+        self.biblioteca = biblioteca
+        self.max_lote = max_lote
+        self.version = 0            # versión del catálogo (lotes con altas o bajas de libros)
+        self.lotes = 0
+        self.escrituras = 0
+        self.busquedas = 0
+        self.busquedas_compartidas = 0
+        self.error = None           # OSError al guardar: desde ahí se rechazan las escrituras
+        self._resultados = {}       # (version, consulta) -> tupla de libros
+        self._cola = None
+        self._despachador = None
+        self._hilo_guardado = None
+
+    async def iniciar(self):
+        self.biblioteca.diferir_escrituras()
+        self._cola = asyncio.Queue()
+        self._hilo_guardado = ThreadPoolExecutor(max_workers=1, thread_name_prefix="biblioteca-guardado")
+        self._despachador = asyncio.create_task(self._despachar())
+        return self
+
+    async def cerrar(self):
+        """
+        Termina los lotes pendientes y cierra la Biblioteca.
+        """
+        if self._despachador is None:
+            return
+        await self._cola.put(None)
+        await self._despachador
+        self._despachador = None
+        self._hilo_guardado.shutdown()
+        self.biblioteca.cerrar()
+
+    async def __aenter__(self):
+        return await self.iniciar()
+
+    async def __aexit__(self, tipo, valor, traza):
+        await self.cerrar()
+        return False
+
+    # ---- Escrituras (pasan por el despachador) ----
+    async def añadir_libro(self, libro):
+        return await self._escribir("añadir_libro", libro)
+
+    async def quitar_libro(self, isbn):
+        return await self._escribir("quitar_libro", isbn)
+
+    async def registrar_usuario(self, usuario):
+        return await self._escribir("registrar_usuario", usuario)
+
+    async def dar_baja_usuario(self, user_id):
+        return await self._escribir("dar_baja_usuario", user_id)
+
+    async def prestar_libro(self, isbn, user_id, dias=DIAS_PRESTAMO):
+        return await self._escribir("prestar_libro", isbn, user_id, dias)
+
+    async def devolver_libro(self, isbn, user_id):
+        return await self._escribir("devolver_libro", isbn, user_id)
+
+    async def prestar_lote(self, isbns, user_id, dias=DIAS_PRESTAMO):
+        return await self._escribir("prestar_lote", list(isbns), user_id, dias)
+
+    async def devolver_lote(self, isbns, user_id):
+        return await self._escribir("devolver_lote", list(isbns), user_id)
+
+    async def _escribir(self, operacion, *args):
+        if self._despachador is None:
+            raise RuntimeError("BibliotecaAsync no está iniciada")
+        if self.error is not None:
+            raise OSError("La biblioteca no pudo guardar un lote anterior: {}".format(self.error))
+        futuro = asyncio.get_running_loop().create_future()
+        await self._cola.put((operacion, args, futuro))
+        return await futuro
+
+    async def _despachar(self):
+        loop = asyncio.get_running_loop()
+        biblioteca = self.biblioteca
+        terminar = False
+        while not terminar:
+            lote = []
+            pedido = await self._cola.get()
+            while True:
+                if pedido is None:
+                    terminar = True
+                    break
+                lote.append(pedido)
+                if len(lote) >= self.max_lote or self._cola.empty():
+                    break
+                pedido = self._cola.get_nowait()
+            if not lote:
+                continue
+
+            # Se aplica todo el lote sin ceder el event loop: las lecturas ven el antes o el después
+            resultados = []
+            catalogo_cambiado = False
+            for operacion, args, _ in lote:
+                try:
+                    resultados.append((True, getattr(biblioteca, operacion)(*args)))
+                except Exception as e:
+                    resultados.append((False, e))
+                catalogo_cambiado = catalogo_cambiado or operacion in CAMBIOS_CATALOGO
+            if catalogo_cambiado:
+                self.version += 1
+                self._resultados.clear()
+            eventos = biblioteca.tomar_eventos_diferidos()
+            try:
+                await loop.run_in_executor(self._hilo_guardado, biblioteca.guardar_diferido, eventos)
+            except OSError as e:
+                self.error = e
+                # Las que fallaron solas no se aplicaron: conservan su propia excepción
+                resultados = [(False, LoteNoGuardado(valor, e)) if ok else (ok, valor) for ok, valor in resultados]
+            self.lotes += 1
+            self.escrituras += len(lote)
+            for (_, _, futuro), (ok, valor) in zip(lote, resultados):
+                if futuro.done():
+                    continue  # el cliente se fue (cancelado); la operación igual quedó hecha
+                if ok:
+                    futuro.set_result(valor)
+                else:
+                    futuro.set_exception(valor)
+
+    # ---- Lecturas (directo en el event loop) ----
+    async def buscar(self, titulo=None, autor=None, categoria=None, limite=20):
+        """
+        Los primeros `limite` libros de Biblioteca.buscar, como tupla (compartida entre
+        quienes piden la misma consulta sobre la misma versión).
+        """
+        clave = (self.version, titulo, autor, categoria, limite)
+        self.busquedas += 1
+        resultado = self._resultados.get(clave)
+        if resultado is not None:
+            self.busquedas_compartidas += 1
+            return resultado
+        resultado = tuple(islice(self.biblioteca.buscar(titulo, autor, categoria), limite))
+        if len(self._resultados) >= MAX_BUSQUEDAS:
+            self._resultados.clear()
+        self._resultados[clave] = resultado
+        return resultado
+
+    async def vencimiento(self, isbn):
+        return self.biblioteca.vencimiento(isbn)
+
+    async def listar_libros_prestados_usuario(self, user_id):
+        return self.biblioteca.listar_libros_prestados_usuario(user_id)
+
+    async def prestamos_vencidos(self, hoy=None, limite=100):
+        return list(islice(self.biblioteca.prestamos_vencidos(hoy), limite))
+
+    async def ver_historial(self, limite=100, **filtros):
+        """
+        Hasta `limite` eventos de Biblioteca.ver_historial (filtros: user_id, isbn,
+        accion, desde, hasta). Se leen en el hilo de guardado.
+        """
+        def leer():
+            return list(islice(self.biblioteca.ver_historial(**filtros), limite))
+        return await asyncio.get_running_loop().run_in_executor(self._hilo_guardado, leer)
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Prueba de carga de la fachada asyncio de la Biblioteca.
+
+Carga abierta: durante `--segundos` llegan `--tasa` pedidos por segundo (al azar,
+Poisson), sin esperar a que terminen los anteriores, como clientes web independientes.
+Mezcla de búsquedas (unas pocas consultas populares y muchas raras) y de préstamos /
+devoluciones (`--escrituras`). Informa pedidos atendidos por segundo y latencias
+p50 / p99 / p99.9 por tipo, medidas desde la llegada (incluye la espera en cola), y para
+la fachada cuántas operaciones guardó por lote y cuántas búsquedas compartió.
+
+Modos:
+    fachada   BibliotecaAsync: un escritor, guardado por lotes, búsquedas compartidas
+    directa   cada petición llama a la Biblioteca en el event loop (un fsync por operación)
+
+La biblioteca se arma en una carpeta temporal (snapshot + journal + historial) con la
+durabilidad indicada.
+
+Uso:
+    python carga_biblioteca.py [--tasa 2000] [--segundos 5] [--escrituras 0.3] [--durabilidad completa]
+"""
+
+import argparse
+import asyncio
+import random
+import shutil
+import tempfile
+import time
+from collections import defaultdict
+from itertools import islice
+
+from biblioteca import Libro, Usuario
+from biblioteca_async import BibliotecaAsync
+from persistencia_biblioteca import abrir_biblioteca
+
+MODOS = ("fachada", "directa")
+PALABRAS = ["historia", "programación", "python", "datos", "estructuras", "redes", "teoría", "álgebra",
+            "cálculo", "física", "química", "novela", "poesía", "viaje", "guerra", "amor", "ciudad", "mar"]
+AUTORES = ["Ramírez", "Torres", "Pérez", "Gómez", "Valencia", "Castro", "Mora", "Rojas", "Vega", "Silva"]
+
+
+class BibliotecaDirecta(object):
+    """
+    Referencia: la misma interfaz async, pero cada petición se atiende al llegar,
+    sin cola, sin lotes y sin compartir búsquedas.
+    """
+
+    def __init__(self, biblioteca):
+        self.biblioteca = biblioteca
+
+    async def buscar(self, titulo=None, autor=None, categoria=None, limite=20):
+        return tuple(islice(self.biblioteca.buscar(titulo, autor, categoria), limite))
+
+    async def prestar_libro(self, isbn, user_id):
+        return self.biblioteca.prestar_libro(isbn, user_id)
+
+    async def devolver_libro(self, isbn, user_id):
+        return self.biblioteca.devolver_libro(isbn, user_id)
+
+    async def cerrar(self):
+        self.biblioteca.cerrar()
+
+
+def preparar(carpeta, durabilidad, n_libros, n_usuarios):
+    biblioteca = abrir_biblioteca(carpeta, durabilidad)
+    azar = random.Random(1)
+    for i in range(n_libros):
+        titulo = " ".join(azar.sample(PALABRAS, 3))
+        biblioteca._alta_libro(Libro(titulo, azar.choice(AUTORES), "General", "978{:010d}".format(i)),
+                               indexar=False)
+    for i in range(n_usuarios):
+        biblioteca._alta_usuario(Usuario("Cliente {}".format(i), "C{:05d}".format(i)))
+    biblioteca.reindexar()
+    biblioteca.almacen.compactar()
+    return biblioteca
+
+
+def consultas_populares(n):
+    # Unas pocas consultas se repiten mucho (pesos 1/k) y hay una cola larga de raras
+    azar = random.Random(2)
+    consultas = [(" ".join(azar.sample(PALABRAS, 2)), azar.choice(AUTORES + [None])) for _ in range(n)]
+    pesos = [1 / (k + 1) for k in range(n)]
+    return consultas, pesos
+
+
+class Estado(object):
+    # Lo que comparten los pedidos de una corrida
+    def __init__(self, isbns, usuarios, consultas, pesos):
+        self.isbns = isbns
+        self.usuarios = usuarios
+        self.consultas = consultas
+        self.pesos = pesos
+        self.prestamos = []                  # (isbn, user_id) prestados durante la prueba
+        self.latencias = defaultdict(list)   # tipo -> segundos desde la llegada
+        self.errores = []
+
+
+async def atender(fachada, llegada, azar, escrituras, estado):
+    try:
+        if azar.random() < escrituras:
+            if estado.prestamos and azar.random() < 0.5:
+                tipo = "devolver"
+                i = azar.randrange(len(estado.prestamos))
+                estado.prestamos[i], estado.prestamos[-1] = estado.prestamos[-1], estado.prestamos[i]
+                isbn, user_id = estado.prestamos.pop()
+                if not await fachada.devolver_libro(isbn, user_id):
+                    estado.errores.append(tipo)
+            else:
+                tipo = "prestar"
+                isbn, user_id = azar.choice(estado.isbns), azar.choice(estado.usuarios)
+                if await fachada.prestar_libro(isbn, user_id):
+                    estado.prestamos.append((isbn, user_id))
+        else:
+            tipo = "buscar"
+            titulo, autor = azar.choices(estado.consultas, estado.pesos)[0]
+            await fachada.buscar(titulo=titulo, autor=autor)
+    except OSError:
+        tipo = "error"
+        estado.errores.append("guardado")
+    estado.latencias[tipo].append(time.perf_counter() - llegada)
+
+
+async def generar_carga(fachada, tasa, segundos, escrituras, estado):
+    """
+    Carga abierta: los pedidos llegan a `tasa` por segundo (Poisson) sin esperar a que
+    terminen los anteriores. La latencia se mide desde la llegada prevista, así cuenta
+    también el tiempo que el pedido esperó porque el event loop estaba ocupado.
+    """
+    azar = random.Random(3)
+    pendientes = set()
+    llegada = time.perf_counter()
+    fin = llegada + segundos
+    while True:
+        llegada += azar.expovariate(tasa)
+        if llegada >= fin:
+            break
+        espera = llegada - time.perf_counter()
+        if espera > 0:
+            await asyncio.sleep(espera)
+        tarea = asyncio.create_task(atender(fachada, llegada, azar, escrituras, estado))
+        pendientes.add(tarea)
+        tarea.add_done_callback(pendientes.discard)
+    await asyncio.gather(*pendientes)
+
+
+def percentil(ordenados, p):
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+async def correr_modo(modo, args):
+    carpeta = tempfile.mkdtemp(prefix="carga_biblioteca_")
+    biblioteca = preparar(carpeta, args.durabilidad, args.libros, args.usuarios)
+    if modo == "fachada":
+        fachada = await BibliotecaAsync(biblioteca, args.max_lote).iniciar()
+    else:
+        fachada = BibliotecaDirecta(biblioteca)
+    estado = Estado(list(biblioteca.libros), list(biblioteca.usuarios), *consultas_populares(args.consultas))
+
+    inicio = time.perf_counter()
+    await generar_carga(fachada, args.tasa, args.segundos, args.escrituras, estado)
+    duracion = time.perf_counter() - inicio
+    await fachada.cerrar()
+    shutil.rmtree(carpeta, ignore_errors=True)
+
+    total = sum(len(v) for v in estado.latencias.values())
+    print("{}: {} pedidos atendidos en {:.2f} s -> {:,.0f} req/s".format(modo, total, duracion, total / duracion))
+    for tipo in ("buscar", "prestar", "devolver"):
+        ordenados = sorted(estado.latencias[tipo])
+        if ordenados:
+            print("  {:<9} {:>7}  p50 {:7.2f} ms  p99 {:7.2f} ms  p99.9 {:7.2f} ms".format(
+                tipo, len(ordenados), percentil(ordenados, 0.5) * 1000, percentil(ordenados, 0.99) * 1000,
+                percentil(ordenados, 0.999) * 1000))
+    if estado.errores:
+        print("  errores: {}".format(len(estado.errores)))
+    if modo == "fachada" and fachada.lotes:
+        print("  {} lote(s), {:.1f} escrituras por lote; {:.0%} de las búsquedas compartidas".format(
+            fachada.lotes, fachada.escrituras / fachada.lotes,
+            fachada.busquedas_compartidas / max(1, fachada.busquedas)))
+
+
+async def main_async(args):
+    print("{:,.0f} pedidos/s durante {} s, {} libros, {:.0%} escrituras, durabilidad {}".format(
+        args.tasa, args.segundos, args.libros, args.escrituras, args.durabilidad))
+    for modo in args.modos:
+        await correr_modo(modo, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de la fachada asyncio de la Biblioteca.")
+    parser.add_argument("--tasa", type=float, default=2000, help="pedidos por segundo que llegan")
+    parser.add_argument("--segundos", type=float, default=5.0)
+    parser.add_argument("--escrituras", type=float, default=0.3, help="fracción de préstamos / devoluciones")
+    parser.add_argument("--libros", type=int, default=50_000)
+    parser.add_argument("--usuarios", type=int, default=1000)
+    parser.add_argument("--consultas", type=int, default=500, help="consultas distintas")
+    parser.add_argument("--durabilidad", choices=("ninguna", "archivo", "completa"), default="completa")
+    parser.add_argument("--max-lote", type=int, default=512)
+    parser.add_argument("--modos", nargs="+", choices=MODOS, default=list(MODOS))
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
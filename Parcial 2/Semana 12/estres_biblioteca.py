@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+Prueba de estrés de préstamos con varios hilos (mostradores).
+
+Cada hilo atiende a sus propios usuarios y, al azar, presta libros, devuelve los que
+prestó o presta carritos de varios libros. Al final se verifica que no haya:
+- préstamos dobles: dos mostradores que prestaron el mismo libro a la vez;
+- préstamos perdidos: un préstamo que salió bien pero no está en la biblioteca (o una
+  devolución de un libro propio que falló);
+- estructuras desparejas: préstamos, libros de cada usuario e índice de vencimientos
+  tienen que coincidir;
+- y, con --carpeta, que al volver a abrir desde el disco se vea el mismo estado.
+
+Modos:
+    franjas       Biblioteca(concurrente=True): candados por ISBN / usuario
+    global        un solo candado alrededor de cada operación (referencia)
+    sin_candados  Biblioteca() normal: debería encontrar errores
+
+Uso:
+    python estres_biblioteca.py [--hilos 8] [--operaciones 200000] [--modos franjas global sin_candados]
+    python estres_biblioteca.py --carpeta /tmp/estres --umbral 200000
+    python estres_biblioteca.py --carpeta /tmp/estres --durabilidad completa --operaciones 20000
+"""
+
+import argparse
+import random
+import shutil
+import sys
+import threading
+import time
+from collections import Counter
+
+from biblioteca import Biblioteca, Libro, Usuario
+from persistencia_biblioteca import AlmacenBiblioteca
+
+MODOS = ("franjas", "global", "sin_candados")
+
+
+class BibliotecaCandadoGlobal(Biblioteca):
+    """
+    Referencia: una operación de préstamo a la vez, para toda la biblioteca.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._global = threading.Lock()
+        super(BibliotecaCandadoGlobal, self).__init__(*args, **kwargs)
+
+    def prestar_libro(self, *args):
+        with self._global:
+            return super(BibliotecaCandadoGlobal, self).prestar_libro(*args)
+
+    def devolver_libro(self, *args):
+        with self._global:
+            return super(BibliotecaCandadoGlobal, self).devolver_libro(*args)
+
+    def prestar_lote(self, *args):
+        with self._global:
+            return super(BibliotecaCandadoGlobal, self).prestar_lote(*args)
+
+
+class Mostrador(object):
+    """
+    Un hilo de la prueba: sus usuarios, los préstamos que cree tener y sus contadores.
+    """
+
+    def __init__(self, numero, biblioteca, isbns, usuarios, operaciones, semilla):
+        self.biblioteca = biblioteca
+        self.isbns = isbns
+        self.usuarios = usuarios
+        self.operaciones = operaciones
+        self.azar = random.Random(semilla + numero)
+        self.mios = {}                 # isbn -> user_id (préstamos hechos por este mostrador)
+        self.prestados = Counter()     # isbn -> préstamos exitosos
+        self.devueltos = Counter()     # isbn -> devoluciones exitosas
+        self.devoluciones_fallidas = []
+        self.errores = []
+
+    def correr(self):
+        b = self.biblioteca
+        azar = self.azar
+        try:
+            for _ in range(self.operaciones):
+                opcion = azar.random()
+                if opcion < 0.45 or not self.mios:
+                    isbn = azar.choice(self.isbns)
+                    user_id = azar.choice(self.usuarios)
+                    if b.prestar_libro(isbn, user_id):
+                        self._prestado(isbn, user_id)
+                elif opcion < 0.9:
+                    isbn = azar.choice(list(self.mios)) if len(self.mios) < 64 else next(iter(self.mios))
+                    user_id = self.mios.pop(isbn)
+                    if b.devolver_libro(isbn, user_id):
+                        self.devueltos[isbn] += 1
+                    else:
+                        self.devoluciones_fallidas.append(isbn)
+                else:
+                    user_id = azar.choice(self.usuarios)
+                    carrito = azar.sample(self.isbns, 3)
+                    ok, _ = b.prestar_lote(carrito, user_id)
+                    if ok:
+                        for isbn in carrito:
+                            self._prestado(isbn, user_id)
+        except Exception as e:  # se informa al final; el hilo no debe morir en silencio
+            self.errores.append(repr(e))
+
+    def _prestado(self, isbn, user_id):
+        self.mios[isbn] = user_id
+        self.prestados[isbn] += 1
+
+
+def verificar(biblioteca, mostradores):
+    """
+    Lista de problemas encontrados (vacía si todo cuadra).
+    """
+    problemas = []
+    prestados = Counter()
+    devueltos = Counter()
+    for m in mostradores:
+        prestados.update(m.prestados)
+        devueltos.update(m.devueltos)
+        problemas.extend("error en un hilo: {}".format(e) for e in m.errores)
+        if m.devoluciones_fallidas:
+            problemas.append("{} devolución(es) de libros propios fallaron (préstamo perdido)".format(
+                len(m.devoluciones_fallidas)))
+
+    dobles = [isbn for isbn in prestados if prestados[isbn] - devueltos[isbn] > 1]
+    if dobles:
+        problemas.append("{} libro(s) prestados dos veces a la vez (p. ej. {})".format(len(dobles), dobles[0]))
+    esperados = {}
+    for m in mostradores:
+        for isbn, user_id in m.mios.items():
+            if isbn in esperados:
+                problemas.append("{} figura prestado por dos mostradores".format(isbn))
+            esperados[isbn] = user_id
+    if esperados != biblioteca.prestamos:
+        faltan = len(set(esperados) - set(biblioteca.prestamos))
+        sobran = len(set(biblioteca.prestamos) - set(esperados))
+        problemas.append("préstamos distintos a los esperados: {} perdido(s), {} de más".format(faltan, sobran))
+
+    por_usuario = {(isbn, u.user_id) for u in biblioteca.usuarios.values() for isbn in u.libros_prestados}
+    if por_usuario != set(biblioteca.prestamos.items()):
+        problemas.append("los libros de cada usuario no coinciden con los préstamos")
+    en_indice = sum(len(isbns) for isbns in biblioteca.vencimientos.por_fecha.values())
+    if en_indice != len(biblioteca.prestamos):
+        problemas.append("índice de vencimientos con {} préstamo(s), hay {}".format(
+            en_indice, len(biblioteca.prestamos)))
+    return problemas
+
+
+def preparar(modo, n_libros, n_usuarios, carpeta, durabilidad, umbral):
+    almacen = None
+    if carpeta:
+        shutil.rmtree(carpeta, ignore_errors=True)
+        almacen = AlmacenBiblioteca(carpeta, durabilidad=durabilidad, umbral_compactacion=umbral)
+    if modo == "franjas":
+        biblioteca = Biblioteca(almacen=almacen, concurrente=True)
+    elif modo == "global":
+        biblioteca = BibliotecaCandadoGlobal(almacen=almacen)
+    else:
+        biblioteca = Biblioteca(almacen=almacen)
+    for i in range(n_libros):
+        biblioteca.añadir_libro(Libro("Libro {}".format(i), "Autor {}".format(i % 97), "General",
+                                      "978{:010d}".format(i)))
+    for i in range(n_usuarios):
+        biblioteca.registrar_usuario(Usuario("Usuario {}".format(i), "U{:05d}".format(i)))
+    return biblioteca
+
+
+def correr_modo(modo, args):
+    biblioteca = preparar(modo, args.libros, args.usuarios, args.carpeta, args.durabilidad, args.umbral)
+    isbns = list(biblioteca.libros)
+    usuarios = list(biblioteca.usuarios)
+    por_hilo = args.operaciones // args.hilos
+    mostradores = [Mostrador(i, biblioteca, isbns, usuarios[i::args.hilos], por_hilo, args.semilla)
+                   for i in range(args.hilos)]
+    hilos = [threading.Thread(target=m.correr) for m in mostradores]
+    inicio = time.perf_counter()
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    segundos = time.perf_counter() - inicio
+
+    problemas = verificar(biblioteca, mostradores)
+    biblioteca.cerrar()
+    if args.carpeta and not any(m.errores for m in mostradores):
+        recargada = Biblioteca(almacen=AlmacenBiblioteca(args.carpeta, durabilidad=args.durabilidad))
+        if recargada.prestamos != biblioteca.prestamos:
+            problemas.append("al volver a abrir desde el disco los préstamos no coinciden")
+        recargada.cerrar()
+    total = por_hilo * args.hilos
+    print("{:<13} {:>8.0f} ops/s  ({} ops en {:.2f} s, {} préstamos vigentes)".format(
+        modo, total / segundos, total, segundos, len(biblioteca.prestamos)))
+    for problema in problemas[:5]:
+        print("    ERROR: {}".format(problema))
+    if not problemas:
+        print("    sin préstamos dobles ni perdidos")
+    return problemas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de estrés de préstamos con varios hilos.")
+    parser.add_argument("--hilos", type=int, default=8)
+    parser.add_argument("--operaciones", type=int, default=200_000, help="total entre todos los hilos")
+    parser.add_argument("--libros", type=int, default=2_000)
+    parser.add_argument("--usuarios", type=int, default=400)
+    parser.add_argument("--modos", nargs="+", choices=MODOS, default=list(MODOS))
+    parser.add_argument("--carpeta", help="con persistencia (snapshot + journal) en esta carpeta")
+    parser.add_argument("--durabilidad", choices=("ninguna", "archivo", "completa"), default="archivo")
+    parser.add_argument("--umbral", type=int, default=64 * 1024 * 1024,
+                        help="bytes de journal para compactar (chico = compacta durante la prueba)")
+    parser.add_argument("--intercambio", type=float, default=1e-5,
+                        help="segundos entre cambios de hilo (sys.setswitchinterval): más chico, más carreras")
+    parser.add_argument("--semilla", type=int, default=1)
+    args = parser.parse_args()
+    if args.usuarios < args.hilos:
+        parser.error("hace falta al menos un usuario por hilo")
+
+    sys.setswitchinterval(args.intercambio)
+    print("{} hilos, {} libros, {} usuarios{}".format(
+        args.hilos, args.libros, args.usuarios,
+        ", journal en {} ({})".format(args.carpeta, args.durabilidad) if args.carpeta else ""))
+    fallidos = []
+    for modo in args.modos:
+        if correr_modo(modo, args) and modo != "sin_candados":
+            fallidos.append(modo)
+    if args.carpeta:
+        shutil.rmtree(args.carpeta, ignore_errors=True)
+    if fallidos:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
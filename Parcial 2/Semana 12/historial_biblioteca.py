@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+"""
+Historial de eventos de la Biblioteca (log en disco por segmentos)
+Estudiante: Leslye Valencia
+
+Descripción:
+------------
+- Cada evento (ALTA_LIBRO, PRESTAMO, ...) se agrega al final de un archivo binario
+  (segmento). Al llegar a `tamano_segmento` bytes se cierra y se empieza otro.
+- Registro binario compacto: la fecha es un entero de 4 bytes (segundos desde 1970)
+  y la acción un código de 1 byte, en lugar de un texto "2024-05-01 10:00:00".
+- Índices por user_id e ISBN: el del segmento actual está en memoria; al cerrar un
+  segmento se guarda en un archivo .idx junto a él, ordenado por clave, y se consulta
+  con búsqueda binaria sobre el archivo (sin cargarlo). En memoria solo queda un resumen
+  por segmento (rango de fechas y eventos por acción) y los últimos eventos (buffer
+  circular), así la memoria no crece con los años de historial.
+- consultar() descarta los segmentos fuera del rango de fechas o sin la acción buscada
+  y, si se filtra por usuario o ISBN, lee solo las posiciones que indica el índice.
+- Sin ruta (HistorialEventos()) no se escribe nada en disco: solo se conservan los
+  últimos `capacidad_memoria` eventos.
+
+Formato de un registro (little endian):
+    largo (2 bytes) | segundos (4) | acción (1) | largo user_id (1) | user_id | isbn
+    (user_id o isbn vacío = None)
+
+Archivos en la carpeta del historial:
+    00000001.seg  00000001.idx  00000002.seg  ...   el último .seg es el actual (sin .idx)
+    .idx: línea 1 = resumen JSON; luego una línea por clave, ordenadas (bytes UTF-8):
+          i<TAB>isbn<TAB>pos pos ...      u<TAB>user_id<TAB>pos pos ...
+
+Ejemplo:
+    historial = HistorialEventos("historial")
+    biblioteca = Biblioteca(historial=historial)
+    hace_un_mes = datetime.now() - timedelta(days=30)
+    for evento in historial.consultar(isbn="ISBN-001", accion="PRESTAMO", desde=hace_un_mes):
+        print(evento.momento, evento.user_id)
+"""
+
+import json
+import os
+import struct
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+
+ACCIONES = ("ALTA_LIBRO", "BAJA_LIBRO", "ALTA_USUARIO", "BAJA_USUARIO", "PRESTAMO", "DEVOLUCION")
+CODIGOS = {accion: n for n, accion in enumerate(ACCIONES)}
+DURABILIDADES = ("ninguna", "archivo", "completa")
+CABECERA = struct.Struct("<HIBB")  # largo total, segundos, acción, largo de user_id
+
+Evento = namedtuple("Evento", "momento accion user_id isbn")
+
+
+def _segundos(momento):
+    # datetime o número (segundos desde 1970) -> entero
+    if momento is None:
+        return None
+    if isinstance(momento, datetime):
+        return int(momento.timestamp())
+    return int(momento)
+
+
+def codificar(segundos, accion, user_id, isbn):
+    usuario = (user_id or "").encode("utf-8")
+    libro = (isbn or "").encode("utf-8")
+    largo = CABECERA.size + len(usuario) + len(libro)
+    if len(usuario) > 255 or largo > 0xFFFF:
+        raise ValueError("user_id o ISBN demasiado largo para el historial")
+    if b"\t" in usuario + libro or b"\n" in usuario + libro:
+        raise ValueError("user_id o ISBN con tabulación o salto de línea")
+    return CABECERA.pack(largo, segundos, CODIGOS[accion], len(usuario)) + usuario + libro
+
+
+def decodificar(datos, posicion=0):
+    """
+    Retorna (segundos, accion, user_id, isbn, largo) del registro que empieza en `posicion`.
+    """
+    largo, segundos, codigo, largo_usuario = CABECERA.unpack_from(datos, posicion)
+    inicio = posicion + CABECERA.size
+    usuario = datos[inicio:inicio + largo_usuario].decode("utf-8") or None
+    isbn = datos[inicio + largo_usuario:posicion + largo].decode("utf-8") or None
+    return segundos, ACCIONES[codigo], usuario, isbn, largo
+
+
+def _a_evento(segundos, accion, user_id, isbn):
+    return Evento(datetime.fromtimestamp(segundos), accion, user_id, isbn)
+
+
+# ---------------------------
+# Índice de un segmento
+# ---------------------------
+class _IndiceSegmento(object):
+    """
+    Posiciones de los registros de un segmento por user_id e ISBN, más un resumen
+    (rango de fechas y cantidad de eventos por acción) que sirve para descartarlo.
+    """
+
+    def __init__(self):
+        self.desde = None
+        self.hasta = None
+        self.acciones = {}     # acción -> cantidad de eventos
+        self.usuarios = {}     # user_id -> [posiciones]
+        self.isbns = {}        # isbn -> [posiciones]
+
+    def agregar(self, posicion, segundos, accion, user_id, isbn):
+        # Mínimo y máximo, no primero y último: el reloj puede volver atrás (NTP, momento=)
+        if self.desde is None or segundos < self.desde:
+            self.desde = segundos
+        if self.hasta is None or segundos > self.hasta:
+            self.hasta = segundos
+        self.acciones[accion] = self.acciones.get(accion, 0) + 1
+        if user_id is not None:
+            self.usuarios.setdefault(user_id, []).append(posicion)
+        if isbn is not None:
+            self.isbns.setdefault(isbn, []).append(posicion)
+
+    def resumen(self):
+        return {"desde": self.desde, "hasta": self.hasta, "acciones": self.acciones}
+
+    def buscar(self, tipo, clave):
+        return (self.isbns if tipo == "i" else self.usuarios).get(clave, [])
+
+    def guardar(self, ruta):
+        lineas = [(tipo + "\t" + clave + "\t").encode("utf-8") + " ".join(map(str, posiciones)).encode("ascii")
+                  for tipo, tabla in (("i", self.isbns), ("u", self.usuarios))
+                  for clave, posiciones in tabla.items()]
+        lineas.sort()
+        temporal = ruta + ".tmp"
+        with open(temporal, "wb") as f:
+            f.write(json.dumps(self.resumen(), ensure_ascii=False).encode("utf-8") + b"\n")
+            f.write(b"\n".join(lineas) + b"\n" if lineas else b"")
+        os.replace(temporal, ruta)
+
+
+def _leer_resumen(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        return json.loads(f.readline())
+
+
+def _inicio_linea(f, posicion):
+    # Byte donde empieza la línea que contiene `posicion`
+    while posicion > 0:
+        desde = max(0, posicion - 4096)
+        f.seek(desde)
+        bloque = f.read(posicion - desde)
+        salto = bloque.rfind(b"\n")
+        if salto != -1:
+            return desde + salto + 1
+        posicion = desde
+    return 0
+
+
+def buscar_en_idx(ruta, tipo, clave):
+    """
+    Posiciones de `clave` ("i" = ISBN, "u" = user_id) en un .idx: búsqueda binaria
+    sobre las líneas ordenadas, sin leer el archivo entero.
+    """
+    objetivo = (tipo + "\t" + clave + "\t").encode("utf-8")
+    with open(ruta, "rb") as f:
+        bajo = len(f.readline())
+        alto = f.seek(0, os.SEEK_END)
+        # Primera línea >= objetivo
+        while bajo < alto:
+            medio = _inicio_linea(f, (bajo + alto) // 2)
+            f.seek(medio)
+            linea = f.readline()
+            if linea.rstrip(b"\n") < objetivo:
+                bajo = medio + len(linea)
+            else:
+                alto = medio
+        f.seek(bajo)
+        linea = f.readline().rstrip(b"\n")
+    if not linea.startswith(objetivo):
+        return []
+    return [int(p) for p in linea[len(objetivo):].split()]
+
+
+# ---------------------------
+# Historial
+# ---------------------------
+class HistorialEventos(object):
+    """
+    Log de eventos de la Biblioteca. Durabilidad como en el inventario: "ninguna" (buffer
+    del proceso), "archivo" (flush al sistema operativo en cada evento) o "completa" (fsync).
+    """
+
+    def __init__(self, ruta=None, tamano_segmento=4 * 1024 * 1024, capacidad_memoria=1000,
+                 durabilidad="archivo"):
+        if durabilidad not in DURABILIDADES:
+            raise ValueError("durabilidad debe ser una de {}".format(DURABILIDADES))
+        self.ruta = ruta
+        self.tamano_segmento = tamano_segmento
+        self.durabilidad = durabilidad
+        self.recientes = deque(maxlen=capacidad_memoria)   # (segundos, accion, user_id, isbn)
+        self.segmentos = []        # [(número, resumen)] de los segmentos cerrados
+        self._archivo = None
+        self._numero = 0
+        self._tamano = 0           # bytes del segmento actual
+        self._indice = _IndiceSegmento()
+        if ruta is not None:
+            os.makedirs(ruta, exist_ok=True)
+            self._abrir()
+
+    # ---- Archivos ----
+    def _ruta(self, numero, extension):
+        return os.path.join(self.ruta, "{:08d}.{}".format(numero, extension))
+
+    def _abrir(self):
+        numeros = sorted(int(nombre[:-4]) for nombre in os.listdir(self.ruta)
+                         if nombre.endswith(".seg") and nombre[:-4].isdigit())
+        for numero in numeros[:-1]:
+            ruta_idx = self._ruta(numero, "idx")
+            if not os.path.exists(ruta_idx):
+                # Se cortó el programa justo al cambiar de segmento: se rearma su índice
+                self._indexar(numero).guardar(ruta_idx)
+            self.segmentos.append((numero, _leer_resumen(ruta_idx)))
+        self._numero = numeros[-1] if numeros else 1
+        self._indice = self._indexar(self._numero)
+        self._archivo = open(self._ruta(self._numero, "seg"), "ab")
+        self._tamano = self._archivo.tell()
+        # Los últimos eventos (del segmento actual) vuelven al buffer circular
+        if self._indice.desde is not None:
+            for evento in self._leer_segmento(self._numero):
+                self.recientes.append(evento)
+
+    def _indexar(self, numero):
+        """
+        Recorre un segmento y arma su índice. Un registro incompleto al final
+        (corte durante la escritura) se descarta.
+        """
+        indice = _IndiceSegmento()
+        ruta = self._ruta(numero, "seg")
+        if not os.path.exists(ruta):
+            return indice
+        with open(ruta, "rb") as f:
+            datos = f.read()
+        posicion = 0
+        while posicion + CABECERA.size <= len(datos):
+            largo = CABECERA.unpack_from(datos, posicion)[0]
+            if posicion + largo > len(datos):
+                break
+            segundos, accion, user_id, isbn, _ = decodificar(datos, posicion)
+            indice.agregar(posicion, segundos, accion, user_id, isbn)
+            posicion += largo
+        if posicion != len(datos):
+            os.truncate(ruta, posicion)
+        return indice
+
+    def _rotar(self):
+        # Cierra el segmento actual (guarda su índice) y empieza uno nuevo
+        self._archivo.close()
+        self._indice.guardar(self._ruta(self._numero, "idx"))
+        self.segmentos.append((self._numero, self._indice.resumen()))
+        self._numero += 1
+        self._indice = _IndiceSegmento()
+        self._archivo = open(self._ruta(self._numero, "seg"), "ab")
+        self._tamano = 0
+
+    # ---- Escritura ----
+    def registrar(self, accion, user_id=None, isbn=None, momento=None):
+        segundos = int(time.time()) if momento is None else _segundos(momento)
+        registro = codificar(segundos, accion, user_id, isbn)
+        self.recientes.append((segundos, accion, user_id, isbn))
+        if self._archivo is None:
+            return
+        if self._tamano + len(registro) > self.tamano_segmento and self._indice.desde is not None:
+            self._rotar()
+        posicion = self._tamano
+        self._archivo.write(registro)
+        self._tamano += len(registro)
+        if self.durabilidad != "ninguna":
+            self._archivo.flush()
+            if self.durabilidad == "completa":
+                os.fsync(self._archivo.fileno())
+        self._indice.agregar(posicion, segundos, accion, user_id, isbn)
+
+    def registrar_lote(self, eventos):
+        """
+        Registra varios eventos (accion, user_id, isbn, momento) con una sola escritura y
+        un solo flush / fsync (salvo que haya que cambiar de segmento en el medio).
+        """
+        bloque = []        # registros todavía sin escribir
+        pendientes = []    # sus entradas del índice (se agregan una vez escritos)
+        for accion, user_id, isbn, momento in eventos:
+            segundos = int(time.time()) if momento is None else _segundos(momento)
+            registro = codificar(segundos, accion, user_id, isbn)
+            self.recientes.append((segundos, accion, user_id, isbn))
+            if self._archivo is None:
+                continue
+            if self._tamano + len(registro) > self.tamano_segmento and (self._indice.desde is not None or bloque):
+                self._escribir_bloque(bloque, pendientes)
+                bloque, pendientes = [], []
+                self._rotar()
+            pendientes.append((self._tamano, segundos, accion, user_id, isbn))
+            bloque.append(registro)
+            self._tamano += len(registro)
+        if bloque:
+            self._escribir_bloque(bloque, pendientes)
+
+    def _escribir_bloque(self, bloque, pendientes):
+        try:
+            self._archivo.write(b"".join(bloque))
+            if self.durabilidad != "ninguna":
+                self._archivo.flush()
+                if self.durabilidad == "completa":
+                    os.fsync(self._archivo.fileno())
+        except OSError:
+            self._tamano = pendientes[0][0]
+            raise
+        for entrada in pendientes:
+            self._indice.agregar(*entrada)
+
+    def cerrar(self):
+        if self._archivo is not None and not self._archivo.closed:
+            self._archivo.close()
+
+    # ---- Consultas ----
+    def ultimos(self, n=None):
+        """
+        Los últimos n eventos (los del buffer en memoria), del más viejo al más nuevo.
+        """
+        eventos = list(self.recientes)
+        if n is not None:
+            eventos = eventos[-n:] if n > 0 else []
+        return [_a_evento(*e) for e in eventos]
+
+    def __iter__(self):
+        return self.consultar()
+
+    def consultar(self, user_id=None, isbn=None, accion=None, desde=None, hasta=None):
+        """
+        Generador de eventos (en orden cronológico) que cumplen todos los filtros.
+        desde / hasta: datetime o segundos desde 1970 (ambos incluidos).
+        """
+        desde, hasta = _segundos(desde), _segundos(hasta)
+
+        def cumple(segundos, accion_e, user_e, isbn_e):
+            return ((user_id is None or user_e == user_id) and (isbn is None or isbn_e == isbn)
+                    and (accion is None or accion_e == accion)
+                    and (desde is None or segundos >= desde) and (hasta is None or segundos <= hasta))
+
+        if self._archivo is None:
+            # Solo memoria: se recorre el buffer circular
+            for e in list(self.recientes):
+                if cumple(*e):
+                    yield _a_evento(*e)
+            return
+
+        self._archivo.flush()
+        actual = (self._numero, self._indice.resumen())
+        for numero, resumen in self.segmentos + [actual]:
+            if resumen["desde"] is None:
+                continue
+            if (desde is not None and resumen["hasta"] < desde) or (hasta is not None and resumen["desde"] > hasta):
+                continue
+            if accion is not None and not resumen["acciones"].get(accion):
+                continue
+            if user_id is not None or isbn is not None:
+                if numero == self._numero:
+                    buscar = self._indice.buscar
+                else:
+                    ruta_idx = self._ruta(numero, "idx")
+                    buscar = lambda tipo, clave: buscar_en_idx(ruta_idx, tipo, clave)
+                if isbn is not None:
+                    posiciones = buscar("i", isbn)
+                    if user_id is not None and posiciones:
+                        posiciones = sorted(set(posiciones) & set(buscar("u", user_id)))
+                else:
+                    posiciones = buscar("u", user_id)
+                if not posiciones:
+                    continue
+                eventos = self._leer_posiciones(numero, posiciones)
+            else:
+                eventos = self._leer_segmento(numero)
+            for e in eventos:
+                if cumple(*e):
+                    yield _a_evento(*e)
+
+    def _leer_segmento(self, numero):
+        with open(self._ruta(numero, "seg"), "rb") as f:
+            datos = f.read()
+        posicion = 0
+        while posicion + CABECERA.size <= len(datos):
+            largo = CABECERA.unpack_from(datos, posicion)[0]
+            if posicion + largo > len(datos):
+                return
+            yield decodificar(datos, posicion)[:4]
+            posicion += largo
+
+    def _leer_posiciones(self, numero, posiciones):
+        with open(self._ruta(numero, "seg"), "rb") as f:
+            for posicion in posiciones:
+                f.seek(posicion)
+                largo = CABECERA.unpack(f.read(CABECERA.size))[0]
+                f.seek(posicion)
+                yield decodificar(f.read(largo))[:4]
@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+"""
+Importación masiva de catálogos de libros a la Biblioteca
+Estudiante: Leslye Valencia
+
+Descripción:
+------------
+- Lee archivos CSV o JSONL muy grandes sin cargarlos enteros: cada etapa es un
+  generador que recibe los registros de la anterior, de a uno.
+      leer (CSV / JSONL) -> validar -> quitar repetidos -> Biblioteca.importar_libros
+- Campos con nombres propios o de estilo MARC: 020 = ISBN, 245 = título, 100 = autor,
+  650 = materia (categoría). En un CSV sin encabezado el orden es isbn, título, autor,
+  categoría.
+- ISBN: se quitan guiones, espacios y prefijos ("ISBN-13: ...", "0306406152 (pbk.)"),
+  se verifica el dígito de control y se guarda siempre como ISBN-13 (un ISBN-10 y su
+  ISBN-13 son el mismo libro).
+- Repetidos: un ISBN que ya está en el catálogo o que apareció antes en el archivo se
+  rechaza con su motivo (gana el primero).
+- Las filas rechazadas van a un archivo de rechazos (CSV: línea, motivo, contenido) a
+  medida que aparecen.
+- La Biblioteca arma los índices de búsqueda en una sola pasada al final y guarda un
+  solo snapshot: si algo falla, el catálogo queda como estaba.
+- Memoria: además del catálogo, los libros leídos (entran al catálogo de una vez, al
+  final) y el conjunto de ISBN importados (para detectar repetidos dentro del archivo).
+- El resumen cuenta los rechazos por motivo (ISBN-10 con dígito de control incorrecto,
+  ISBN ya está en el catálogo, ...).
+
+Formatos de entrada:
+    CSV:   isbn,titulo,autor,categoria          (o 020,245,100,650; el encabezado es opcional)
+    JSONL: {"isbn": "978-0-306-40615-7", "titulo": "...", "autor": "...", "categoria": "..."}
+           {"020": "0306406152", "245": "...", "100": "...", "650": "..."}
+
+Uso:
+    python importar_libros.py catalogo.csv --carpeta datos_biblioteca
+    python importar_libros.py export.jsonl --carpeta datos_biblioteca --rechazos rechazos.csv
+    python importar_libros.py catalogo.csv --solo-validar
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from operator import mul
+
+from biblioteca import Libro
+from persistencia_biblioteca import abrir_biblioteca
+
+CAMPOS = ("isbn", "titulo", "autor", "categoria")
+# Nombres de columna aceptados (en minúsculas) -> campo
+ALIAS = {
+    "isbn": "isbn", "020": "isbn", "020a": "isbn",
+    "titulo": "titulo", "título": "titulo", "title": "titulo", "245": "titulo", "245a": "titulo",
+    "autor": "autor", "author": "autor", "100": "autor", "100a": "autor",
+    "categoria": "categoria", "categoría": "categoria", "materia": "categoria", "subject": "categoria",
+    "650": "categoria", "650a": "categoria",
+}
+EXTENSIONES_JSONL = (".jsonl", ".ndjson")
+LARGO_MAXIMO = 1000  # caracteres por campo
+AVISO_CADA = 100000  # filas entre avisos de progreso
+_PREFIJO_ISBN = re.compile(r"^ISBN(?:-1[03])?:?\s*")
+# [0-9] y no str.isdigit(): isdigit acepta "²" o dígitos arábigos que int() no convierte
+_ISBN10 = re.compile(r"[0-9]{9}[0-9X]")
+_ISBN13 = re.compile(r"[0-9]{13}")
+_PESOS10 = range(10, 1, -1)  # pesos de los 9 primeros dígitos de un ISBN-10
+
+
+# ---------------------------
+# ISBN
+# ---------------------------
+def normalizar_isbn(texto):
+    """
+    Retorna (isbn13, None) si `texto` es un ISBN-10 o ISBN-13 válido, o (None, motivo).
+        "0-306-40615-2" -> ("9780306406157", None)
+    """
+    texto = texto.strip()
+    if _ISBN13.fullmatch(texto):
+        isbn = texto  # el caso común: ya viene limpio
+    else:
+        # MARC 020 suele traer aclaraciones: "0306406152 (pbk.)"
+        texto = _PREFIJO_ISBN.sub("", texto.upper()).split("(")[0].strip()
+        isbn = texto.replace("-", "").replace(" ", "")
+    if len(isbn) == 10:
+        if not _ISBN10.fullmatch(isbn):
+            return None, "ISBN-10 con caracteres inválidos: {!r}".format(texto)
+        suma = sum(map(mul, _PESOS10, map(int, isbn[:9]))) + (10 if isbn[9] == "X" else int(isbn[9]))
+        if suma % 11:
+            return None, "ISBN-10 con dígito de control incorrecto: {!r}".format(texto)
+        isbn = "978" + isbn[:9]
+        return isbn + _control13(isbn), None
+    if len(isbn) == 13:
+        if not _ISBN13.fullmatch(isbn):
+            return None, "ISBN-13 con caracteres inválidos: {!r}".format(texto)
+        if not isbn.startswith(("978", "979")):
+            return None, "ISBN-13 debe empezar con 978 o 979: {!r}".format(texto)
+        if _control13(isbn[:12]) != isbn[12]:
+            return None, "ISBN-13 con dígito de control incorrecto: {!r}".format(texto)
+        return isbn, None
+    return None, "ISBN con {} dígito(s) (se esperaban 10 o 13): {!r}".format(len(isbn), texto)
+
+
+def _control13(doce):
+    # Dígitos en posición par pesan 1 y en posición impar 3
+    suma = sum(map(int, doce[0::2])) + 3 * sum(map(int, doce[1::2]))
+    return str((10 - suma % 10) % 10)
+
+
+class ResultadoImportacion(object):
+    """
+    Qué pasó con las filas: leídas, válidas, libros nuevos y rechazos por motivo
+    (la parte del motivo antes de ":", sin el ISBN de cada fila).
+    """
+
+    def __init__(self):
+        self.leidas = 0
+        self.validas = 0   # filas que llegaron a la Biblioteca
+        self.nuevos = 0    # menos que validas si otra operación dio de alta el mismo ISBN
+        self.motivos = Counter()
+        self.segundos = 0.0
+
+    @property
+    def rechazadas(self):
+        return sum(self.motivos.values())
+
+    def __str__(self):
+        texto = "{:,} fila(s) leídas: {:,} válidas ({:,} libros nuevos), {:,} rechazadas.".format(
+            self.leidas, self.validas, self.nuevos, self.rechazadas)
+        if self.segundos:
+            texto += " {:.1f} s ({:,.0f} filas/min).".format(self.segundos, self.leidas / self.segundos * 60)
+        for motivo, n in self.motivos.most_common():
+            texto += "\n  {:>10,}  {}".format(n, motivo)
+        return texto
+
+
+@contextmanager
+def rechazos_csv(ruta, resultado):
+    """
+    Entrega rechazar(línea, motivo, contenido): cuenta el motivo en `resultado` y, con
+    ruta, escribe la fila en el CSV de rechazos. El archivo se abre antes de leer la
+    entrada (una ruta inválida falla enseguida, no después de recorrer varios GB) y se
+    borra al final si no hubo rechazos.
+    """
+    archivo = escritor = None
+    if ruta is not None:
+        archivo = open(ruta, mode="w", newline="", encoding="utf-8")
+        escritor = csv.writer(archivo)
+        escritor.writerow(["linea", "motivo", "contenido"])
+
+    def rechazar(linea, motivo, contenido):
+        resultado.motivos[motivo.partition(":")[0]] += 1
+        if escritor is not None:
+            escritor.writerow([linea, motivo, contenido])
+
+    try:
+        yield rechazar
+    finally:
+        if archivo is not None:
+            archivo.close()
+            if not resultado.rechazadas:
+                os.remove(ruta)
+
+
+# ---------------------------
+# Etapas del pipeline (generadores)
+# ---------------------------
+def leer_csv(ruta):
+    """
+    Genera (línea, registro, contenido original) de un CSV; registro es un dict
+    campo -> texto. Con un encabezado reconocido (ALIAS) las columnas pueden estar en
+    cualquier orden.
+    """
+    with open(ruta, newline="", encoding="utf-8-sig", errors="replace") as f:
+        lector = csv.reader(f)
+        columnas = None
+        for fila in lector:
+            if not fila or not any(c.strip() for c in fila):
+                continue  # línea en blanco
+            if columnas is None:
+                columnas = [ALIAS.get(c.strip().lower()) for c in fila]
+                if "isbn" in columnas and "titulo" in columnas:
+                    continue  # encabezado
+                columnas = list(CAMPOS)
+            # Columnas faltantes quedan sin clave: la validación las rechaza
+            yield lector.line_num, {c: v for c, v in zip(columnas, fila) if c is not None}, ",".join(fila)
+
+
+def leer_jsonl(ruta):
+    """
+    Genera (línea, registro, contenido original) de un JSONL. Un JSON inválido o que
+    no es un objeto genera registro None.
+    """
+    with open(ruta, encoding="utf-8-sig", errors="replace") as f:
+        for n, linea in enumerate(f, start=1):
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                objeto = json.loads(linea)
+            except ValueError:
+                yield n, None, linea
+                continue
+            if not isinstance(objeto, dict):
+                yield n, None, linea
+                continue
+            registro = {}
+            for clave, valor in objeto.items():
+                campo = ALIAS.get(str(clave).lower())
+                if campo is not None and campo not in registro:
+                    registro[campo] = "" if valor is None else str(valor)
+            yield n, registro, linea
+
+
+def contar(registros, resultado, progreso=None):
+    """
+    Cuenta las filas leídas y, con `progreso`, lo llama con ese número cada AVISO_CADA.
+    """
+    for registro in registros:
+        resultado.leidas += 1
+        if progreso is not None and resultado.leidas % AVISO_CADA == 0:
+            progreso(resultado.leidas)
+        yield registro
+
+
+def validar(registros, rechazar):
+    """
+    Deja pasar (línea, Libro) con ISBN normalizado y título no vacío.
+    """
+    for linea, registro, contenido in registros:
+        if registro is None:
+            libro, motivo = None, "JSON inválido (se esperaba un objeto por línea)"
+        else:
+            libro, motivo = _a_libro(registro)
+        if motivo is not None:
+            rechazar(linea, motivo, contenido)
+        else:
+            yield linea, libro
+
+
+def _a_libro(registro):
+    # dict de texto -> (Libro, None) o (None, motivo)
+    if not registro.get("isbn", "").strip():
+        return None, "sin ISBN"
+    isbn, motivo = normalizar_isbn(registro["isbn"])
+    if motivo is not None:
+        return None, motivo
+    titulo = registro.get("titulo", "").strip()
+    autor = registro.get("autor", "").strip()
+    categoria = registro.get("categoria", "").strip()
+    if not titulo:
+        return None, "sin título"
+    if max(len(titulo), len(autor), len(categoria)) > LARGO_MAXIMO:
+        return None, "campo de más de {} caracteres".format(LARGO_MAXIMO)
+    return Libro(titulo, autor, categoria, isbn), None
+
+
+def quitar_repetidos(libros, catalogo, rechazar, resultado):
+    """
+    Rechaza los ISBN que ya están en el catálogo o que aparecieron antes en el archivo.
+    """
+    importados = set()
+    for linea, libro in libros:
+        if libro.isbn in importados:
+            motivo = "ISBN repetido en el archivo"
+        elif libro.isbn in catalogo:
+            motivo = "ISBN ya está en el catálogo"
+        else:
+            importados.add(libro.isbn)
+            resultado.validas += 1
+            yield libro
+            continue
+        rechazar(linea, motivo, "{},{},{},{}".format(libro.isbn, libro.titulo, libro.autor, libro.categoria))
+
+
+# ---------------------------
+# Importación completa
+# ---------------------------
+LECTORES = {"csv": leer_csv, "jsonl": leer_jsonl}
+
+
+def importar_libros(biblioteca, ruta, ruta_rechazos=None, formato=None, solo_validar=False,
+                    tamano_lote=10000, progreso=None):
+    """
+    Importa un catálogo CSV o JSONL a la Biblioteca. formato: "csv" o "jsonl" (None =
+    según la extensión). Con solo_validar se recorre todo el archivo y se escriben los
+    rechazos, sin tocar la Biblioteca.
+    Retorna (ok: bool, msg: str, resultado: ResultadoImportacion)
+    """
+    resultado = ResultadoImportacion()
+    formato = formato or ("jsonl" if ruta.lower().endswith(EXTENSIONES_JSONL) else "csv")
+    if formato not in LECTORES:
+        return False, "Formato desconocido: {}".format(formato), resultado
+    inicio = time.perf_counter()
+    try:
+        with rechazos_csv(ruta_rechazos, resultado) as rechazar:
+            registros = contar(LECTORES[formato](ruta), resultado, progreso)
+            libros = quitar_repetidos(validar(registros, rechazar), biblioteca.libros, rechazar, resultado)
+            if solo_validar:
+                for _ in libros:
+                    pass
+                msg = "Validación terminada (la biblioteca no se modificó)."
+            else:
+                resultado.nuevos = biblioteca.importar_libros(libros, tamano_lote)
+                msg = "{:,} libro(s) importados.".format(resultado.nuevos)
+    except csv.Error as e:
+        # p. ej. un campo más largo que csv.field_size_limit() en una exportación MARC
+        return False, "'{}' no se pudo leer como CSV después de la fila {:,}: {}. El catálogo no cambió.".format(
+            ruta, resultado.leidas, e), resultado
+    except OSError as e:
+        # La entrada, el archivo de rechazos o el snapshot de la Biblioteca: se nombra el que falló
+        return False, "Error con '{}': {}. El catálogo no cambió.".format(
+            e.filename or ruta, e.strerror or e), resultado
+    resultado.segundos = time.perf_counter() - inicio
+    if resultado.rechazadas and ruta_rechazos:
+        msg += " Rechazos en '{}'.".format(ruta_rechazos)
+    return True, msg, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa un catálogo de libros CSV/JSONL a la Biblioteca.")
+    parser.add_argument("archivo", help="catálogo (.csv o .jsonl)")
+    parser.add_argument("--carpeta", default="datos_biblioteca", help="carpeta de la biblioteca persistente")
+    parser.add_argument("--rechazos", help="archivo de rechazos (por defecto <archivo>.rechazos.csv)")
+    parser.add_argument("--formato", choices=("csv", "jsonl"), help="por defecto, según la extensión")
+    parser.add_argument("--lote", type=int, default=10000, help="filas que se leen por vez")
+    parser.add_argument("--solo-validar", action="store_true", help="no modifica la biblioteca")
+    args = parser.parse_args()
+    ruta_rechazos = args.rechazos or os.path.splitext(args.archivo)[0] + ".rechazos.csv"
+
+    biblioteca = abrir_biblioteca(args.carpeta)
+    print("> {}".format(biblioteca.almacen.mensaje))
+    ok, msg, resultado = importar_libros(biblioteca, args.archivo, ruta_rechazos, args.formato,
+                                         args.solo_validar, args.lote,
+                                         progreso=lambda n: print("  {:,} filas...".format(n), file=sys.stderr))
+    biblioteca.cerrar()
+    print(resultado)
+    print(msg)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
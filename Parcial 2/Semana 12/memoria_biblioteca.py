@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Memoria por libro del catálogo de la Biblioteca (medida con tracemalloc).
+
+Arma un catálogo de N libros como si viniera de un archivo (cada fila trae sus propios
+textos, aunque el autor o la categoría se repitan) y mide los bytes por libro:
+- solo el catálogo (Biblioteca.libros), y
+- la Biblioteca completa, con los índices de búsqueda.
+
+Formas comparadas:
+    antes      Libro con __dict__ y tupla titulo_autor, sin internar (la versión anterior)
+    slots      Libro con __slots__, autor y categoría internados
+    compacto   Biblioteca(catalogo_compacto=True): catálogo por columnas
+
+También muestra cuánto tarda recorrer el catálogo entero (catalogo()) en cada forma.
+
+Uso:
+    python memoria_biblioteca.py [--libros 200000] [--autores 5000] [--categorias 40]
+"""
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from biblioteca import Biblioteca, Libro, palabras
+
+PALABRAS = ["historia", "de", "la", "programación", "python", "datos", "estructuras", "cien", "años",
+            "soledad", "quijote", "mancha", "redes", "teoría", "álgebra", "cálculo", "física", "química"]
+
+
+class LibroAnterior(object):
+    # Como era Libro antes de __slots__: un __dict__ y una tupla por libro, sin internar
+    def __init__(self, titulo, autor, categoria, isbn):
+        self.titulo_autor = (titulo, autor)
+        self.categoria = categoria
+        self.isbn = isbn
+
+    @property
+    def titulo(self):
+        return self.titulo_autor[0]
+
+    @property
+    def autor(self):
+        return self.titulo_autor[1]
+
+
+FORMAS = {
+    "antes": (LibroAnterior, False),
+    "slots": (Libro, False),
+    "compacto": (Libro, True),
+}
+
+
+def filas(n_libros, n_autores, n_categorias, semilla=1):
+    # Textos nuevos en cada fila, como los que entrega csv.reader
+    azar = random.Random(semilla)
+    for i in range(n_libros):
+        yield ("978{:010d}".format(i), " ".join(azar.choices(PALABRAS, k=4)) + " {}".format(i),
+               "Autor {}".format(azar.randrange(n_autores)), "Categoría {}".format(azar.randrange(n_categorias)))
+
+
+def medir(forma, args):
+    clase, compacto = FORMAS[forma]
+    palabras.cache_clear()  # cada forma arranca con la caché de palabras vacía
+    gc.collect()
+    tracemalloc.start()
+    inicial = tracemalloc.get_traced_memory()[0]
+    biblioteca = Biblioteca(catalogo_compacto=compacto)
+    for isbn, titulo, autor, categoria in filas(args.libros, args.autores, args.categorias):
+        biblioteca._alta_libro(clase(titulo, autor, categoria, isbn), indexar=False)
+    gc.collect()
+    catalogo = tracemalloc.get_traced_memory()[0] - inicial
+    biblioteca.reindexar()
+    gc.collect()
+    total = tracemalloc.get_traced_memory()[0] - inicial
+    tracemalloc.stop()
+
+    inicio = time.perf_counter()
+    for _ in biblioteca.catalogo():
+        pass
+    recorrido = time.perf_counter() - inicio
+    return catalogo / args.libros, total / args.libros, recorrido
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes por libro del catálogo de la Biblioteca.")
+    parser.add_argument("--libros", type=int, default=200_000)
+    parser.add_argument("--autores", type=int, default=5000, help="autores distintos")
+    parser.add_argument("--categorias", type=int, default=40, help="categorías distintas")
+    parser.add_argument("--formas", nargs="+", choices=list(FORMAS), default=list(FORMAS))
+    args = parser.parse_args()
+
+    print("{} libros, {} autores, {} categorías (bytes por libro, tracemalloc)".format(
+        args.libros, args.autores, args.categorias))
+    print("{:<10} {:>10} {:>14} {:>16}".format("forma", "catálogo", "con índices", "recorrer catálogo"))
+    base = None
+    for forma in args.formas:
+        catalogo, total, recorrido = medir(forma, args)
+        base = base or catalogo
+        print("{:<10} {:>10.0f} {:>14.0f} {:>13.0f} ms   catálogo {:.0%} de '{}'".format(
+            forma, catalogo, total, recorrido * 1000, catalogo / base, args.formas[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+"""
+Persistencia de la Biblioteca (snapshot + journal)
+Estudiante: Leslye Valencia
+
+Descripción:
+------------
+- Snapshot: un archivo CSV compacto (biblioteca.snap) con libros, usuarios y préstamos,
+  escrito de forma atómica (temporal + fsync + rename) y con una línea de control
+  #fin,<filas>,<crc32> para detectar un archivo dañado. Se conserva la versión anterior
+  (biblioteca.snap.1) por si la actual está dañada.
+- Journal (biblioteca.journal): cada operación se agrega como una línea pequeña antes
+  de aplicarse en memoria. Un carrito (prestar_lote / devolver_lote) va entre T y F:
+  al cargar se aplica entero o nada.
+- Al iniciar se carga el snapshot, se reproduce el journal y los índices de búsqueda se
+  arman en una sola pasada: el tiempo de arranque depende del tamaño del catálogo, no de
+  cuántas operaciones hubo. compactar() (automático cuando el journal supera
+  `umbral_compactacion` bytes) escribe un snapshot nuevo y empieza un journal vacío.
+- El snapshot y el journal llevan un número de generación: si el programa se corta
+  justo después de escribir un snapshot, el journal viejo (ya incluido) no se reaplica.
+- El historial de eventos ya tiene su propio log en disco (historial_biblioteca.py);
+  abrir_biblioteca() lo guarda en la misma carpeta.
+
+Formato del snapshot:
+    #biblioteca,1,<generación>
+    #libros,<n>
+    isbn,titulo,autor,categoria
+    #usuarios,<n>
+    user_id,nombre
+    #prestamos,<n>
+    isbn,user_id,vence (AAAA-MM-DD)
+    #fin,<filas>,<crc32>
+
+Formato del journal (una línea por operación):
+    #generacion,<g>
+    AL,isbn,titulo,autor,categoria     alta de libro
+    BL,isbn                            baja de libro
+    AU,user_id,nombre                  alta de usuario
+    BU,user_id                         baja de usuario
+    P,isbn,user_id,vence               préstamo
+    D,isbn,user_id                     devolución
+    T,n ... F,n                        carrito: todo o nada
+
+Uso:
+    biblioteca = abrir_biblioteca("datos_biblioteca")
+    ...
+    biblioteca.cerrar()
+"""
+
+import csv
+import io
+import os
+import time
+import zlib
+from datetime import date
+
+from biblioteca import Biblioteca, Libro, Usuario
+from historial_biblioteca import HistorialEventos
+
+DURABILIDADES = ("ninguna", "archivo", "completa")
+VERSION = "1"
+MARCA_FIN = "#fin"
+
+
+class _EscritorCRC(object):
+    """
+    Envoltorio de un archivo binario que va calculando el CRC32 de lo escrito.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.crc = 0
+
+    def write(self, texto):
+        datos = texto.encode("utf-8")
+        self.crc = zlib.crc32(datos, self.crc)
+        self.f.write(datos)
+
+
+# ---------------------------
+# Snapshot
+# ---------------------------
+def escribir_snapshot(ruta, biblioteca, generacion, durabilidad="archivo"):
+    """
+    Escribe el snapshot de forma atómica y deja el anterior en ruta.1.
+    Lanza OSError si falla; en ese caso el snapshot anterior queda intacto.
+    """
+    temporal = ruta + ".tmp"
+    with open(temporal, "wb") as f:
+        escritor = _EscritorCRC(f)
+        writer = csv.writer(escritor)
+        writer.writerow(["#biblioteca", VERSION, generacion])
+        writer.writerow(["#libros", len(biblioteca.libros)])
+        writer.writerows((l.isbn, l.titulo, l.autor, l.categoria) for l in biblioteca.libros.values())
+        writer.writerow(["#usuarios", len(biblioteca.usuarios)])
+        writer.writerows((u.user_id, u.nombre) for u in biblioteca.usuarios.values())
+        # Por usuario, en orden de préstamo: al cargar cada uno conserva su orden
+        writer.writerow(["#prestamos", len(biblioteca.prestamos)])
+        writer.writerows((isbn, u.user_id, vence.isoformat())
+                         for u in biblioteca.usuarios.values() for isbn, vence in u.libros_prestados.items())
+        filas = 4 + len(biblioteca.libros) + len(biblioteca.usuarios) + len(biblioteca.prestamos)
+        f.write("{},{},{:08x}\r\n".format(MARCA_FIN, filas, escritor.crc).encode("ascii"))
+        f.flush()
+        if durabilidad != "ninguna":
+            os.fsync(f.fileno())
+    if os.path.exists(ruta):
+        os.replace(ruta, ruta + ".1")
+    os.replace(temporal, ruta)
+
+
+def leer_snapshot(ruta):
+    """
+    Lee y verifica un snapshot. Retorna (generación, libros, usuarios, prestamos) con
+    filas de texto. Lanza ValueError si el CRC no coincide o el formato no es válido.
+    """
+    with open(ruta, "rb") as f:
+        datos = f.read()
+    contenido = datos.rstrip(b"\r\n")
+    corte = contenido.rfind(b"\n") + 1
+    control = contenido[corte:].decode("ascii", errors="replace").split(",")
+    if control[0] != MARCA_FIN or len(control) != 3:
+        raise ValueError("'{}' no tiene la línea de control (incompleto)".format(ruta))
+    if zlib.crc32(datos[:corte]) != int(control[2], 16):
+        raise ValueError("'{}' está dañado (CRC distinto)".format(ruta))
+
+    filas = csv.reader(io.StringIO(datos[:corte].decode("utf-8"), newline=""))
+    cabecera = next(filas)
+    if cabecera[:2] != ["#biblioteca", VERSION]:
+        raise ValueError("'{}' no es un snapshot de la biblioteca".format(ruta))
+    secciones = {}
+    for nombre in ("#libros", "#usuarios", "#prestamos"):
+        marca = next(filas)
+        if marca[0] != nombre:
+            raise ValueError("'{}': se esperaba la sección {}".format(ruta, nombre))
+        secciones[nombre] = [next(filas) for _ in range(int(marca[1]))]
+    return int(cabecera[2]), secciones["#libros"], secciones["#usuarios"], secciones["#prestamos"]
+
+
+# ---------------------------
+# Almacén (snapshot + journal)
+# ---------------------------
+class AlmacenBiblioteca(object):
+    def __init__(self, carpeta, durabilidad="archivo", umbral_compactacion=64 * 1024 * 1024):
+        if durabilidad not in DURABILIDADES:
+            raise ValueError("durabilidad debe ser una de {}".format(DURABILIDADES))
+        os.makedirs(carpeta, exist_ok=True)
+        self.ruta_snapshot = os.path.join(carpeta, "biblioteca.snap")
+        self.ruta_journal = os.path.join(carpeta, "biblioteca.journal")
+        self.durabilidad = durabilidad
+        self.umbral_compactacion = umbral_compactacion
+        self.biblioteca = None
+        self.generacion = 0
+        self.mensaje = ""          # resumen de la última carga
+        self.tiempos = {}          # segundos por etapa de la última carga
+        # False: anotar() no compacta solo; lo decide quien lo usa (Biblioteca concurrente)
+        self.compactacion_automatica = True
+        self._journal = None
+
+    # ---- Carga ----
+    def cargar(self, biblioteca):
+        """
+        Llena una Biblioteca vacía con el snapshot y el journal (lo llama Biblioteca(almacen=...)).
+        """
+        self.biblioteca = biblioteca
+        inicio = time.perf_counter()
+        aviso = ""
+        datos = None
+        for ruta in (self.ruta_snapshot, self.ruta_snapshot + ".1"):
+            if not os.path.exists(ruta):
+                continue
+            try:
+                datos = leer_snapshot(ruta)
+                break
+            except ValueError as e:
+                aviso += " Aviso: {}.".format(e)
+        if datos is None and aviso:
+            raise ValueError("No hay un snapshot válido de la biblioteca." + aviso)
+        if datos is not None:
+            self.generacion, libros, usuarios, prestamos = datos
+            for isbn, titulo, autor, categoria in libros:
+                biblioteca._alta_libro(Libro(titulo, autor, categoria, isbn), indexar=False)
+            for user_id, nombre in usuarios:
+                biblioteca._alta_usuario(Usuario(nombre, user_id))
+            for isbn, user_id, vence in prestamos:
+                biblioteca._prestar(isbn, user_id, date.fromisoformat(vence))
+        self.tiempos["snapshot"] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        aplicadas, descartadas = self._reproducir_journal()
+        self.tiempos["journal"] = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        biblioteca.reindexar()
+        self.tiempos["indices"] = time.perf_counter() - inicio
+
+        self._journal = open(self.ruta_journal, "a", newline="", encoding="utf-8")
+        self.mensaje = "{} libro(s), {} usuario(s), {} préstamo(s); journal: {} operación(es)".format(
+            len(biblioteca.libros), len(biblioteca.usuarios), len(biblioteca.prestamos), aplicadas)
+        if descartadas:
+            self.mensaje += ", {} incompleta(s) o inválida(s) descartada(s)".format(descartadas)
+        self.mensaje += "." + aviso
+
+    def _reproducir_journal(self):
+        """
+        Aplica el journal de esta generación. Una cola incompleta (línea cortada o carrito
+        sin F) se recorta. Un journal de otra generación ya está en el snapshot y se reemplaza.
+        Retorna (operaciones aplicadas, descartadas).
+        """
+        if not os.path.exists(self.ruta_journal) or self._generacion_journal() != self.generacion:
+            self._nuevo_journal()
+            return 0, 0
+        aplicadas = descartadas = 0
+        pendientes = None      # registros del carrito abierto (T sin F todavía)
+        leidos = [0]           # bytes entregados al lector CSV
+
+        def lineas(f):
+            # Solo líneas completas; un campo entre comillas puede ocupar varias
+            for linea in f:
+                if not linea.endswith(b"\n"):
+                    return  # línea cortada
+                leidos[0] += len(linea)
+                yield linea.decode("utf-8", errors="replace")
+
+        with open(self.ruta_journal, "rb") as f:
+            leidos[0] = fin_valido = len(f.readline())
+            lector = csv.reader(lineas(f), strict=True)
+            try:
+                for fila in lector:
+                    if fila and fila[0] == "T":
+                        pendientes = []
+                    elif fila and fila[0] == "F" and pendientes is not None:
+                        for registro in pendientes:
+                            descartadas += not self._aplicar(registro)
+                            aplicadas += 1
+                        pendientes = None
+                    elif pendientes is not None:
+                        pendientes.append(fila)
+                        continue
+                    else:
+                        descartadas += not self._aplicar(fila)
+                        aplicadas += 1
+                    if pendientes is None:
+                        fin_valido = leidos[0]
+            except csv.Error:
+                pass  # registro cortado a mitad de un campo entre comillas
+        if pendientes is not None:
+            descartadas += len(pendientes)
+        if fin_valido < os.path.getsize(self.ruta_journal):
+            os.truncate(self.ruta_journal, fin_valido)
+        return aplicadas, descartadas
+
+    def _generacion_journal(self):
+        with open(self.ruta_journal, newline="", encoding="utf-8", errors="replace") as f:
+            fila = next(csv.reader([f.readline()]), [])
+        if len(fila) == 2 and fila[0] == "#generacion" and fila[1].isdigit():
+            return int(fila[1])
+        return None
+
+    def _nuevo_journal(self):
+        # Journal vacío de la generación actual (atómico: nunca queda uno sin encabezado)
+        temporal = self.ruta_journal + ".tmp"
+        with open(temporal, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow(["#generacion", self.generacion])
+            f.flush()
+            if self.durabilidad != "ninguna":
+                os.fsync(f.fileno())
+        os.replace(temporal, self.ruta_journal)
+
+    def _aplicar(self, fila):
+        """
+        Aplica un registro del journal en memoria (sin historial). Retorna False si es inválido.
+        """
+        b = self.biblioteca
+        try:
+            tipo = fila[0]
+            if tipo == "AL":
+                _, isbn, titulo, autor, categoria = fila
+                b._alta_libro(Libro(titulo, autor, categoria, isbn), indexar=False)
+            elif tipo == "BL":
+                b.libros.pop(fila[1], None)   # los índices se arman al final de la carga
+            elif tipo == "AU":
+                _, user_id, nombre = fila
+                if user_id not in b.usuarios:
+                    b._alta_usuario(Usuario(nombre, user_id))
+            elif tipo == "BU":
+                if fila[1] in b.usuarios:
+                    b._baja_usuario(fila[1])
+            elif tipo == "P":
+                _, isbn, user_id, vence = fila
+                if user_id not in b.usuarios or isbn in b.prestamos:
+                    return False
+                b._prestar(isbn, user_id, date.fromisoformat(vence))
+            elif tipo == "D":
+                _, isbn, user_id = fila
+                if b.prestamos.get(isbn) != user_id:
+                    return False
+                b._devolver(isbn, user_id)
+            else:
+                return False
+        except (ValueError, IndexError):
+            return False
+        return True
+
+    # ---- Escritura ----
+    def anotar(self, registros, sincronizar=True):
+        """
+        Agrega operaciones al journal (varias = un carrito, entre T y F).
+        Lanza OSError si no se pudo escribir; el journal se recorta a como estaba.
+        Con sincronizar=False no se hace el fsync (durabilidad "completa"): quien llama
+        debe llamar a sincronizar() antes de dar la operación por hecha.
+        """
+        if self.compactacion_automatica and self.necesita_compactar():
+            # Antes de escribir: la memoria todavía no tiene esta operación, sí todas las anteriores
+            self.compactar()
+        if len(registros) > 1:
+            registros = [["T", len(registros)]] + list(registros) + [["F", len(registros)]]
+        tamano_anterior = self._journal.tell()
+        try:
+            csv.writer(self._journal).writerows(registros)
+            if self.durabilidad != "ninguna":
+                self._journal.flush()
+                if self.durabilidad == "completa" and sincronizar:
+                    os.fsync(self._journal.fileno())
+        except OSError:
+            try:
+                self._journal.seek(0, os.SEEK_END)
+                self._journal.truncate(tamano_anterior)
+            except (OSError, ValueError):
+                pass  # la carga descartará la cola incompleta
+            raise
+
+    def sincronizar(self):
+        """
+        fsync del journal (durabilidad "completa"). Varios hilos pueden llamarlo a la vez:
+        un fsync deja en disco también lo que escribieron los demás hasta ese momento.
+        """
+        if self.durabilidad == "completa":
+            os.fsync(self._journal.fileno())
+
+    def necesita_compactar(self):
+        return self._journal.tell() >= self.umbral_compactacion
+
+    def compactar(self):
+        """
+        Escribe un snapshot con el estado actual y empieza un journal vacío.
+        Si falla (OSError) el snapshot y el journal anteriores siguen valiendo.
+        """
+        self._journal.flush()
+        escribir_snapshot(self.ruta_snapshot, self.biblioteca, self.generacion + 1, self.durabilidad)
+        self.generacion += 1
+        self._journal.close()
+        self._nuevo_journal()
+        self._journal = open(self.ruta_journal, "a", newline="", encoding="utf-8")
+
+    def cerrar(self):
+        if self._journal is not None and not self._journal.closed:
+            self._journal.close()
+
+
+def abrir_biblioteca(carpeta, durabilidad="archivo", umbral_compactacion=64 * 1024 * 1024,
+                     catalogo_compacto=False):
+    """
+    Biblioteca persistente: snapshot + journal y el historial de eventos en `carpeta`.
+    """
+    historial = HistorialEventos(os.path.join(carpeta, "historial"), durabilidad=durabilidad)
+    almacen = AlmacenBiblioteca(carpeta, durabilidad, umbral_compactacion)
+    return Biblioteca(historial=historial, almacen=almacen, catalogo_compacto=catalogo_compacto)